@@ -59,6 +59,26 @@ It must be an object with the following methods:
 * stop(BundleContext)
 """
 
+BUNDLE_REQUIRES = "__pelix_bundle_requires__"
+"""
+Name of the module member listing the names of the bundles which must be
+started before this one (a string or a list of strings).
+The framework follows this order when starting its bundles, and stops them
+in the reverse order.
+"""
+
+BUNDLE_START_LEVEL = "__pelix_bundle_start_level__"
+"""
+Name of the module member giving the start level of the bundle (integer,
+greater than 0). Bundles without this member have the default start level.
+"""
+
+DEFAULT_START_LEVEL = 1
+"""
+Start level of the bundles which don't declare one, and default beginning
+start level of the framework
+"""
+
 OBJECTCLASS = "objectClass"
 """
 Property containing the list of specifications (strings) provided by a service
@@ -93,6 +113,61 @@ It can be generated or be forced using the framework initialization properties.
 This property is constant during the life of a framework instance.
 """
 
+REGISTRY_INDEXES = "pelix.registry.indexes"
+"""
+Framework property: the names of the service properties indexed by the service
+registry, as a list or a comma-separated string.
+The equality tests on those properties in service filters are resolved using
+the indexes instead of testing all services.
+"""
+
+REGISTRY_DEFAULT_INDEXES = (SERVICE_ID, "instance.name",
+                            "endpoint.framework.uuid")
+"""
+The properties indexed by the service registry when the
+``pelix.registry.indexes`` framework property is not set: service ID, iPOPO
+instance name and Remote Services framework UID.
+"""
+
+FRAMEWORK_EVENT_LOOP = "pelix.framework.event_loop"
+"""
+Framework property: an asyncio event loop, running in its own thread.
+
+If set, the coroutines returned by component callbacks are executed on this
+loop. The thread calling the callback waits for the coroutine, so it can't be
+the thread of the loop.
+
+The coroutines returned by EventAdmin handlers are scheduled on this loop
+without blocking a thread, even by ``send()``, and their errors are logged.
+The handler methods themselves are still called in the thread of ``send()``,
+or by the EventAdmin thread pool for posted events: only the coroutines run
+on the loop.
+"""
+
+FRAMEWORK_PARALLEL_START = "pelix.framework.parallel_start"
+"""
+Framework property: the number of threads used to start the installed bundles
+when the framework starts (integer). If greater than 1, the activators of
+bundles which don't depend on each other (see ``BUNDLE_REQUIRES``) are called
+concurrently. By default, bundles are started one after the other.
+"""
+
+FRAMEWORK_BEGINNING_START_LEVEL = "pelix.framework.startlevel.beginning"
+"""
+Framework property: the start level reached by the framework when it starts
+(integer, ``DEFAULT_START_LEVEL`` by default). The bundles with a higher start
+level stay installed but aren't started until the framework start level is
+raised.
+"""
+
+FRAMEWORK_STARTUP_TRACER = "pelix.framework.startup_tracer"
+"""
+Framework property: if true, the framework records the duration of the
+import and start of bundles, and iPOPO the duration of the registration of
+factories and of the instantiation and validation of components.
+The timeline is given by ``Framework.get_startup_tracer()``.
+"""
+
 # ------------------------------------------------------------------------------
 
 
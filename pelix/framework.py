@@ -28,6 +28,7 @@ Pelix is a Python framework that aims to act as OSGi as much as possible
 """
 
 # Standard library
+import heapq
 import imp
 import importlib
 import inspect
@@ -36,16 +37,22 @@ import os
 import pkgutil
 import sys
 import threading
+import time
 import uuid
 
 # Pelix beans and constants
-from pelix.constants import ACTIVATOR, ACTIVATOR_LEGACY, FRAMEWORK_UID, \
-    BundleException, FrameworkException
+from pelix.constants import ACTIVATOR, ACTIVATOR_LEGACY, BUNDLE_REQUIRES, \
+    BUNDLE_START_LEVEL, DEFAULT_START_LEVEL, FRAMEWORK_BEGINNING_START_LEVEL, \
+    FRAMEWORK_PARALLEL_START, FRAMEWORK_STARTUP_TRACER, FRAMEWORK_UID, \
+    REGISTRY_INDEXES, BundleException, FrameworkException
 from pelix.internals.events import BundleEvent, ServiceEvent
 from pelix.internals.registry import EventDispatcher, ServiceRegistry, \
     ServiceReference, ServiceRegistration
+from pelix.internals.tracer import StartupTracer, trace, TRACE_FRAMEWORK, \
+    TRACE_INSTALL, TRACE_START
 
 # Pelix utility modules
+from pelix.threadpool import ThreadPool
 from pelix.utilities import is_string
 
 # ------------------------------------------------------------------------------
@@ -65,6 +72,28 @@ _logger = logging.getLogger("pelix.main")
 # ------------------------------------------------------------------------------
 
 
+def _check_start_level(level):
+    """
+    Converts the given value to a start level
+
+    :param level: A start level value
+    :return: The start level (integer)
+    :raise ValueError: Invalid start level
+    """
+    try:
+        level = int(level)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid start level: {0}".format(level))
+
+    if level < 1:
+        raise ValueError("Start level must be greater than 0: {0}"
+                         .format(level))
+
+    return level
+
+# ------------------------------------------------------------------------------
+
+
 class Bundle(object):
     """
     Represents a "bundle" in Pelix
@@ -109,6 +138,14 @@ class Bundle(object):
         self.__framework = framework
         self._state = Bundle.RESOLVED
 
+        # Start level
+        try:
+            self.__start_level = _check_start_level(
+                getattr(module, BUNDLE_START_LEVEL, DEFAULT_START_LEVEL))
+        except ValueError as ex:
+            _logger.warning("Bundle %s: %s", name, ex)
+            self.__start_level = DEFAULT_START_LEVEL
+
         # Registered services
         self.__registered_services = set()
         self.__registration_lock = threading.Lock()
@@ -235,6 +272,14 @@ class Bundle(object):
                                   "uninstalled bundle")
         return self.__framework._registry.get_bundle_imported_services(self)
 
+    def get_start_level(self):
+        """
+        Retrieves the start level of the bundle
+
+        :return: The start level of the bundle
+        """
+        return self.__start_level
+
     def get_state(self):
         """
         Retrieves the bundle state
@@ -301,7 +346,9 @@ class Bundle(object):
             if starter is not None:
                 try:
                     # Call the start method
-                    starter(self.__context)
+                    with trace(self.__framework.get_startup_tracer(),
+                               TRACE_START, self.__name):
+                        starter(self.__context)
                 except (FrameworkException, BundleException):
                     # Restore previous state
                     self._state = previous_state
@@ -323,6 +370,30 @@ class Bundle(object):
             self._state = Bundle.ACTIVE
             self._fire_bundle_event(BundleEvent.STARTED)
 
+    def set_start_level(self, level):
+        """
+        Changes the start level of the bundle. If the framework is active, the
+        bundle is stopped if its new level is higher than the framework start
+        level, and started if it is resolved and its new level is lower or
+        equal to the framework one, as when the framework level is raised.
+
+        :param level: The new start level of the bundle
+        :raise ValueError: Invalid start level
+        :raise BundleException: Error starting or stopping the bundle
+        """
+        self.__start_level = _check_start_level(level)
+        if self.__framework._state != Bundle.ACTIVE:
+            # The framework will start or stop the bundle
+            return
+
+        framework_level = self.__framework.get_start_level()
+        if self._state == Bundle.ACTIVE \
+                and self.__start_level > framework_level:
+            self.stop()
+        elif self._state == Bundle.RESOLVED \
+                and self.__start_level <= framework_level:
+            self.start()
+
     def stop(self):
         """
         Stops the bundle. Does nothing if the bundle is already stopped.
@@ -545,13 +616,36 @@ class Framework(Bundle):
         self._dispatcher = EventDispatcher()
 
         # Service registry
-        self._registry = ServiceRegistry(self)
+        self._registry = ServiceRegistry(
+            self, indexes=self.__properties.get(REGISTRY_INDEXES))
         self.__unregistering_services = {}
 
         # The wait_for_stop event (initially stopped)
         self._fw_stop_event = threading.Event()
         self._fw_stop_event.set()
 
+        # Bundle -> duration of its start (in seconds) during the last start
+        # of the framework
+        self.__start_timings = {}
+
+        # Active start level (0 while the framework is stopped)
+        self.__start_level = 0
+
+        # Startup tracer
+        tracer_flag = self.__properties.get(FRAMEWORK_STARTUP_TRACER)
+        if tracer_flag and str(tracer_flag).lower() not in ("0", "false"):
+            self.__tracer = StartupTracer()
+        else:
+            self.__tracer = None
+
+        # Lazy bundles: name -> (specifications, path)
+        self.__lazy_bundles = {}
+        # Specification -> names of the lazy bundles providing it
+        self.__lazy_specs = {}
+        # Lazy bundles which failed to be activated: name -> specifications
+        self.__lazy_failed = {}
+        self.__lazy_lock = threading.RLock()
+
     def add_property(self, name, value):
         """
         Adds a property to the framework **if it is not yet set**.
@@ -583,6 +677,9 @@ class Framework(Bundle):
         :raise BundleException: An error occurred looking for service
                                 references
         """
+        # Activate the lazy bundles providing the specification, if any
+        self._activate_lazy_bundles(clazz)
+
         return self._registry.find_service_references(clazz, ldap_filter,
                                                       only_one)
 
@@ -688,6 +785,15 @@ class Framework(Bundle):
         except KeyError:
             return self._registry.get_service(bundle, reference)
 
+    def get_service_reference_by_id(self, service_id):
+        """
+        Retrieves the reference of the registered service with the given ID
+
+        :param service_id: A service ID
+        :return: The reference of the service, or None
+        """
+        return self._registry.get_service_reference_by_id(service_id)
+
     def get_symbolic_name(self):
         """
         Retrieves the framework symbolic name
@@ -725,14 +831,15 @@ class Framework(Bundle):
                     # Use the given path in priority
                     sys.path.insert(0, path)
 
-                try:
-                    # The module has already been loaded
-                    module = sys.modules[name]
-                except KeyError:
-                    # Load the module
-                    #  __import__(name) -> package level
-                    # import_module -> module level
-                    module = importlib.import_module(name)
+                with trace(self.__tracer, TRACE_INSTALL, name):
+                    try:
+                        # The module has already been loaded
+                        module = sys.modules[name]
+                    except KeyError:
+                        # Load the module
+                        #  __import__(name) -> package level
+                        # import_module -> module level
+                        module = importlib.import_module(name)
             except ImportError as ex:
                 # Error importing the module
                 raise BundleException("Error installing bundle {0}: {1}"
@@ -764,6 +871,135 @@ class Framework(Bundle):
         self._dispatcher.fire_bundle_event(event)
         return bundle
 
+    def install_lazy_bundle(self, name, specifications, path=None):
+        """
+        Declares a bundle which will be installed and started the first time
+        one of the given specifications is requested, i.e. when looking for
+        service references or when registering a service listener with one
+        of those specifications. Its module isn't imported before.
+
+        The lazy bundles are activated only while the framework is running.
+        A lazy bundle which failed to be activated can be declared again.
+
+        :param name: A bundle name
+        :param specifications: The specification(s) provided by the bundle
+                               (a string, a class or a list of them)
+        :param path: Preferred path to load the module
+        :return: True if the bundle has been declared, False if it was already
+                 known
+        :raise BundleException: Invalid specifications
+        """
+        if not isinstance(specifications, (list, tuple, set)):
+            specifications = [specifications]
+
+        specs = set()
+        for spec in specifications:
+            if inspect.isclass(spec):
+                # Keep the type name
+                spec = spec.__name__
+
+            if not spec or not is_string(spec):
+                raise BundleException("Invalid specification: {0}"
+                                      .format(spec))
+
+            specs.add(spec)
+
+        if not specs:
+            raise BundleException("No specification given for lazy bundle {0}"
+                                  .format(name))
+
+        with self.__lazy_lock:
+            if name in self.__lazy_bundles:
+                _logger.warning("Already declared lazy bundle: %s", name)
+                return False
+
+            with self.__bundles_lock:
+                for bundle in self.__bundles.values():
+                    if bundle.get_symbolic_name() == name:
+                        _logger.warning("Already installed bundle: %s", name)
+                        return False
+
+            self.__lazy_failed.pop(name, None)
+            self.__lazy_bundles[name] = (specs, path)
+            for spec in specs:
+                self.__lazy_specs.setdefault(spec, set()).add(name)
+
+            return True
+
+    def get_lazy_bundles(self):
+        """
+        Returns the lazy bundles which haven't been activated yet
+
+        :return: A dictionary: bundle name -> set of specifications
+        """
+        with self.__lazy_lock:
+            return dict((name, specs.copy())
+                        for name, (specs, _) in self.__lazy_bundles.items())
+
+    def get_failed_lazy_bundles(self):
+        """
+        Returns the lazy bundles which failed to be installed or started when
+        they were activated
+
+        :return: A dictionary: bundle name -> set of specifications
+        """
+        with self.__lazy_lock:
+            return dict((name, specs.copy())
+                        for name, specs in self.__lazy_failed.items())
+
+    def _activate_lazy_bundles(self, specification):
+        """
+        Installs and starts the lazy bundles providing the given specification.
+        Does nothing if the framework is not running.
+
+        :param specification: A specification name or class
+        """
+        if not self.__lazy_specs or specification is None:
+            # Nothing to do
+            return
+
+        if hasattr(specification, '__name__'):
+            # Keep the type name
+            specification = specification.__name__
+
+        if specification not in self.__lazy_specs \
+                or self._state not in (Bundle.STARTING, Bundle.ACTIVE):
+            # No lazy bundle for this specification or framework not running
+            return
+
+        with self.__lazy_lock:
+            try:
+                names = sorted(self.__lazy_specs[specification])
+            except KeyError:
+                # Activated by another thread
+                return
+
+            # Forget the bundles before activating them, as they might look
+            # for their own specifications
+            to_activate = []
+            for name in names:
+                specs, path = self.__lazy_bundles.pop(name)
+                for spec in specs:
+                    spec_names = self.__lazy_specs[spec]
+                    spec_names.discard(name)
+                    if not spec_names:
+                        del self.__lazy_specs[spec]
+
+                to_activate.append((name, specs, path))
+
+        # Import and start the bundles without blocking the other lazy
+        # bundles
+        for name, specs, path in to_activate:
+            _logger.debug("Activating lazy bundle %s for %s",
+                          name, specification)
+            try:
+                self.install_bundle(name, path).start()
+            except BundleException as ex:
+                _logger.exception("Error activating lazy bundle %s: %s",
+                                  name, ex)
+                with self.__lazy_lock:
+                    self.__lazy_failed[name] = specs
+
     def install_package(self, path, recursive=False, prefix=None):
         """
         Installs all the modules found in the given package
@@ -896,18 +1132,19 @@ class Framework(Bundle):
 
         return bundles, failed
 
-    def register_service(self, bundle, clazz, service, properties, send_event):
+    @staticmethod
+    def __prepare_service(clazz, service, properties):
         """
-        Registers a service and calls the listeners
+        Checks the parameters of a service registration
 
-        :param bundle: The bundle registering the service
         :param clazz: Name(s) of the interface(s) implemented by service
+        :param service: The service instance
         :param properties: Service properties
-        :param send_event: If not, doesn't trigger a service registered event
-        :return: A ServiceRegistration object
-        :raise BundleException: An error occurred while registering the service
+        :return: A (classes, properties) tuple, where properties is a copy of
+                 the given dictionary
+        :raise BundleException: Invalid registration parameters
         """
-        if bundle is None or service is None or not clazz:
+        if service is None or not clazz:
             raise BundleException("Invalid registration parameters")
 
         if not isinstance(properties, dict):
@@ -937,6 +1174,25 @@ class Framework(Bundle):
             # Class OK
             classes.append(svc_clazz)
 
+        return classes, properties
+
+    def register_service(self, bundle, clazz, service, properties, send_event):
+        """
+        Registers a service and calls the listeners
+
+        :param bundle: The bundle registering the service
+        :param clazz: Name(s) of the interface(s) implemented by service
+        :param properties: Service properties
+        :param send_event: If not, doesn't trigger a service registered event
+        :return: A ServiceRegistration object
+        :raise BundleException: An error occurred while registering the service
+        """
+        if bundle is None:
+            raise BundleException("Invalid registration parameters")
+
+        classes, properties = self.__prepare_service(clazz, service,
+                                                     properties)
+
         # Make the service registration
         registration = self._registry.register(bundle, classes, properties,
                                                service)
@@ -952,6 +1208,49 @@ class Framework(Bundle):
 
         return registration
 
+    def register_services(self, bundle, services, send_event):
+        """
+        Registers several services at once and calls the listeners with a
+        single batch of events
+
+        :param bundle: The bundle registering the services
+        :param services: A list of (clazz, service, properties) tuples
+        :param send_event: If not, doesn't trigger service registered events
+        :return: The list of ServiceRegistration objects, in the same order
+                 as the given services
+        :raise BundleException: Invalid registration parameters (no service
+                                is registered)
+        """
+        if bundle is None:
+            raise BundleException("Invalid registration parameters")
+
+        # Check all services before registering them
+        prepared = []
+        for clazz, service, properties in services:
+            classes, properties = self.__prepare_service(clazz, service,
+                                                         properties)
+            prepared.append((classes, properties, service))
+
+        if not prepared:
+            # Nothing to do
+            return []
+
+        # Make the service registrations
+        registrations = self._registry.register_many(bundle, prepared)
+
+        # Update the bundle registration information
+        for registration in registrations:
+            bundle._registered_service(registration)
+
+        if send_event:
+            # Call the listeners
+            self._dispatcher.fire_service_events(
+                [ServiceEvent(ServiceEvent.REGISTERED,
+                              registration.get_reference())
+                 for registration in registrations])
+
+        return registrations
+
     def start(self):
         """
         Starts the framework
@@ -973,28 +1272,416 @@ class Framework(Bundle):
             self._dispatcher.fire_bundle_event(
                 BundleEvent(BundleEvent.STARTING, self))
 
-            # Start all registered bundles (use a copy, just in case...)
-            for bundle in self.__bundles.copy().values():
-                try:
-                    bundle.start()
-                except FrameworkException as ex:
-                    # Important error
-                    _logger.exception("Important error starting bundle: %s",
-                                      bundle)
-                    if ex.needs_stop:
-                        # Stop the framework (has to be in active state)
-                        self._state = Bundle.ACTIVE
-                        self.stop()
-                        return False
+            # Start the registered bundles, level by level
+            with trace(self.__tracer, TRACE_FRAMEWORK,
+                       self.get_symbolic_name()):
+                needs_stop = self.__start_framework_bundles()
 
-                except BundleException:
-                    # A bundle failed to start : just log
-                    _logger.exception("Error starting bundle: %s", bundle)
+            if needs_stop:
+                # Stop the framework (has to be in active state)
+                self._state = Bundle.ACTIVE
+                self.stop()
+                return False
 
             # Bundle is now active
             self._state = Bundle.ACTIVE
             return True
 
+    def __start_framework_bundles(self):
+        """
+        Starts the installed bundles up to the beginning start level
+
+        :return: True if the framework must be stopped
+        """
+        self.__start_timings = {}
+        beginning_level = self.get_property(
+            FRAMEWORK_BEGINNING_START_LEVEL) or DEFAULT_START_LEVEL
+        try:
+            beginning_level = _check_start_level(beginning_level)
+        except ValueError as ex:
+            _logger.warning("Invalid beginning start level: %s", ex)
+            beginning_level = DEFAULT_START_LEVEL
+
+        return self.__raise_start_level(beginning_level)
+
+    def get_start_level(self):
+        """
+        Retrieves the active start level of the framework, i.e. the highest
+        start level of the bundles it started.
+
+        :return: The active start level (0 if the framework is stopped)
+        """
+        return self.__start_level
+
+    def set_start_level(self, level):
+        """
+        Raises or lowers the active start level of the framework.
+
+        When raising the level, the bundles are started level by level: the
+        bundles with the lowest start level first. When lowering it, the
+        active bundles with a start level higher than the new one are stopped,
+        the highest start level first.
+
+        :param level: The new start level
+        :raise ValueError: Invalid start level
+        :raise BundleException: The framework is not active
+        """
+        level = _check_start_level(level)
+        with self._lock:
+            if self._state != Bundle.ACTIVE:
+                raise BundleException("The framework must be active to change "
+                                      "its start level")
+
+            if level > self.__start_level:
+                if self.__raise_start_level(level):
+                    # Stop the framework
+                    self.stop()
+            elif level < self.__start_level:
+                self.__lower_start_level(level)
+
+    def __raise_start_level(self, level):
+        """
+        Starts the installed bundles with a start level between the active
+        one and the given one, level by level
+
+        :param level: The new start level
+        :return: True if the framework must be stopped
+        """
+        bundles = list(self.__bundles.copy().values())
+        levels = sorted(set(
+            bundle.get_start_level() for bundle in bundles
+            if self.__start_level < bundle.get_start_level() <= level))
+
+        for wave_level in levels:
+            self.__start_level = wave_level
+            wave = [bundle for bundle in bundles
+                    if bundle.get_start_level() == wave_level and
+                    bundle.get_state() == Bundle.RESOLVED]
+            if self.__start_wave(wave):
+                return True
+
+            if self._state not in (Bundle.STARTING, Bundle.ACTIVE):
+                # The framework has been stopped by a bundle
+                return False
+
+        self.__start_level = level
+        return False
+
+    def __lower_start_level(self, level):
+        """
+        Stops the active bundles with a start level higher than the given one,
+        level by level
+
+        :param level: The new start level (0 to stop all bundles)
+        """
+        bundles = list(self.__bundles.copy().values())
+        levels = sorted(set(bundle.get_start_level() for bundle in bundles
+                            if bundle.get_start_level() > level),
+                        reverse=True)
+
+        for wave_level in levels:
+            wave = [bundle for bundle in bundles
+                    if bundle.get_start_level() == wave_level]
+
+            # Stop bundles in the reverse order of their start
+            for bundle in reversed(self.__sort_bundles(wave)):
+                if bundle.get_state() != Bundle.ACTIVE:
+                    # Ignore inactive bundle
+                    continue
+
+                try:
+                    bundle.stop()
+                except Exception as ex:
+                    # Just log exceptions
+                    _logger.exception("Error stopping bundle %s: %s",
+                                      bundle.get_symbolic_name(), ex)
+
+            self.__start_level = min(self.__start_level, wave_level - 1)
+
+        self.__start_level = level
+
+    def __start_wave(self, bundles):
+        """
+        Starts the given bundles, following their requirements, sequentially
+        or in parallel according to the FRAMEWORK_PARALLEL_START property
+
+        :param bundles: The bundles to start
+        :return: True if the framework must be stopped
+        """
+        bundles = self.__sort_bundles(bundles)
+        nb_threads = self.__get_parallel_start_threads()
+        if nb_threads > 1 and len(bundles) > 1:
+            return self.__start_bundles_parallel(bundles, nb_threads)
+
+        return self.__start_bundles(bundles)
+
+    def __get_parallel_start_threads(self):
+        """
+        Returns the number of threads to use to start the bundles, according
+        to the FRAMEWORK_PARALLEL_START property
+
+        :return: The number of threads (1 to start bundles sequentially)
+        """
+        value = self.get_property(FRAMEWORK_PARALLEL_START)
+        if not value:
+            return 1
+
+        try:
+            return max(int(value), 1)
+        except (TypeError, ValueError):
+            _logger.warning("Invalid value for %s: %s",
+                            FRAMEWORK_PARALLEL_START, value)
+            return 1
+
+    @staticmethod
+    def __get_requirements(bundles):
+        """
+        Computes the requirements of the given bundles, using the
+        BUNDLE_REQUIRES member of their module.
+        Requirements on bundles which are not in the given list are ignored.
+
+        :param bundles: A list of bundles
+        :return: A dictionary: Bundle -> set of required Bundle objects
+        """
+        names = dict((bundle.get_symbolic_name(), bundle)
+                     for bundle in bundles)
+        requirements = {}
+        for bundle in bundles:
+            required = getattr(bundle.get_module(), BUNDLE_REQUIRES, None) \
+                or ()
+            if is_string(required):
+                required = (required,)
+
+            requirements[bundle] = set(
+                names[name] for name in required
+                if name in names and names[name] is not bundle)
+
+        return requirements
+
+    def __sort_bundles(self, bundles):
+        """
+        Sorts the given bundles by ID, making sure that required bundles come
+        before the bundles requiring them. Requirement cycles are broken by
+        bundle ID.
+
+        :param bundles: A list of bundles
+        :return: The sorted list of bundles
+        """
+        bundles = sorted(bundles, key=lambda bundle: bundle.get_bundle_id())
+        requirements = self.__get_requirements(bundles)
+
+        # Kahn's algorithm, using a heap to keep the order of IDs
+        remaining = dict((bundle, len(required))
+                         for bundle, required in requirements.items())
+        dependents = dict((bundle, []) for bundle in bundles)
+        for bundle, required in requirements.items():
+            for req_bundle in required:
+                dependents[req_bundle].append(bundle)
+
+        heap = [(bundle.get_bundle_id(), bundle) for bundle in bundles
+                if not remaining[bundle]]
+        heapq.heapify(heap)
+
+        result = []
+        while len(result) < len(bundles):
+            if not heap:
+                # Requirement cycle: take the remaining bundle with the
+                # lowest ID
+                bundle = min((bundle for bundle in bundles
+                              if remaining[bundle] > 0),
+                             key=lambda bundle: bundle.get_bundle_id())
+                _logger.warning("Requirement cycle detected around bundle %s",
+                                bundle)
+                remaining[bundle] = 0
+                heapq.heappush(heap, (bundle.get_bundle_id(), bundle))
+
+            _, bundle = heapq.heappop(heap)
+            if remaining[bundle] < 0:
+                # Already handled (cycle)
+                continue
+
+            remaining[bundle] = -1
+            result.append(bundle)
+            for dependent in dependents[bundle]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    heapq.heappush(heap, (dependent.get_bundle_id(),
+                                          dependent))
+
+        return result
+
+    def __timed_start(self, bundle):
+        """
+        Starts the given bundle and stores the duration of its start
+
+        :param bundle: The bundle to start
+        :raise BundleException: Error starting the bundle
+        """
+        start = time.time()
+        try:
+            bundle.start()
+        finally:
+            self.__start_timings[bundle] = time.time() - start
+
+    def __start_bundles(self, bundles):
+        """
+        Starts the given bundles one after the other
+
+        :param bundles: The sorted list of bundles to start
+        :return: True if the framework must be stopped
+        """
+        for bundle in bundles:
+            try:
+                self.__timed_start(bundle)
+            except FrameworkException as ex:
+                # Important error
+                _logger.exception("Important error starting bundle: %s",
+                                  bundle)
+                if ex.needs_stop:
+                    return True
+
+            except BundleException:
+                # A bundle failed to start : just log
+                _logger.exception("Error starting bundle: %s", bundle)
+
+        return False
+
+    def __parallel_start_task(self, bundle, results, condition):
+        """
+        Starts a bundle in a thread of the pool used by
+        __start_bundles_parallel()
+
+        :param bundle: The bundle to start
+        :param results: The list where to append the (bundle, exception) tuple
+        :param condition: The condition notified once the result is stored
+        """
+        try:
+            self.__timed_start(bundle)
+        except FrameworkException as ex:
+            # Important error
+            _logger.exception("Important error starting bundle: %s", bundle)
+            result = (bundle, ex)
+        except Exception as ex:
+            # A bundle failed to start : just log
+            _logger.exception("Error starting bundle: %s", bundle)
+            result = (bundle, ex)
+        else:
+            result = (bundle, None)
+
+        with condition:
+            results.append(result)
+            condition.notify()
+
+    def __start_bundles_parallel(self, bundles, nb_threads):
+        """
+        Starts the given bundles using a pool of threads. A bundle is started
+        once all the bundles it requires have been started. If one of them
+        failed to start, the bundle isn't started.
+
+        The framework lock is released while waiting for the bundles, so that
+        their activators can call the framework methods, e.g. stop().
+
+        :param bundles: The sorted list of bundles to start
+        :param nb_threads: The number of threads to use
+        :return: True if the framework must be stopped
+        """
+        # Only keep requirements on bundles sorted before, to avoid cycles
+        order = dict((bundle, idx) for idx, bundle in enumerate(bundles))
+        all_requirements = self.__get_requirements(bundles)
+        requirements = {}
+        dependents = dict((bundle, []) for bundle in bundles)
+        for bundle in bundles:
+            requirements[bundle] = set(
+                req_bundle for req_bundle in all_requirements[bundle]
+                if order[req_bundle] < order[bundle])
+            for req_bundle in requirements[bundle]:
+                dependents[req_bundle].append(bundle)
+
+        remaining = dict((bundle, len(required))
+                         for bundle, required in requirements.items())
+
+        results = []
+        condition = threading.Condition(self._lock)
+        failed = set()
+        needs_stop = False
+        stopped = False
+        nb_running = 0
+
+        pool = ThreadPool(nb_threads, logname="pelix-framework-start")
+        pool.start()
+        try:
+            for bundle in bundles:
+                if not remaining[bundle]:
+                    pool.enqueue(self.__parallel_start_task, bundle, results,
+                                 condition)
+                    nb_running += 1
+
+            while nb_running:
+                with condition:
+                    while not results:
+                        # Releases the framework lock, even if it has been
+                        # acquired more than once
+                        condition.wait()
+                    bundle, exception = results.pop(0)
+                nb_running -= 1
+
+                if exception is not None:
+                    failed.add(bundle)
+                    if isinstance(exception, FrameworkException):
+                        needs_stop = needs_stop or exception.needs_stop
+
+                if self._state not in (Bundle.STARTING, Bundle.ACTIVE):
+                    # The framework has been stopped by a bundle
+                    stopped = True
+                    if exception is None:
+                        # Started after the others have been stopped
+                        try:
+                            bundle.stop()
+                        except BundleException as ex:
+                            _logger.exception("Error stopping bundle %s: %s",
+                                              bundle, ex)
+
+                # Check the bundles requiring this one
+                done = [bundle]
+                while done:
+                    for dependent in dependents[done.pop()]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] or needs_stop or stopped:
+                            continue
+
+                        if failed.isdisjoint(requirements[dependent]):
+                            pool.enqueue(self.__parallel_start_task,
+                                         dependent, results, condition)
+                            nb_running += 1
+                        else:
+                            # A required bundle failed to start
+                            _logger.error("Bundle %s not started: one of "
+                                          "its requirements failed", dependent)
+                            failed.add(dependent)
+                            done.append(dependent)
+        finally:
+            pool.stop()
+
+        return needs_stop
+
+    def get_startup_tracer(self):
+        """
+        Returns the startup tracer of the framework, if it has been enabled by
+        the FRAMEWORK_STARTUP_TRACER property
+
+        :return: A StartupTracer object, or None
+        """
+        return self.__tracer
+
+    def get_start_timings(self):
+        """
+        Returns the time spent starting each bundle during the last start of
+        the framework
+
+        :return: A dictionary: Bundle -> duration of its start (in seconds)
+        """
+        return self.__start_timings.copy()
+
     def stop(self):
         """
         Stops the framework
@@ -1018,21 +1705,8 @@ class Framework(Bundle):
             # Notify listeners that the bundle is stopping
             self._dispatcher.fire_framework_stopping()
 
-            bid = self.__next_bundle_id - 1
-            while bid > 0:
-                bundle = self.__bundles.get(bid)
-                bid -= 1
-
-                if bundle is None or bundle.get_state() != Bundle.ACTIVE:
-                    # Ignore inactive bundle
-                    continue
-
-                try:
-                    bundle.stop()
-                except Exception as ex:
-                    # Just log exceptions
-                    _logger.exception("Error stopping bundle %s: %s",
-                                      bundle.get_symbolic_name(), ex)
+            # Stop bundles level by level, in the reverse order of their start
+            self.__lower_start_level(0)
 
             # Framework is now stopped
             self._state = Bundle.RESOLVED
@@ -1128,6 +1802,45 @@ class Framework(Bundle):
         del self.__unregistering_services[reference]
         return True
 
+    def unregister_services(self, registrations):
+        """
+        Unregisters several services at once and calls the listeners with a
+        single batch of events
+
+        :param registrations: A list of ServiceRegistration objects
+        :raise BundleException: Invalid reference (no service is unregistered)
+        """
+        registrations = list(registrations)
+        references = []
+        for registration in registrations:
+            assert isinstance(registration, ServiceRegistration)
+            references.append(registration.get_reference())
+
+        if not references:
+            # Nothing to do
+            return True
+
+        # Remove the services from the registry
+        svc_instances = self._registry.unregister_many(references)
+
+        # Keep a track of the unregistering references
+        for reference, svc_instance in zip(references, svc_instances):
+            self.__unregistering_services[reference] = svc_instance
+
+        # Call the listeners
+        self._dispatcher.fire_service_events(
+            [ServiceEvent(ServiceEvent.UNREGISTERING, reference)
+             for reference in references])
+
+        for registration, reference in zip(registrations, references):
+            # Update the bundle registration information
+            reference.get_bundle()._unregistered_service(registration)
+
+            # Remove the unregistering reference
+            del self.__unregistering_services[reference]
+
+        return True
+
     def _hide_bundle_services(self, bundle):
         """
         Hides the services of the given bundle in the service registry
@@ -1249,6 +1962,20 @@ class BundleContext(object):
                '''
                # ...
 
+        It can also have the following method, which will be called instead
+        of service_changed() when a batch of events is fired, e.g. by
+        register_services():
+
+        .. python::
+
+           def services_changed(self, events):
+               '''
+               Called by Pelix when a batch of service events is fired
+
+               events: The list of ServiceEvent objects matching the listener
+               '''
+               # ...
+
         :param listener: The listener to register
         :param ldap_filter: Filter that must match the service properties
                             (optional, None to accept all services)
@@ -1256,6 +1983,11 @@ class BundleContext(object):
                               (optional, None to accept all services)
         :return: True if the listener has been successfully registered
         """
+        # Activate the lazy bundles providing the specification, if any.
+        # As for any service registered before the listener, the listener
+        # has to look for the services provided by those bundles.
+        self.__framework._activate_lazy_bundles(specification)
+
         return self.__framework._dispatcher.add_service_listener(
             listener, specification, ldap_filter)
 
@@ -1327,6 +2059,17 @@ class BundleContext(object):
         return self.__framework.find_service_references(
             clazz, ldap_filter, True)
 
+    def get_service_reference_by_id(self, service_id):
+        """
+        Returns the ServiceReference object of the registered service with the
+        given ID. This is faster than looking for the service with a
+        ``service.id`` filter.
+
+        :param service_id: A service ID
+        :return: A service reference, None if not found
+        """
+        return self.__framework.get_service_reference_by_id(service_id)
+
     def get_service_references(self, clazz, ldap_filter=None):
         """
         Returns the service references for services that were registered under
@@ -1363,6 +2106,21 @@ class BundleContext(object):
         """
         return self.__framework.install_bundle(name, path)
 
+    def install_lazy_bundle(self, name, specifications, path=None):
+        """
+        Declares a bundle which will be installed and started the first time
+        one of the given specifications is requested. Its module isn't
+        imported before.
+
+        :param name: The name of the bundle to install
+        :param specifications: The specification(s) provided by the bundle
+        :param path: Preferred path to load the module
+        :return: True if the bundle has been declared, False if it was already
+                 known
+        :raise BundleException: Invalid specifications
+        """
+        return self.__framework.install_lazy_bundle(name, specifications, path)
+
     def install_package(self, path, recursive=False):
         """
         Installs all the modules found in the given package
@@ -1408,6 +2166,21 @@ class BundleContext(object):
         return self.__framework.register_service(
             self.__bundle, clazz, service, properties, send_event)
 
+    def register_services(self, services, send_event=True):
+        """
+        Registers several services at once. The service listeners are notified
+        of the registrations with a single batch of events.
+
+        :param services: A list of (clazz, service, properties) tuples
+        :param send_event: If not, doesn't trigger service registered events
+        :return: The list of ServiceRegistration objects, in the same order
+                 as the given services
+        :raise BundleException: An error occurred while registering the
+                                services (no service is registered)
+        """
+        return self.__framework.register_services(
+            self.__bundle, services, send_event)
+
     def remove_bundle_listener(self, listener):
         """
         Unregisters a bundle listener
@@ -1445,6 +2218,17 @@ class BundleContext(object):
         return self.__framework._registry.unget_service(
             self.__bundle, reference)
 
+    def unregister_services(self, registrations):
+        """
+        Unregisters several services at once. The service listeners are
+        notified of the unregistrations with a single batch of events.
+
+        :param registrations: A list of ServiceRegistration objects
+        :return: True on success
+        :raise BundleException: Unknown service (no service is unregistered)
+        """
+        return self.__framework.unregister_services(registrations)
+
 # ------------------------------------------------------------------------------
 
 
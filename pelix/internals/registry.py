@@ -30,9 +30,23 @@ import bisect
 import logging
 import threading
 
+try:
+    # Python 3.3+
+    from types import MappingProxyType
+except ImportError:
+    # Python 2: see _PropertiesView
+    MappingProxyType = None
+
+try:
+    # Python 3.3+
+    from collections.abc import Mapping
+except ImportError:
+    # Python 2
+    from collections import Mapping
+
 # Pelix beans
 from pelix.constants import OBJECTCLASS, SERVICE_ID, SERVICE_RANKING, \
-    BundleException
+    REGISTRY_DEFAULT_INDEXES, BundleException
 from pelix.internals.events import ServiceEvent
 
 # Pelix utility modules
@@ -51,6 +65,70 @@ __docformat__ = "restructuredtext en"
 # ------------------------------------------------------------------------------
 
 
+class _PropertiesView(Mapping):
+    """
+    Read-only view of a dictionary, used when types.MappingProxyType is
+    missing (Python 2)
+    """
+    __slots__ = ('__dict',)
+
+    def __init__(self, dictionary):
+        """
+        Sets up the view
+
+        :param dictionary: The viewed dictionary
+        """
+        self.__dict = dictionary
+
+    def __getitem__(self, key):
+        """
+        Returns the value associated to the given key
+        """
+        return self.__dict[key]
+
+    def __contains__(self, key):
+        """
+        Tests if the given key is in the dictionary
+        """
+        return key in self.__dict
+
+    def __iter__(self):
+        """
+        Iterates over the keys of the dictionary
+        """
+        return iter(self.__dict)
+
+    def __len__(self):
+        """
+        Returns the size of the dictionary
+        """
+        return len(self.__dict)
+
+    def __repr__(self):
+        """
+        String representation
+        """
+        return "{0}({1!r})".format(type(self).__name__, self.__dict)
+
+    def get(self, key, default=None):
+        """
+        Returns the value associated to the given key, or the default one
+        """
+        return self.__dict.get(key, default)
+
+    def copy(self):
+        """
+        Returns a shallow copy of the dictionary
+        """
+        return self.__dict.copy()
+
+
+if MappingProxyType is None:
+    MappingProxyType = _PropertiesView
+
+# ------------------------------------------------------------------------------
+
+
 class _UsageCounter(object):
     """
     Simple reference usage counter
@@ -108,6 +186,8 @@ class ServiceReference(object):
                     .format(mandatory))
 
         # Properties lock (used by ServiceRegistration too)
+        # The properties dictionary is never modified: it is replaced by
+        # ServiceRegistration.set_properties(), hence reads are not locked
         self._props_lock = threading.RLock()
 
         # Usage lock
@@ -116,6 +196,7 @@ class ServiceReference(object):
         # Service details
         self.__bundle = bundle
         self.__properties = properties
+        self.__view = MappingProxyType(properties)
         self.__service_id = properties[SERVICE_ID]
 
         # Bundle object -> Usage Counter object
@@ -199,8 +280,29 @@ class ServiceReference(object):
 
         :return: A copy of the service properties
         """
-        with self._props_lock:
-            return self.__properties.copy()
+        return self.__properties.copy()
+
+    def properties_view(self):
+        """
+        Returns a read-only view of the service properties, without copying
+        them. The view is a snapshot: it won't reflect the future
+        modifications of the service properties.
+
+        :return: A read-only mapping of the service properties
+        """
+        return self.__view
+
+    def _set_properties(self, properties):
+        """
+        Replaces the service properties dictionary, which must not be modified
+        afterwards.
+        This method should only be used by the framework, holding the
+        properties lock.
+
+        :param properties: The new service properties
+        """
+        self.__properties = properties
+        self.__view = MappingProxyType(properties)
 
     def get_property(self, name):
         """
@@ -208,8 +310,7 @@ class ServiceReference(object):
 
         :return: The property value, None if not found
         """
-        with self._props_lock:
-            return self.__properties.get(name)
+        return self.__properties.get(name)
 
     def get_property_keys(self):
         """
@@ -217,8 +318,7 @@ class ServiceReference(object):
 
         :return: An array of property keys.
         """
-        with self._props_lock:
-            return tuple(self.__properties.keys())
+        return tuple(self.__properties.keys())
 
     def unused_by(self, bundle):
         """
@@ -289,19 +389,17 @@ class ServiceRegistration(object):
     """
     Represents a service registration object
     """
-    def __init__(self, framework, reference, properties, update_callback):
+    def __init__(self, framework, reference, update_callback):
         """
         Sets up the service registration object
 
         :param framework: The host framework
         :param reference: A service reference
-        :param properties: A reference to the ServiceReference properties
-                           dictionary object
-        :param update_callback: Method to call when the sort key is modified
+        :param update_callback: Method to call when the properties have been
+                                modified
         """
         self.__framework = framework
         self.__reference = reference
-        self.__properties = properties
         self.__update_callback = update_callback
 
     def __str__(self):
@@ -335,9 +433,10 @@ class ServiceRegistration(object):
             except KeyError:
                 pass
 
+        current = self.__reference.properties_view()
         to_delete = []
         for key, value in properties.items():
-            if self.__properties.get(key) == value:
+            if current.get(key) == value:
                 # No update
                 to_delete.append(key)
 
@@ -360,13 +459,14 @@ class ServiceRegistration(object):
             pass
 
         with self.__reference._props_lock:
-            # Update the properties
-            previous = self.__properties.copy()
-            self.__properties.update(properties)
+            # Replace the properties by an updated copy
+            previous = self.__reference.get_properties()
+            new_properties = previous.copy()
+            new_properties.update(properties)
+            self.__reference._set_properties(new_properties)
 
-            if self.__reference.needs_sort_update():
-                # The sort key and the registry must be updated
-                self.__update_callback(self.__reference)
+            # Update the registry (sort key and indexes)
+            self.__update_callback(self.__reference)
 
             # Trigger a new computation in the framework
             event = ServiceEvent(ServiceEvent.MODIFIED, self.__reference,
@@ -388,7 +488,7 @@ class _Listener(object):
     Keeps information about a listener
     """
     # Try to reduce memory footprint (stored instances)
-    __slots__ = ('listener', 'specification', 'ldap_filter')
+    __slots__ = ('listener', 'specification', 'ldap_filter', 'matcher')
 
     def __init__(self, listener, specification, ldap_filter):
         """
@@ -402,6 +502,12 @@ class _Listener(object):
         self.specification = specification
         self.ldap_filter = ldap_filter
 
+        # Compiled version of the filter
+        if ldap_filter is not None:
+            self.matcher = ldap_filter.compile()
+        else:
+            self.matcher = None
+
 
 class EventDispatcher(object):
     """
@@ -420,8 +526,10 @@ class EventDispatcher(object):
         self.__bnd_listeners = []
         self.__bnd_lock = threading.Lock()
 
-        # Service listeners (specification -> listener bean)
+        # Service listeners (specification -> tuple of listener beans)
         self.__svc_listeners = {}
+        # Specifications tuple -> tuple of listener beans (cache)
+        self.__svc_snapshots = {}
         # listener instance -> listener bean
         self.__listeners_data = {}
         self.__svc_lock = threading.Lock()
@@ -439,6 +547,7 @@ class EventDispatcher(object):
 
         with self.__svc_lock:
             self.__svc_listeners.clear()
+            self.__svc_snapshots = {}
 
         with self.__fw_lock:
             self.__fw_listeners = []
@@ -517,7 +626,9 @@ class EventDispatcher(object):
 
             stored = _Listener(listener, specification, ldap_filter)
             self.__listeners_data[listener] = stored
-            self.__svc_listeners.setdefault(specification, []).append(stored)
+            self.__svc_listeners[specification] = \
+                self.__svc_listeners.get(specification, ()) + (stored,)
+            self.__svc_snapshots = {}
             return True
 
     def remove_bundle_listener(self, listener):
@@ -558,14 +669,20 @@ class EventDispatcher(object):
         with self.__svc_lock:
             try:
                 data = self.__listeners_data.pop(listener)
-                spec_listeners = self.__svc_listeners[data.specification]
-                spec_listeners.remove(data)
-                if not spec_listeners:
-                    del self.__svc_listeners[data.specification]
-                return True
             except KeyError:
                 return False
 
+            spec_listeners = tuple(
+                stored for stored in self.__svc_listeners[data.specification]
+                if stored is not data)
+            if spec_listeners:
+                self.__svc_listeners[data.specification] = spec_listeners
+            else:
+                del self.__svc_listeners[data.specification]
+
+            self.__svc_snapshots = {}
+            return True
+
     def fire_bundle_event(self, event):
         """
         Notifies bundle events listeners of a new event in the calling thread.
@@ -599,15 +716,55 @@ class EventDispatcher(object):
                 self._logger.exception("An error occurred calling one of the "
                                        "framework stop listeners")
 
-    def fire_service_event(self, event):
+    def __get_service_listeners(self, svc_specs):
         """
-        Notifies service events listeners of a new event in the calling thread.
+        Returns the listeners interested in a service providing the given
+        specifications. The result is computed once per set of specifications
+        and kept until a service listener is added or removed.
+
+        :param svc_specs: The specifications provided by the service
+        :return: A tuple of listener beans
+        """
+        key = tuple(svc_specs)
+        snapshots = self.__svc_snapshots
+        try:
+            return snapshots[key]
+        except KeyError:
+            pass
+
+        with self.__svc_lock:
+            snapshots = self.__svc_snapshots
+            try:
+                # Computed while we were waiting for the lock
+                return snapshots[key]
+            except KeyError:
+                pass
+
+            listeners = []
+            known = set()
+            for spec in key + (None,):
+                for data in self.__svc_listeners.get(spec, ()):
+                    # A listener is registered for a single specification,
+                    # but the service can provide it more than once
+                    if data not in known:
+                        known.add(data)
+                        listeners.append(data)
+
+            listeners = snapshots[key] = tuple(listeners)
+            return listeners
+
+    def __match_listeners(self, event):
+        """
+        Yields the listeners which must be notified of the given event, with
+        the event to send them: the given one or its MODIFIED_ENDMATCH
+        counterpart
 
         :param event: The service event
+        :return: A generator of (listener bean, event) tuples
         """
-        # Get the service properties
-        properties = event.get_service_reference().get_properties()
-        svc_specs = properties[OBJECTCLASS]
+        # Filters are tested against the properties of the service, not a copy
+        reference = event.get_service_reference()
+        properties = reference.properties_view()
         previous = None
         endmatch_event = None
         svc_modified = (event.get_kind() == ServiceEvent.MODIFIED)
@@ -616,48 +773,75 @@ class EventDispatcher(object):
             # Modified service event : prepare the end match event
             previous = event.get_previous_properties()
             endmatch_event = ServiceEvent(ServiceEvent.MODIFIED_ENDMATCH,
-                                          event.get_service_reference(),
-                                          previous)
-
-        with self.__svc_lock:
-            # Get the listeners for this specification
-            listeners = set()
-            for spec in svc_specs:
-                try:
-                    listeners.update(self.__svc_listeners[spec])
-                except KeyError:
-                    pass
-
-            # Add those which listen to any specification
-            try:
-                listeners.update(self.__svc_listeners[None])
-            except KeyError:
-                pass
+                                          reference, previous)
 
         # Get the listeners for this specification
-        for data in listeners:
-            # Default event to send : the one we received
-            sent_event = event
-
+        for data in self.__get_service_listeners(properties[OBJECTCLASS]):
             # Test if the service properties matches the filter
-            ldap_filter = data.ldap_filter
-            if ldap_filter is not None \
-                    and not ldap_filter.matches(properties):
-                # Event doesn't match listener filter...
-                if svc_modified and previous is not None \
-                        and ldap_filter.matches(previous):
-                    # ... but previous properties did match
-                    sent_event = endmatch_event
-                else:
-                    # Didn't match before either, ignore it
-                    continue
+            matcher = data.matcher
+            if matcher is None or matcher(properties):
+                # Default event to send : the one we received
+                yield data, event
+            elif svc_modified and previous is not None and matcher(previous):
+                # Event doesn't match listener filter, but previous
+                # properties did match
+                yield data, endmatch_event
+
+    def fire_service_event(self, event):
+        """
+        Notifies service events listeners of a new event in the calling thread.
 
+        :param event: The service event
+        """
+        for data, sent_event in self.__match_listeners(event):
             # Call'em
             try:
                 data.listener.service_changed(sent_event)
             except:
                 self._logger.exception("Error calling a service listener")
 
+    def fire_service_events(self, events):
+        """
+        Notifies service events listeners of a list of events in the calling
+        thread.
+
+        Listeners implementing a ``services_changed(events)`` method receive
+        all the events they match at once, others are notified of each event
+        through their ``service_changed(event)`` method.
+
+        :param events: The list of service events
+        """
+        # Listener bean -> list of events, in order of first match
+        batches = {}
+        listeners = []
+        for event in events:
+            for data, sent_event in self.__match_listeners(event):
+                try:
+                    batches[data].append(sent_event)
+                except KeyError:
+                    batches[data] = [sent_event]
+                    listeners.append(data)
+
+        for data in listeners:
+            listener = data.listener
+            listener_events = batches[data]
+            try:
+                services_changed = listener.services_changed
+            except AttributeError:
+                # Notify each event
+                for sent_event in listener_events:
+                    try:
+                        listener.service_changed(sent_event)
+                    except:
+                        self._logger.exception(
+                            "Error calling a service listener")
+            else:
+                # Notify the whole batch
+                try:
+                    services_changed(listener_events)
+                except:
+                    self._logger.exception("Error calling a service listener")
+
 # ------------------------------------------------------------------------------
 
 
@@ -667,12 +851,14 @@ class ServiceRegistry(object):
 
     Associates service references to instances and bundles.
     """
-    def __init__(self, framework, logger=None):
+    def __init__(self, framework, logger=None, indexes=None):
         """
         Sets up the registry
 
         :param framework: Associated framework
         :param logger: Logger to use
+        :param indexes: Names of the indexed service properties, as a list or
+                        a comma-separated string (None for the default ones)
         """
         # Associated framework
         self.__framework = framework
@@ -686,6 +872,9 @@ class ServiceRegistry(object):
         # Service reference -> Service instance
         self.__svc_registry = {}
 
+        # Service ID -> Service reference (visible services only)
+        self.__svc_ids = {}
+
         # Specification -> Service references[] (always sorted)
         self.__svc_specs = {}
 
@@ -701,17 +890,39 @@ class ServiceRegistry(object):
         # Pending unregistration: Service reference -> Service instance
         self.__pending_services = {}
 
+        # Property name -> {Value key -> set(Service references)}
+        if indexes is None:
+            indexes = REGISTRY_DEFAULT_INDEXES
+        elif is_string(indexes):
+            indexes = indexes.split(',')
+
+        self.__indexes = dict((name.strip(), {}) for name in indexes
+                              if name and name.strip())
+
+        # Service reference -> {Property name -> Indexed value}
+        self.__indexed_values = {}
+
+        # The indexes are updated while holding a service properties lock:
+        # no other lock must be acquired while holding this one
+        self.__index_lock = threading.Lock()
+
     def clear(self):
         """
         Clears the registry
         """
         with self.__svc_lock:
             self.__svc_registry.clear()
+            self.__svc_ids.clear()
             self.__svc_specs.clear()
             self.__bundle_svc.clear()
             self.__bundle_imports.clear()
             self.__pending_services.clear()
 
+            with self.__index_lock:
+                self.__indexed_values.clear()
+                for index in self.__indexes.values():
+                    index.clear()
+
     def register(self, bundle, classes, properties, svc_instance):
         """
         Registers a service.
@@ -740,10 +951,14 @@ class ServiceRegistry(object):
 
             # Make the service registration
             svc_registration = ServiceRegistration(
-                self.__framework, svc_ref, properties, self.__sort_registry)
+                self.__framework, svc_ref, self.__properties_updated)
 
             # Store service information
             self.__svc_registry[svc_ref] = svc_instance
+            self.__svc_ids[service_id] = svc_ref
+
+            with self.__index_lock:
+                self.__index_reference(svc_ref, properties)
 
             for spec in classes:
                 spec_refs = self.__svc_specs.setdefault(spec, [])
@@ -754,6 +969,187 @@ class ServiceRegistry(object):
             bundle_services.add(svc_ref)
             return svc_registration
 
+    def register_many(self, bundle, services):
+        """
+        Registers several services at once: the registry is locked once and
+        each list of references per specification is sorted once.
+
+        :param bundle: The bundle that registers the services
+        :param services: A list of (classes, properties, instance) tuples
+        :return: The list of ServiceRegistration objects, in the same order
+                 as the given services
+        """
+        registrations = []
+        with self.__svc_lock:
+            bundle_services = self.__bundle_svc.setdefault(bundle, set())
+            modified_specs = set()
+
+            for classes, properties, svc_instance in services:
+                # Prepare properties
+                service_id = self.__next_service_id
+                self.__next_service_id += 1
+                properties[OBJECTCLASS] = classes
+                properties[SERVICE_ID] = service_id
+
+                # Force to have a valid service ranking
+                try:
+                    properties[SERVICE_RANKING] = \
+                        int(properties[SERVICE_RANKING])
+                except (KeyError, ValueError, TypeError):
+                    properties[SERVICE_RANKING] = 0
+
+                svc_ref = ServiceReference(bundle, properties)
+                registrations.append(ServiceRegistration(
+                    self.__framework, svc_ref, self.__properties_updated))
+
+                # Store service information
+                self.__svc_registry[svc_ref] = svc_instance
+                self.__svc_ids[service_id] = svc_ref
+                bundle_services.add(svc_ref)
+
+                with self.__index_lock:
+                    self.__index_reference(svc_ref, properties)
+
+                for spec in classes:
+                    self.__svc_specs.setdefault(spec, []).append(svc_ref)
+                modified_specs.update(classes)
+
+            # Sort the modified specifications lists
+            for spec in modified_specs:
+                self.__svc_specs[spec].sort()
+
+            if not bundle_services:
+                # Nothing was registered
+                del self.__bundle_svc[bundle]
+
+        return registrations
+
+    @staticmethod
+    def __index_keys(value):
+        """
+        Computes the keys of the given property value in an index, following
+        the behavior of the LDAP equality comparator
+
+        :param value: A property value
+        :return: The set of index keys for this value
+        """
+        if isinstance(value, ldapfilter.ITERABLES):
+            # Each item can match
+            return set(item if is_string(item) else repr(item)
+                       for item in value)
+        elif is_string(value):
+            return set((value,))
+        else:
+            # String representation is used by the LDAP comparator
+            return set((repr(value),))
+
+    def __index_reference(self, svc_ref, properties):
+        """
+        Adds the given reference to the indexes.
+        The index lock must be held by the caller.
+
+        :param svc_ref: A service reference
+        :param properties: The service properties
+        """
+        indexed = {}
+        for name, index in self.__indexes.items():
+            if name in properties:
+                value = indexed[name] = properties[name]
+                for key in self.__index_keys(value):
+                    index.setdefault(key, set()).add(svc_ref)
+
+        # Keep track of the indexed values
+        self.__indexed_values[svc_ref] = indexed
+
+    def __unindex_reference(self, svc_ref):
+        """
+        Removes the given reference from the indexes.
+        The index lock must be held by the caller.
+
+        :param svc_ref: A service reference
+        :return: True if the reference was indexed
+        """
+        try:
+            indexed = self.__indexed_values.pop(svc_ref)
+        except KeyError:
+            # Not indexed
+            return False
+
+        for name, value in indexed.items():
+            index = self.__indexes[name]
+            for key in self.__index_keys(value):
+                refs = index[key]
+                refs.discard(svc_ref)
+                if not refs:
+                    del index[key]
+
+        return True
+
+    def __find_candidates(self, ldap_filter):
+        """
+        Uses the indexes to find the references which can match the given
+        filter. The filter must still be tested against the candidates.
+
+        :param ldap_filter: A parsed LDAP filter
+        :return: The set of candidate references, or None if the indexes
+                 can't be used for this filter
+        """
+        if isinstance(ldap_filter, ldapfilter.LDAPCriteria):
+            if ldap_filter.comparator is not ldapfilter._comparator_eq \
+                    or not is_string(ldap_filter.value):
+                # Not an equality test
+                return None
+
+            try:
+                index = self.__indexes[ldap_filter.name]
+            except KeyError:
+                # Property not indexed
+                return None
+
+            with self.__index_lock:
+                return index.get(ldap_filter.value, set()).copy()
+
+        elif ldap_filter.operator == ldapfilter.AND:
+            # Keep the smallest set of candidates
+            candidates = None
+            for sub_filter in ldap_filter.subfilters:
+                sub_candidates = self.__find_candidates(sub_filter)
+                if sub_candidates is not None and \
+                        (candidates is None or
+                         len(sub_candidates) < len(candidates)):
+                    candidates = sub_candidates
+            return candidates
+
+        elif ldap_filter.operator == ldapfilter.OR:
+            # All branches must use an index
+            candidates = set()
+            for sub_filter in ldap_filter.subfilters:
+                sub_candidates = self.__find_candidates(sub_filter)
+                if sub_candidates is None:
+                    return None
+                candidates.update(sub_candidates)
+            return candidates
+
+        # Negation can't be handled
+        return None
+
+    def __properties_updated(self, svc_ref):
+        """
+        Updates the registry after the modification of the properties of a
+        service
+
+        :param svc_ref: A service reference with modified properties
+        """
+        if svc_ref.needs_sort_update():
+            # The sort key and the registry must be updated
+            self.__sort_registry(svc_ref)
+
+        # Update the indexes, if the service is still visible
+        properties = svc_ref.properties_view()
+        with self.__index_lock:
+            if self.__unindex_reference(svc_ref):
+                self.__index_reference(svc_ref, properties)
+
     def __sort_registry(self, svc_ref):
         """
         Sorts the registry, after the update of the sort key of given service
@@ -804,6 +1200,10 @@ class ServiceRegistry(object):
 
             # Get the service instance
             service = self.__svc_registry.pop(svc_ref)
+            del self.__svc_ids[svc_ref.get_property(SERVICE_ID)]
+
+            with self.__index_lock:
+                self.__unindex_reference(svc_ref)
 
             for spec in svc_ref.get_property(OBJECTCLASS):
                 spec_services = self.__svc_specs[spec]
@@ -822,6 +1222,69 @@ class ServiceRegistry(object):
 
             return service
 
+    def unregister_many(self, svc_refs):
+        """
+        Unregisters several services at once: the registry is locked once and
+        each list of references per specification is filtered once.
+
+        :param svc_refs: A list of service references
+        :return: The list of unregistered service instances, in the same order
+                 as the given references
+        :raise BundleException: Unknown service reference (no service is
+                                unregistered)
+        """
+        with self.__svc_lock:
+            # Check the references before modifying the registry
+            if len(set(svc_refs)) != len(svc_refs):
+                raise BundleException("A service is given more than once")
+
+            for svc_ref in svc_refs:
+                if svc_ref not in self.__pending_services \
+                        and svc_ref not in self.__svc_registry:
+                    raise BundleException(
+                        "Unknown service: {0}".format(svc_ref))
+
+            services = []
+            removed_refs = set()
+            for svc_ref in svc_refs:
+                try:
+                    # Try in pending services
+                    services.append(self.__pending_services.pop(svc_ref))
+                    continue
+                except KeyError:
+                    # Not pending: continue
+                    pass
+
+                services.append(self.__svc_registry.pop(svc_ref))
+                del self.__svc_ids[svc_ref.get_property(SERVICE_ID)]
+                removed_refs.add(svc_ref)
+
+                with self.__index_lock:
+                    self.__unindex_reference(svc_ref)
+
+                # Delete bundle association
+                bundle = svc_ref.get_bundle()
+                bundle_services = self.__bundle_svc[bundle]
+                bundle_services.remove(svc_ref)
+                if not bundle_services:
+                    # Don't keep empty lists
+                    del self.__bundle_svc[bundle]
+
+            # Clean the specifications lists
+            specs = set()
+            for svc_ref in removed_refs:
+                specs.update(svc_ref.get_property(OBJECTCLASS))
+
+            for spec in specs:
+                spec_services = [svc_ref for svc_ref in self.__svc_specs[spec]
+                                 if svc_ref not in removed_refs]
+                if spec_services:
+                    self.__svc_specs[spec] = spec_services
+                else:
+                    del self.__svc_specs[spec]
+
+            return services
+
     def hide_bundle_services(self, bundle):
         """
         Hides the services of the given bundle (removes them from lists, but
@@ -843,8 +1306,12 @@ class ServiceRegistry(object):
                     # Remove direct references
                     self.__pending_services[svc_ref] = \
                         self.__svc_registry.pop(svc_ref)
+                    del self.__svc_ids[svc_ref.get_property(SERVICE_ID)]
                     specs.update(svc_ref.get_property(OBJECTCLASS))
 
+                    with self.__index_lock:
+                        self.__unindex_reference(svc_ref)
+
                     # Clean the specifications cache
                     for spec in svc_ref.get_property(OBJECTCLASS):
                         spec_services = self.__svc_specs[spec]
@@ -881,16 +1348,9 @@ class ServiceRegistry(object):
                 # Escape the class name
                 clazz = ldapfilter.escape_LDAP(clazz)
 
-            if clazz is None:
-                # Directly use the given filter
-                refs_set = sorted(self.__svc_registry.keys())
-            else:
-                try:
-                    # Only for references with the given specification
-                    refs_set = iter(self.__svc_specs[clazz])
-                except KeyError:
-                    # No matching specification
-                    return None
+            if clazz is not None and clazz not in self.__svc_specs:
+                # No matching specification
+                return None
 
             # Parse the filter
             try:
@@ -898,11 +1358,31 @@ class ServiceRegistry(object):
             except ValueError as ex:
                 raise BundleException(ex)
 
+            if new_filter is not None:
+                # Look for candidates in the properties indexes
+                candidates = self.__find_candidates(new_filter)
+            else:
+                candidates = None
+
+            if candidates is not None:
+                if clazz is not None:
+                    # Only for references with the given specification
+                    candidates = [ref for ref in candidates
+                                  if clazz in ref.get_property(OBJECTCLASS)]
+                refs_set = iter(sorted(candidates))
+            elif clazz is None:
+                # Directly use the given filter
+                refs_set = iter(sorted(self.__svc_registry.keys()))
+            else:
+                # Only for references with the given specification
+                refs_set = iter(self.__svc_specs[clazz])
+
             if new_filter is not None:
                 # Prepare a generator, as we might not need a complete
                 # walk-through
+                matcher = new_filter.compile()
                 refs_set = (ref for ref in refs_set
-                            if new_filter.matches(ref.get_properties()))
+                            if matcher(ref.properties_view()))
 
             if only_one:
                 # Return the first element in the list/generator
@@ -915,6 +1395,16 @@ class ServiceRegistry(object):
             # Get all the matching references
             return list(refs_set) or None
 
+    def get_service_reference_by_id(self, service_id):
+        """
+        Retrieves the reference of the registered service with the given ID
+
+        :param service_id: A service ID
+        :return: The reference of the service, or None
+        """
+        with self.__svc_lock:
+            return self.__svc_ids.get(service_id)
+
     def get_bundle_imported_services(self, bundle):
         """
         Returns this bundle's ServiceReference list for all services it is
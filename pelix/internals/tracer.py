@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Startup tracer for Pelix: records the duration of the installation and start
+of bundles and of the life cycle of iPOPO components.
+
+:author: Thomas Calmant
+:copyright: Copyright 2015, Thomas Calmant
+:license: Apache License 2.0
+:version: 0.6.4
+
+..
+
+    Copyright 2015 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+# Standard library
+import collections
+import json
+import os
+import threading
+import time
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 6, 4)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+TRACE_INSTALL = "install"
+""" Import of the module of a bundle """
+
+TRACE_START = "start"
+""" Call to the start() method of a bundle activator """
+
+TRACE_FRAMEWORK = "framework"
+""" Start of the framework, including the start of its bundles """
+
+TRACE_FACTORIES = "factories"
+""" Registration of the iPOPO factories of a bundle """
+
+TRACE_INSTANTIATE = "instantiate"
+""" Instantiation of an iPOPO component """
+
+TRACE_VALIDATE = "validate"
+""" Validation of an iPOPO component """
+
+FORMAT_JSON = "json"
+""" Export format: list of trace events """
+
+FORMAT_CHROME = "chrome"
+""" Export format: Chrome trace events (chrome://tracing) """
+
+MAX_EVENTS = 100000
+""" Default maximum number of trace events kept by a tracer """
+
+# ------------------------------------------------------------------------------
+
+
+class TraceEvent(object):
+    """
+    A traced phase
+    """
+    __slots__ = ('category', 'name', 'thread', 'thread_id', 'start',
+                 'duration', 'args')
+
+    def __init__(self, category, name, start, duration, args=None):
+        """
+        Sets up members
+
+        :param category: Kind of phase (TRACE_* constant)
+        :param name: Name of the traced item (bundle, component, ...)
+        :param start: Time of the start of the phase, relative to the creation
+                      of the tracer (in seconds)
+        :param duration: Duration of the phase (in seconds)
+        :param args: A dictionary of details about the phase
+        """
+        current = threading.current_thread()
+        self.category = category
+        self.name = name
+        self.thread = current.name
+        self.thread_id = current.ident
+        self.start = start
+        self.duration = duration
+        self.args = args or {}
+
+    def __repr__(self):
+        """
+        String representation
+        """
+        return "TraceEvent({0}, {1}, {2:.6f}s)".format(
+            self.category, self.name, self.duration)
+
+    def to_dict(self):
+        """
+        Converts the event to a dictionary
+
+        :return: A dictionary
+        """
+        return {"category": self.category,
+                "name": self.name,
+                "thread": self.thread,
+                "start": self.start,
+                "duration": self.duration,
+                "args": self.args}
+
+
+class _Span(object):
+    """
+    Context manager measuring the duration of a phase
+    """
+    __slots__ = ('__tracer', '__category', '__name', '__args', '__start')
+
+    def __init__(self, tracer, category, name, args):
+        """
+        :param tracer: The StartupTracer storing the event
+        :param category: Kind of phase
+        :param name: Name of the traced item
+        :param args: Details about the phase
+        """
+        self.__tracer = tracer
+        self.__category = category
+        self.__name = name
+        self.__args = args
+        self.__start = None
+
+    def __enter__(self):
+        """
+        Phase started
+        """
+        self.__start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Phase ended (exceptions are propagated)
+        """
+        if exc_type is not None:
+            self.__args["error"] = exc_type.__name__
+
+        self.__tracer.add(self.__category, self.__name, self.__start,
+                          time.time() - self.__start, self.__args)
+        return False
+
+
+class _NoSpan(object):
+    """
+    Context manager doing nothing, used when tracing is disabled
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        """
+        Does nothing
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Does nothing (exceptions are propagated)
+        """
+        return False
+
+
+_NO_SPAN = _NoSpan()
+""" Unique instance of _NoSpan """
+
+
+def trace(tracer, category, name, **kwargs):
+    """
+    Returns a context manager tracing a phase if the given tracer is not None,
+    or doing nothing
+
+    :param tracer: A StartupTracer or None
+    :param category: Kind of phase (TRACE_* constant)
+    :param name: Name of the traced item
+    :param kwargs: Details about the phase
+    :return: A context manager
+    """
+    if tracer is None:
+        return _NO_SPAN
+
+    return tracer.trace(category, name, **kwargs)
+
+# ------------------------------------------------------------------------------
+
+
+class StartupTracer(object):
+    """
+    Keeps a timeline of the phases of the start of bundles and components
+    """
+    def __init__(self, max_events=MAX_EVENTS):
+        """
+        Sets up the tracer
+
+        :param max_events: Maximum number of events to keep (the oldest ones
+                           are dropped)
+        """
+        self.__origin = time.time()
+        self.__events = collections.deque(maxlen=max_events)
+
+    def trace(self, category, name, **kwargs):
+        """
+        Returns a context manager tracing the phase it wraps
+
+        :param category: Kind of phase (TRACE_* constant)
+        :param name: Name of the traced item
+        :param kwargs: Details about the phase
+        :return: A context manager
+        """
+        return _Span(self, category, name, kwargs)
+
+    def add(self, category, name, start, duration, args=None):
+        """
+        Stores a traced phase
+
+        :param category: Kind of phase (TRACE_* constant)
+        :param name: Name of the traced item
+        :param start: Time of the start of the phase (time.time())
+        :param duration: Duration of the phase (in seconds)
+        :param args: Details about the phase (dictionary)
+        """
+        self.__events.append(TraceEvent(category, name,
+                                        start - self.__origin, duration, args))
+
+    def clear(self):
+        """
+        Forgets all events
+        """
+        self.__events.clear()
+
+    def get_events(self, category=None):
+        """
+        Returns the traced phases, in the order they ended
+
+        :param category: If given, only return the events of this category
+        :return: A list of TraceEvent beans
+        """
+        events = list(self.__events)
+        if category is not None:
+            events = [event for event in events if event.category == category]
+        return events
+
+    def get_slowest(self, count=None, category=None):
+        """
+        Returns the slowest traced phases
+
+        :param count: Maximum number of events to return (None for all)
+        :param category: If given, only return the events of this category
+        :return: A list of TraceEvent beans, the slowest first
+        """
+        events = sorted(self.get_events(category),
+                        key=lambda event: event.duration, reverse=True)
+        if count is not None:
+            events = events[:count]
+        return events
+
+    def to_json(self):
+        """
+        Converts the timeline to a list of dictionaries
+
+        :return: A list of dictionaries, sorted by start time
+        """
+        return [event.to_dict()
+                for event in sorted(self.get_events(),
+                                    key=lambda event: event.start)]
+
+    def to_chrome_trace(self):
+        """
+        Converts the timeline to the Chrome trace events format, which can be
+        loaded in chrome://tracing or Perfetto
+
+        :return: A dictionary
+        """
+        pid = os.getpid()
+        return {"displayTimeUnit": "ms",
+                "traceEvents": [
+                    {"name": event.name,
+                     "cat": event.category,
+                     "ph": "X",
+                     "ts": int(event.start * 1000000),
+                     "dur": int(event.duration * 1000000),
+                     "pid": pid,
+                     "tid": event.thread_id,
+                     "args": event.args}
+                    for event in sorted(self.get_events(),
+                                        key=lambda event: event.start)]}
+
+    def export(self, filename, trace_format=FORMAT_JSON):
+        """
+        Writes the timeline to the given file
+
+        :param filename: Path to the output file
+        :param trace_format: FORMAT_JSON or FORMAT_CHROME
+        :raise ValueError: Unknown format
+        :raise IOError: Error writing the file
+        """
+        if trace_format == FORMAT_JSON:
+            data = self.to_json()
+        elif trace_format == FORMAT_CHROME:
+            data = self.to_chrome_trace()
+        else:
+            raise ValueError("Unknown trace format: {0}".format(trace_format))
+
+        with open(filename, "w") as out_file:
+            json.dump(data, out_file, indent=2, default=str)
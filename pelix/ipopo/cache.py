@@ -0,0 +1,463 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+iPOPO factories metadata cache
+
+Stores on disk the description of the factories of each bundle (names,
+provided specifications, requirements and instances), keyed by the iPOPO
+version and by the modification time, size and hash of the bundle module
+file and of the modules defining the parent classes of its factories.
+This allows to install the bundles which only provide services as lazy
+bundles, without importing their module while it hasn't changed.
+
+:author: Thomas Calmant
+:copyright: Copyright 2015, Thomas Calmant
+:license: Apache License 2.0
+:version: 0.6.4
+
+..
+
+    Copyright 2015 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+# Standard library
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pkgutil
+import sys
+import threading
+
+try:
+    # Python 3.4+
+    from importlib.util import find_spec
+except ImportError:
+    # Python 2
+    find_spec = None
+
+# Pelix
+from pelix.constants import ACTIVATOR, ACTIVATOR_LEGACY
+
+# iPOPO constants
+import pelix.ipopo.constants as constants
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 6, 4)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+CACHE_VERSION = 2
+""" Version of the format of the cache files """
+
+_logger = logging.getLogger("ipopo.cache")
+
+# ------------------------------------------------------------------------------
+
+
+def _source_file(filename):
+    """
+    Returns the path to the source file of a module, if it exists
+
+    :param filename: Path to the module file (source or byte code)
+    :return: The path to the source file, or the given one
+    """
+    if filename and filename.endswith(('.pyc', '.pyo')):
+        source = filename[:-1]
+        if os.path.exists(source):
+            return source
+
+    return filename
+
+
+def _file_hash(filename):
+    """
+    Computes the SHA-1 hash of the content of the given file
+
+    :param filename: Path to a file
+    :return: The hexadecimal hash of the file
+    :raise IOError: Error reading the file
+    """
+    with open(filename, 'rb') as in_file:
+        return hashlib.sha1(in_file.read()).hexdigest()
+
+
+def _file_key(filename, previous=None):
+    """
+    Computes the description of a file stored in a cache entry: path,
+    modification time, size and hash. The hash of the previous description
+    is kept if the modification time and size of the file didn't change.
+
+    :param filename: Path to a file
+    :param previous: The previous description of the file (optional)
+    :return: A dictionary describing the file
+    :raise IOError: Error reading the file
+    """
+    stat = os.stat(filename)
+    if previous and previous.get("mtime") == stat.st_mtime \
+            and previous.get("size") == stat.st_size:
+        sha1 = previous.get("sha1")
+    else:
+        sha1 = None
+
+    return {"file": filename,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha1": sha1 or _file_hash(filename)}
+
+
+def _is_unchanged(key):
+    """
+    Checks if a file didn't change since its description has been computed.
+    Its content is hashed only if its modification time changed.
+
+    :param key: The description of the file computed by _file_key()
+    :return: True if the file didn't change
+    """
+    try:
+        filename = key["file"]
+        stat = os.stat(filename)
+    except (KeyError, TypeError, OSError):
+        return False
+
+    if key.get("size") != stat.st_size:
+        return False
+    elif key.get("mtime") == stat.st_mtime:
+        return True
+
+    # The file has been touched: check its content
+    try:
+        return key.get("sha1") == _file_hash(filename)
+    except (IOError, OSError):
+        return False
+
+
+def find_module_file(name):
+    """
+    Looks for the file of the given module without importing it (its parent
+    packages might be imported)
+
+    :param name: Name of a module
+    :return: The path to the module file, or None
+    """
+    try:
+        # Module already loaded
+        filename = getattr(sys.modules[name], '__file__', None)
+    except KeyError:
+        try:
+            if find_spec is not None:
+                spec = find_spec(name)
+                filename = spec.origin \
+                    if spec is not None and spec.has_location else None
+            else:
+                loader = pkgutil.get_loader(name)
+                filename = loader.get_filename(name) \
+                    if loader is not None else None
+        except (ImportError, AttributeError, ValueError):
+            filename = None
+
+    return _source_file(filename)
+
+
+def describe_bundle(module, factories):
+    """
+    Computes the metadata of a bundle, storable in the cache
+
+    :param module: The module of the bundle
+    :param factories: The list of (FactoryContext, factory class) pairs found
+                      in the bundle
+    :return: A dictionary describing the bundle
+    """
+    description = []
+    for context, _ in factories:
+        requirements = []
+        handler_requires = context.get_handler(constants.HANDLER_REQUIRES)
+        if handler_requires is not None:
+            for field, requirement in handler_requires.items():
+                requirements.append(
+                    {"id": field,
+                     "specification": requirement.specification,
+                     "aggregate": requirement.aggregate,
+                     "optional": requirement.optional,
+                     "filter": requirement.original_filter})
+
+        services = []
+        handler_provides = context.get_handler(constants.HANDLER_PROVIDES)
+        if handler_provides is not None:
+            services = [list(specs_controller[0])
+                        for specs_controller in handler_provides]
+
+        description.append({"name": context.name,
+                            "services": services,
+                            "requirements": requirements,
+                            "instances": context.get_instances()})
+
+    activator = getattr(module, ACTIVATOR, None) \
+        or getattr(module, ACTIVATOR_LEGACY, None)
+    return {"activator": activator is not None,
+            "factories": description}
+
+
+def get_dependencies(module, factories):
+    """
+    Returns the files of the modules defining the parent classes of the
+    factories of a bundle, as their changes can change its metadata
+
+    :param module: The module of the bundle
+    :param factories: The list of (FactoryContext, factory class) pairs found
+                      in the bundle
+    :return: The sorted list of the paths to those modules files
+    """
+    names = set(parent.__module__ for _, factory_class in factories
+                for parent in inspect.getmro(factory_class))
+    names.discard(module.__name__)
+
+    files = set(find_module_file(name) for name in names)
+    files.discard(None)
+    return sorted(files)
+
+
+def get_lazy_specifications(metadata):
+    """
+    Returns the specifications a bundle can be lazily activated for, i.e. if
+    it has no activator and if all of its factories have instances which
+    provide services.
+
+    :param metadata: The metadata of the bundle
+    :return: The set of provided specifications, or None if the bundle must
+             be started eagerly
+    """
+    if metadata["activator"] or not metadata["factories"]:
+        return None
+
+    specifications = set()
+    for factory in metadata["factories"]:
+        if not factory["instances"] or not factory["services"]:
+            # Components with side effects or without instances
+            return None
+
+        for specs in factory["services"]:
+            specifications.update(specs)
+
+    return specifications
+
+# ------------------------------------------------------------------------------
+
+
+class MetadataCache(object):
+    """
+    On-disk cache of the metadata of bundles: one JSON file per bundle
+    """
+    def __init__(self, directory):
+        """
+        Sets up the cache
+
+        :param directory: Directory where to store the cache files
+        """
+        self.__directory = directory
+        self.__lock = threading.Lock()
+
+        # Bundle name -> metadata of the up to date entries
+        self.__entries = {}
+
+    def __get_path(self, name):
+        """
+        Returns the path to the cache file of the given bundle
+
+        :param name: A bundle name
+        :return: The path to its cache file
+        """
+        return os.path.join(self.__directory, "{0}.json".format(name))
+
+    def __read(self, name):
+        """
+        Reads the cache file of the given bundle
+
+        :param name: A bundle name
+        :return: The content of the cache file (dictionary) or None
+        """
+        try:
+            with open(self.__get_path(name)) as in_file:
+                entry = json.load(in_file)
+        except (IOError, OSError, ValueError, TypeError):
+            # No file or invalid content
+            return None
+
+        if not isinstance(entry, dict) \
+                or entry.get("version") != CACHE_VERSION \
+                or entry.get("ipopo") != __version__:
+            # Written by another version
+            return None
+
+        return entry
+
+    def get(self, name, filename):
+        """
+        Retrieves the metadata of the given bundle, if neither its module file
+        nor the modules it depends on have changed since it has been stored
+
+        :param name: The bundle name
+        :param filename: The path to the module file of the bundle
+        :return: The bundle metadata (dictionary) or None
+        """
+        entry = self.__read(name)
+        if entry is None:
+            return None
+
+        module = entry.get("module") or {}
+        if module.get("file") != filename or not _is_unchanged(module):
+            return None
+
+        for dependency in entry.get("dependencies") or ():
+            if not _is_unchanged(dependency):
+                return None
+
+        with self.__lock:
+            self.__entries[name] = entry["metadata"]
+
+        return entry["metadata"]
+
+    def store(self, name, filename, metadata, dependencies=None):
+        """
+        Stores the metadata of the given bundle
+
+        :param name: The bundle name
+        :param filename: The path to the module file of the bundle
+        :param metadata: The bundle metadata (JSON-serializable dictionary)
+        :param dependencies: The paths to the files of the modules the
+                             metadata depends on (optional)
+        :return: True if the metadata has been written
+        """
+        # Reuse the hashes of the files which didn't change
+        previous = self.__read(name) or {}
+        previous_keys = dict(
+            (key.get("file"), key)
+            for key in [previous.get("module") or {}] +
+            list(previous.get("dependencies") or ()))
+
+        try:
+            content = json.dumps(
+                {"version": CACHE_VERSION,
+                 "ipopo": __version__,
+                 "module": _file_key(filename, previous_keys.get(filename)),
+                 "dependencies": [_file_key(path, previous_keys.get(path))
+                                  for path in dependencies or ()],
+                 "metadata": metadata}, indent=2)
+        except (IOError, OSError) as ex:
+            _logger.debug("Can't read the module file of %s: %s", name, ex)
+            return False
+        except (TypeError, ValueError) as ex:
+            # Properties which can't be converted to JSON
+            _logger.debug("Can't store the metadata of %s: %s", name, ex)
+            return False
+
+        path = self.__get_path(name)
+        tmp_path = "{0}.{1}.tmp".format(path, os.getpid())
+        try:
+            if not os.path.isdir(self.__directory):
+                os.makedirs(self.__directory)
+
+            with open(tmp_path, 'w') as out_file:
+                out_file.write(content)
+
+            if os.path.exists(path):
+                # Python 2 on Windows doesn't replace existing files
+                os.remove(path)
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as ex:
+            _logger.warning("Error writing the metadata cache of %s: %s",
+                            name, ex)
+            return False
+
+        with self.__lock:
+            self.__entries[name] = metadata
+
+        return True
+
+    def clear(self):
+        """
+        Deletes all the cache files
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+            try:
+                names = os.listdir(self.__directory)
+            except OSError:
+                return
+
+            for name in names:
+                if name.endswith(".json"):
+                    try:
+                        os.remove(os.path.join(self.__directory, name))
+                    except OSError as ex:
+                        _logger.warning("Error removing %s: %s", name, ex)
+
+    def get_factories(self):
+        """
+        Returns the catalog of the factories known by this cache object,
+        i.e. those of the bundles which have been read or stored
+
+        :return: A dictionary: factory name -> bundle name
+        """
+        with self.__lock:
+            return {factory["name"]: name
+                    for name, metadata in self.__entries.items()
+                    for factory in metadata["factories"]}
+
+# ------------------------------------------------------------------------------
+
+
+def install_bundles(context, names):
+    """
+    Installs the given bundles, using the metadata cache configured by the
+    ``pelix.ipopo.metadata_cache`` framework property.
+    The bundles whose metadata is up to date and which only provide services
+    are installed as lazy bundles: their module is imported and their
+    components are instantiated when one of their specifications is looked
+    for. The other ones are installed normally, and must be started by the
+    caller.
+
+    :param context: The bundle context used to install the bundles
+    :param names: The names of the bundles to install
+    :return: A tuple: (list of installed bundles, list of lazy bundles names)
+    :raise BundleException: Error installing a bundle
+    """
+    directory = context.get_property(constants.IPOPO_METADATA_CACHE)
+    cache = MetadataCache(directory) if directory else None
+
+    installed = []
+    lazy = []
+    for name in names:
+        if cache is not None and name not in sys.modules:
+            filename = find_module_file(name)
+            metadata = cache.get(name, filename) if filename else None
+            specifications = get_lazy_specifications(metadata) \
+                if metadata is not None else None
+            if specifications:
+                context.install_lazy_bundle(name, specifications)
+                lazy.append(name)
+                continue
+
+        installed.append(context.install_bundle(name))
+
+    return installed, lazy
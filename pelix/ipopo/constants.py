@@ -151,6 +151,25 @@ If True, the component will be re-instantiated after its bundle has been
 updated
 """
 
+IPOPO_METADATA_CACHE = "pelix.ipopo.metadata_cache"
+"""
+Framework property: path to the directory where iPOPO stores the metadata of
+the factories of each bundle (see pelix.ipopo.cache)
+"""
+
+IPOPO_VALIDATION_THREADS = "pelix.ipopo.validation.threads"
+"""
+Framework property: maximum number of threads used to validate the
+components which have the IPOPO_ASYNC_VALIDATE property (0 by default:
+components are validated in the thread which resolved their dependencies)
+"""
+
+IPOPO_ASYNC_VALIDATE = "pelix.ipopo.validate.async"
+"""
+If True, the component can be validated in a worker thread, concurrently with
+other components
+"""
+
 # ------------------------------------------------------------------------------
 
 
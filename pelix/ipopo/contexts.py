@@ -145,7 +145,7 @@ class Requirement(object):
             return False
 
         # Properties filter test
-        return self.__full_filter.matches(properties)
+        return self.__full_filter.compile()(properties)
 
     @property
     def full_filter(self):
@@ -202,8 +202,8 @@ class FactoryContext(object):
     Represents the data stored in a component factory (class)
     """
     __slots__ = ('bundle_context', 'callbacks', 'completed', 'field_callbacks',
-                 'is_singleton', 'is_singleton_active', 'name', 'properties',
-                 'properties_fields', '__handlers',
+                 'is_singleton', 'is_singleton_active', 'name', 'pool_size',
+                 'properties', 'properties_fields', '__handlers',
                  '__inherited_configuration', '__instances')
 
     def __init__(self):
@@ -234,6 +234,9 @@ class FactoryContext(object):
         # Singleton active
         self.is_singleton_active = False
 
+        # Maximum number of killed components kept for reuse (pooled factory)
+        self.pool_size = 0
+
         # The factory manipulation has been completed
         self.completed = False
 
@@ -26,15 +26,19 @@ Core iPOPO implementation
 """
 
 # Standard library
+import contextlib
 import copy
 import inspect
 import logging
 import threading
+import time
 
 # Pelix
 from pelix.constants import SERVICE_ID, BundleActivator
 from pelix.framework import Bundle, BundleException
 from pelix.internals.events import BundleEvent, ServiceEvent
+from pelix.internals.tracer import trace, TRACE_FACTORIES, TRACE_INSTANTIATE
+from pelix.threadpool import ThreadPool
 from pelix.utilities import add_listener, remove_listener, is_string
 
 # iPOPO constants
@@ -42,6 +46,8 @@ import pelix.ipopo.constants as constants
 import pelix.ipopo.handlers.constants as handlers_const
 
 # iPOPO beans
+from pelix.ipopo.cache import MetadataCache, describe_bundle, \
+    find_module_file, get_dependencies
 from pelix.ipopo.contexts import FactoryContext, ComponentContext
 from pelix.ipopo.instance import StoredInstance
 
@@ -67,6 +73,11 @@ BUILTIN_HANDLERS = ('pelix.ipopo.handlers.properties',
                     'pelix.ipopo.handlers.requiresmap',
                     'pelix.ipopo.handlers.temporal')
 
+# Component properties read by the built-in handler factories: a recycled
+# component can only be reused by a component with the same values
+_POOL_PROPERTIES = (constants.IPOPO_REQUIRES_FILTERS,
+                    constants.IPOPO_TEMPORAL_TIMEOUTS)
+
 # ------------------------------------------------------------------------------
 
 
@@ -143,9 +154,21 @@ class _IPopoService(object):
         # Store the bundle context
         self.__context = bundle_context
 
+        # The framework startup tracer (None if disabled)
+        self.__tracer = bundle_context.get_bundle(0).get_startup_tracer()
+
+        # The factories metadata cache (None if disabled)
+        cache_dir = bundle_context.get_property(
+            constants.IPOPO_METADATA_CACHE)
+        self.__metadata_cache = MetadataCache(cache_dir) if cache_dir else None
+
         # Factories registry : name -> factory class
         self.__factories = {}
 
+        # Recycled components of pooled factories:
+        # Factory name -> [StoredInstance]
+        self.__pools = {}
+
         # Instances registry : name -> StoredInstance object
         self.__instances = {}
 
@@ -171,6 +194,30 @@ class _IPopoService(object):
         # Instances waiting for a handler: Name -> (ComponentContext, instance)
         self.__waiting_handlers = {}
 
+        # Depth of nested quiet periods
+        self.__quiet_depth = 0
+
+        # Pool of threads validating components asynchronously
+        self.__validation_pool = None
+        nb_threads = bundle_context.get_property(
+            constants.IPOPO_VALIDATION_THREADS)
+        try:
+            nb_threads = int(nb_threads or 0)
+        except (TypeError, ValueError):
+            _logger.warning("Invalid number of validation threads: %s",
+                            nb_threads)
+        else:
+            if nb_threads > 0:
+                self.__validation_pool = ThreadPool(
+                    nb_threads, 0, logname="ipopo-validation")
+                self.__validation_pool.start()
+
+        # Queued asynchronous validations (one token per task) and number of
+        # running ones
+        self.__queued_validations = set()
+        self.__running_validations = 0
+        self.__validations_condition = threading.Condition()
+
         # Register the service listener
         bundle_context.add_service_listener(
             self, None, handlers_const.SERVICE_IPOPO_HANDLER_FACTORY)
@@ -207,6 +254,9 @@ class _IPopoService(object):
                 self._handlers[handler_id] = \
                     self.__context.get_service(svc_ref)
 
+                # Recycled components must use the new handler
+                self.__forget_pools()
+
                 # Try to instantiate waiting components
                 succeeded = set()
                 for name, (context, instance) \
@@ -236,6 +286,7 @@ class _IPopoService(object):
             self.__context.unget_service(svc_ref)
             self._handlers_refs.remove(svc_ref)
             del self._handlers[handler_id]
+            self.__forget_pools()
 
             # List the components using this handler
             to_stop = set()
@@ -298,6 +349,62 @@ class _IPopoService(object):
         # Look for the required handlers
         return {self._handlers[handler_id] for handler_id in handlers_ids}
 
+    def __forget_pools(self, factory_name=None):
+        """
+        Forgets the recycled components of the given factory, or of all
+        factories
+
+        :param factory_name: A factory name, or None
+        """
+        if factory_name is None:
+            self.__pools.clear()
+        else:
+            self.__pools.pop(factory_name, None)
+
+    def __get_recycled(self, component_context):
+        """
+        Pops a recycled component of the factory of the given component,
+        whose handlers have been configured with the same properties
+
+        :param component_context: The ComponentContext of a new component
+        :return: A recycled StoredInstance, or None
+        """
+        pool = self.__pools.get(component_context.get_factory_name())
+        if pool:
+            properties = component_context.properties
+            for idx in range(len(pool) - 1, -1, -1):
+                old_properties = pool[idx].context.properties
+                for key in _POOL_PROPERTIES:
+                    if old_properties.get(key) != properties.get(key):
+                        break
+                else:
+                    return pool.pop(idx)
+
+        return None
+
+    def __recycle(self, stored_instance):
+        """
+        Kills the given component, keeping it for reuse if its factory is
+        pooled
+
+        :param stored_instance: A StoredInstance removed from the registry
+        """
+        factory_context = stored_instance.context.factory_context
+        factory = self.__factories.get(factory_context.name)
+        if not factory_context.pool_size \
+                or getattr(factory, constants.IPOPO_FACTORY_CONTEXT,
+                           None) is not factory_context:
+            # Not pooled, or the factory has been unregistered
+            stored_instance.kill()
+            return
+
+        pool = self.__pools.setdefault(factory_context.name, [])
+        if len(pool) >= factory_context.pool_size:
+            # Full pool
+            stored_instance.kill()
+        elif stored_instance.recycle():
+            pool.append(stored_instance)
+
     def __get_stored_instances(self, factory_name):
         """
         Retrieves the list of all stored instances objects corresponding to
@@ -325,8 +432,6 @@ class _IPopoService(object):
             # Extract information about the component
             factory_context = component_context.factory_context
             handlers_ids = factory_context.get_handlers_ids()
-            name = component_context.name
-            factory_name = factory_context.name
 
             try:
                 # Get handlers
@@ -346,25 +451,59 @@ class _IPopoService(object):
             # Prepare the stored instance
             stored_instance = StoredInstance(self, component_context, instance,
                                              all_handlers)
+            self.__store_instance(stored_instance)
 
-            # Manipulate the properties
-            for handler in all_handlers:
-                handler.manipulate(stored_instance, instance)
+        self.__start_instance(stored_instance)
+        return True
 
-            # Store the instance
-            self.__instances[name] = stored_instance
+    def __reuse_instance(self, stored_instance, component_context):
+        """
+        Starts a new component with a recycled instance
 
+        :param stored_instance: A recycled StoredInstance
+        :param component_context: The ComponentContext of the new component
+        """
+        with self.__instances_lock:
+            stored_instance.reuse(component_context)
+            self.__store_instance(stored_instance)
+
+        self.__start_instance(stored_instance)
+
+    def __store_instance(self, stored_instance):
+        """
+        Lets the handlers manipulate the component and stores it
+
+        :param stored_instance: A new StoredInstance
+        """
+        # Manipulate the properties
+        instance = stored_instance.instance
+        for handler in stored_instance.get_handlers():
+            handler.manipulate(stored_instance, instance)
+
+        # Store the instance
+        self.__instances[stored_instance.name] = stored_instance
+
+        if self.__quiet_depth:
+            # Delay its validation to the end of the quiet period
+            stored_instance.begin_batch()
+
+    def __start_instance(self, stored_instance):
+        """
+        Starts the handlers of a stored component and tries to validate it
+
+        :param stored_instance: A new StoredInstance
+        """
         # Start the manager
         stored_instance.start()
 
         # Notify listeners now that every thing is ready to run
         self._fire_ipopo_event(constants.IPopoEvent.INSTANTIATED,
-                               factory_name, name)
+                               stored_instance.factory_name,
+                               stored_instance.name)
 
         # Try to validate it
         stored_instance.update_bindings()
         stored_instance.check_lifecycle()
-        return True
 
     def _autorestart_store_components(self, bundle):
         """
@@ -477,24 +616,50 @@ class _IPopoService(object):
         """
         assert isinstance(bundle, Bundle)
 
-        # Load the bundle factories
-        factories = _load_bundle_factories(bundle)
+        with trace(self.__tracer, TRACE_FACTORIES,
+                   bundle.get_symbolic_name()):
+            # Load the bundle factories
+            factories = _load_bundle_factories(bundle)
+            if self.__metadata_cache is not None:
+                self.__store_metadata(bundle, factories)
 
-        for context, factory_class in factories:
-            try:
-                # Register each found factory
-                self._register_factory(context.name, factory_class, False)
-            except ValueError as ex:
-                # Already known factory
-                _logger.error("Cannot register factory '%s' of bundle %d (%s):"
-                              " %s", context.name, bundle.get_bundle_id(),
-                              bundle.get_symbolic_name(), ex)
-                _logger.error("class: %s -- module: %s", factory_class,
-                              factory_class.__module__)
-            else:
-                # Instantiate components
-                for name, properties in context.get_instances().items():
-                    self.instantiate(context.name, name, properties)
+            for context, factory_class in factories:
+                try:
+                    # Register each found factory
+                    self._register_factory(context.name, factory_class, False)
+                except ValueError as ex:
+                    # Already known factory
+                    _logger.error("Cannot register factory '%s' of bundle %d "
+                                  "(%s): %s", context.name,
+                                  bundle.get_bundle_id(),
+                                  bundle.get_symbolic_name(), ex)
+                    _logger.error("class: %s -- module: %s", factory_class,
+                                  factory_class.__module__)
+                else:
+                    # Instantiate components
+                    for name, properties in context.get_instances().items():
+                        self.instantiate(context.name, name, properties)
+
+    def __store_metadata(self, bundle, factories):
+        """
+        Updates the metadata cache entry of the given bundle, if its module
+        or the modules it depends on have changed since it was stored
+
+        :param bundle: A bundle
+        :param factories: The (FactoryContext, factory class) pairs found in
+                          the bundle
+        """
+        name = bundle.get_symbolic_name()
+        filename = find_module_file(name)
+        if not filename:
+            # Module without file
+            return
+
+        if self.__metadata_cache.get(name, filename) is None:
+            module = bundle.get_module()
+            self.__metadata_cache.store(
+                name, filename, describe_bundle(module, factories),
+                get_dependencies(module, factories))
 
     def _register_factory(self, factory_name, factory, override):
         """
@@ -524,6 +689,7 @@ class _IPopoService(object):
                                      .format(factory_name))
 
             self.__factories[factory_name] = factory
+            self.__forget_pools(factory_name)
 
             # Trigger an event
             self._fire_ipopo_event(constants.IPopoEvent.REGISTERED,
@@ -577,6 +743,16 @@ class _IPopoService(object):
 
             self._handlers.clear()
             self._handlers_refs.clear()
+            self.__forget_pools()
+
+        if self.__validation_pool is not None:
+            # Stop validating components (drops the queued validations)
+            self.__validation_pool.stop()
+            with self.__validations_condition:
+                # The running validations will end by themselves
+                self.__queued_validations.clear()
+                if not self.__running_validations:
+                    self.__validations_condition.notify_all()
 
     def framework_stopping(self):
         """
@@ -661,7 +837,8 @@ class _IPopoService(object):
             # Stop working if the framework is stopping
             raise ValueError("Framework is stopping")
 
-        with self.__instances_lock:
+        with trace(self.__tracer, TRACE_INSTANTIATE, name,
+                   factory=factory_name), self.__instances_lock:
             if name in self.__instances or name in self.__waiting_handlers:
                 raise ValueError("'{0}' is an already running instance name"
                                  .format(name))
@@ -679,29 +856,37 @@ class _IPopoService(object):
                                      "instantiated."
                                      .format(factory_name, name))
 
-                # Create component instance
-                try:
-                    instance = factory()
-                except:
-                    _logger.exception("Error creating the instance '%s' "
-                                      "from factory '%s'", name, factory_name)
-                    raise TypeError("Factory '{0}' failed to create '{1}'"
-                                    .format(factory_name, name))
+                # Normalize the given properties
+                properties = self._prepare_instance_properties(
+                    properties, factory_context.properties)
+
+                # Set up the component instance context
+                component_context = ComponentContext(factory_context, name,
+                                                     properties)
+
+                # Reuse a recycled component (pooled factory)
+                recycled = self.__get_recycled(component_context)
+                if recycled is not None:
+                    instance = recycled.instance
+                else:
+                    # Create component instance
+                    try:
+                        instance = factory()
+                    except:
+                        _logger.exception("Error creating the instance '%s' "
+                                          "from factory '%s'",
+                                          name, factory_name)
+                        raise TypeError("Factory '{0}' failed to create '{1}'"
+                                        .format(factory_name, name))
 
                 # Instantiation succeeded: update singleton status
                 if factory_context.is_singleton:
                     factory_context.is_singleton_active = True
 
-            # Normalize the given properties
-            properties = self._prepare_instance_properties(
-                properties, factory_context.properties)
-
-            # Set up the component instance context
-            component_context = ComponentContext(factory_context, name,
-                                                 properties)
-
-            # Try to instantiate the component immediately
-            if not self.__try_instantiate(component_context, instance):
+            if recycled is not None:
+                # The handlers are ready
+                self.__reuse_instance(recycled, component_context)
+            elif not self.__try_instantiate(component_context, instance):
                 # A handler is missing, put the component in the queue
                 self.__waiting_handlers[name] = (component_context, instance)
 
@@ -743,6 +928,134 @@ class _IPopoService(object):
                 # Call back the component during the invalidation
                 stored_instance.invalidate(True)
 
+    def _validate_async(self, stored_instance):
+        """
+        Queues the validation of the given component in the validation pool,
+        if it has been enabled and if the component accepts it
+
+        :param stored_instance: The StoredInstance of a component
+        :return: True if the validation has been queued, False if the
+                 component must be validated by the caller
+        """
+        if self.__validation_pool is None or not self.running \
+                or not stored_instance.context.properties.get(
+                    constants.IPOPO_ASYNC_VALIDATE):
+            return False
+
+        token = object()
+        with self.__validations_condition:
+            if not self.running:
+                # Stopped meanwhile
+                return False
+
+            self.__queued_validations.add(token)
+
+        self.__validation_pool.enqueue(self.__validation_task,
+                                       stored_instance, token)
+        return True
+
+    def __validation_task(self, stored_instance, token):
+        """
+        Validates a component in a thread of the validation pool
+
+        :param stored_instance: The StoredInstance of a component
+        :param token: The token of this validation in the queued ones
+        """
+        with self.__validations_condition:
+            try:
+                self.__queued_validations.remove(token)
+            except KeyError:
+                # Dropped while stopping iPOPO
+                return
+
+            self.__running_validations += 1
+
+        try:
+            stored_instance.run_queued_validation()
+        except Exception as ex:
+            _logger.exception("Error validating component %s: %s",
+                              stored_instance.name, ex)
+        finally:
+            with self.__validations_condition:
+                self.__running_validations -= 1
+                if not self.__running_validations \
+                        and not self.__queued_validations:
+                    self.__validations_condition.notify_all()
+
+    def wait_validations(self, timeout=None):
+        """
+        Waits for the end of the queued asynchronous validations of the
+        components, including those queued while waiting
+
+        :param timeout: Maximum time to wait (in seconds, None to wait
+                        forever)
+        :return: True if all validations are done, False on timeout
+        """
+        with self.__validations_condition:
+            if timeout is None:
+                while self.__queued_validations \
+                        or self.__running_validations:
+                    self.__validations_condition.wait()
+                return True
+
+            end = time.time() + timeout
+            while self.__queued_validations or self.__running_validations:
+                remaining = end - time.time()
+                if remaining <= 0:
+                    return False
+                self.__validations_condition.wait(remaining)
+            return True
+
+    def begin_quiet_period(self):
+        """
+        Starts a quiet period, e.g. before a bulk registration of services.
+        Until the matching call to end_quiet_period(), components are
+        invalidated as soon as a dependency is missing, but they are only
+        validated at the end of the period, with a single pass on their
+        bindings. Quiet periods can be nested.
+        """
+        with self.__instances_lock:
+            self.__quiet_depth += 1
+            if self.__quiet_depth > 1:
+                # Already in a quiet period
+                return
+
+            stored_instances = list(self.__instances.values())
+
+        for stored_instance in stored_instances:
+            stored_instance.begin_batch()
+
+    def end_quiet_period(self):
+        """
+        Ends a quiet period: the components are validated if possible, once
+        the outermost period has ended
+        """
+        with self.__instances_lock:
+            if self.__quiet_depth <= 0:
+                # Not in a quiet period
+                return
+
+            self.__quiet_depth -= 1
+            if self.__quiet_depth:
+                # Still in a quiet period
+                return
+
+            stored_instances = list(self.__instances.values())
+
+        for stored_instance in stored_instances:
+            stored_instance.end_batch()
+
+    @contextlib.contextmanager
+    def quiet_period(self):
+        """
+        Context manager calling begin_quiet_period() and end_quiet_period()
+        """
+        self.begin_quiet_period()
+        try:
+            yield
+        finally:
+            self.end_quiet_period()
+
     def is_registered_factory(self, name):
         """
         Tests if the given name is in the factory registry
@@ -780,8 +1093,8 @@ class _IPopoService(object):
                 # Store the reference to the factory context
                 factory_context = stored_instance.context.factory_context
 
-                # Kill it
-                stored_instance.kill()
+                # Kill it (or keep it for reuse)
+                self.__recycle(stored_instance)
 
                 # Update the singleton state flag
                 factory_context.is_singleton_active = False
@@ -838,6 +1151,9 @@ class _IPopoService(object):
                 # Unknown factory
                 return False
 
+            # Forget its recycled components
+            self.__forget_pools(factory_name)
+
             # Trigger an event
             self._fire_ipopo_event(constants.IPopoEvent.UNREGISTERED,
                                    factory_name)
@@ -471,6 +471,7 @@ class ComponentFactory(object):
             context.name = self.__factory_name
             context.inherit_handlers(self.__excluded_inheritance)
             context.is_singleton = False
+            context.pool_size = 0
             context.completed = True
 
             # Find callbacks
@@ -516,6 +517,47 @@ class SingletonFactory(ComponentFactory):
         context.is_singleton = True
         return factory_class
 
+
+class PooledFactory(ComponentFactory):
+    """
+    Decorator that sets up a component factory class whose killed components
+    are recycled: their handlers and their instance (reset by calling its
+    ``__init__()`` method again) are reused by the next components of the
+    factory
+    """
+    def __init__(self, name=None, excluded=None, size=16):
+        """
+        Sets up the decorator
+
+        :param name: Name of the component factory
+        :param excluded: List of IDs of handlers which configuration must not
+                         be inherited from the parent class
+        :param size: Maximum number of killed components kept for reuse
+        :raise ValueError: Invalid pool size
+        """
+        super(PooledFactory, self).__init__(name, excluded)
+
+        if not isinstance(size, int) or size < 1:
+            raise ValueError("The pool size must be a positive integer")
+
+        self.__size = size
+
+    def __call__(self, factory_class):
+        """
+        Sets up and registers the factory class
+
+        :param factory_class: The class to decorate
+        :return: The decorated class
+        :raise TypeError: The given object is not a class
+        """
+        # Manipulate the class
+        factory_class = super(PooledFactory, self).__call__(factory_class)
+
+        # Set the pool size
+        context = get_factory_context(factory_class)
+        context.pool_size = self.__size
+        return factory_class
+
 # ------------------------------------------------------------------------------
 
 
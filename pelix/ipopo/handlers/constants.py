@@ -174,6 +174,18 @@ class Handler(object):
         """
         pass
 
+    def reset(self):
+        """
+        Called instead of clear() when a component of a pooled factory is
+        killed: the handler must go back to the state it had before being
+        manipulated, in order to be reused by another component of the same
+        factory. The handler mustn't hold any service or listener after this
+        call.
+
+        :return: True if the handler can be reused, else False
+        """
+        return False
+
     def pre_validate(self):
         """
         Called just before a component is validated
@@ -166,3 +166,19 @@ class PropertiesHandler(constants.Handler):
         # Inject the getter and setter at the instance level
         setattr(component_instance, getter_name, getter)
         setattr(component_instance, setter_name, setter)
+
+    def reset(self):
+        """
+        Removes the injected getter and setter, to reuse the handler with
+        another component of the same factory
+
+        :return: True
+        """
+        component_instance = self._ipopo_instance.instance
+        for suffix in (ipopo_constants.IPOPO_GETTER_SUFFIX,
+                       ipopo_constants.IPOPO_SETTER_SUFFIX):
+            setattr(component_instance, "{0}{1}".format(
+                ipopo_constants.IPOPO_PROPERTY_PREFIX, suffix), None)
+
+        self._ipopo_instance = None
+        return True
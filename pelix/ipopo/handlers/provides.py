@@ -197,6 +197,29 @@ class ServiceRegistrationHandler(constants.ServiceProviderHandler):
         setattr(component_instance, getter_name, getter)
         setattr(component_instance, setter_name, setter)
 
+    def reset(self):
+        """
+        Removes the injected controller methods, to reuse the handler with
+        another component of the same factory
+
+        :return: True if the service has been unregistered
+        """
+        if self._registration is not None:
+            # Still registered
+            return False
+
+        if self.__controller is not None:
+            component_instance = self._ipopo_instance.instance
+            for suffix in (ipopo_constants.IPOPO_GETTER_SUFFIX,
+                           ipopo_constants.IPOPO_SETTER_SUFFIX):
+                setattr(component_instance, "{0}{1}".format(
+                    ipopo_constants.IPOPO_CONTROLLER_PREFIX, suffix), None)
+
+        self._ipopo_instance = None
+        self.__controller_on = True
+        self.__validated = False
+        return True
+
     def check_event(self, svc_event):
         """
         Tests if the given service event corresponds to the registered service
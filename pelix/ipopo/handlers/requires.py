@@ -36,6 +36,7 @@ from pelix.internals.events import ServiceEvent
 # iPOPO constants
 import pelix.ipopo.constants as ipopo_constants
 import pelix.ipopo.handlers.constants as constants
+import pelix.ipopo.handlers.tracker as tracker
 
 # ------------------------------------------------------------------------------
 
@@ -179,6 +180,9 @@ class _RuntimeDependency(constants.DependencyHandler):
         # Current field value
         self._value = None
 
+        # The shared tracker notifying the service events
+        self._tracker = None
+
     def manipulate(self, stored_instance, component_instance):
         """
         Stores the given StoredInstance bean.
@@ -203,6 +207,18 @@ class _RuntimeDependency(constants.DependencyHandler):
         self.requirement = None
         self._value = None
         self._field = None
+        self._tracker = None
+
+    def reset(self):
+        """
+        Resets the manager, to be reused by another component of the same
+        factory
+
+        :return: True
+        """
+        self._ipopo_instance = None
+        self._value = None
+        return True
 
     def get_bindings(self):
         """
@@ -295,12 +311,29 @@ class _RuntimeDependency(constants.DependencyHandler):
             # Modified properties (can be a new injection)
             self.on_service_modify(svc_ref, event.get_previous_properties())
 
+    def services_changed(self, events):
+        """
+        Called by the framework when a batch of service events occurs: the
+        life cycle of the component is updated once, after all events have
+        been handled
+        """
+        stored_instance = self._ipopo_instance
+        if stored_instance is None:
+            # stop() and clean() have been called
+            return
+
+        with stored_instance.batch():
+            for event in events:
+                self.service_changed(event)
+
     def start(self):
         """
         Starts the dependency manager
         """
-        self._context.add_service_listener(
-            self, self.requirement.filter, self.requirement.specification)
+        # Dependencies with the same requirement share a service listener
+        self._tracker = tracker.subscribe(
+            self._context, self, self.requirement.specification,
+            self.requirement.filter)
 
     def stop(self):
         """
@@ -308,7 +341,9 @@ class _RuntimeDependency(constants.DependencyHandler):
 
         :return: The removed bindings (list) or None
         """
-        self._context.remove_service_listener(self)
+        if self._tracker is not None:
+            self._tracker.unsubscribe(self)
+            self._tracker = None
 
 
 class SimpleDependency(_RuntimeDependency):
@@ -336,6 +371,17 @@ class SimpleDependency(_RuntimeDependency):
         self._pending_ref = None
         super(SimpleDependency, self).clear()
 
+    def reset(self):
+        """
+        Resets the manager, to be reused by another component of the same
+        factory
+
+        :return: True
+        """
+        self.reference = None
+        self._pending_ref = None
+        return super(SimpleDependency, self).reset()
+
     def get_bindings(self):
         """
         Retrieves the list of the references to the bound services
@@ -472,6 +518,17 @@ class AggregateDependency(_RuntimeDependency):
         self._future_value = None
         super(AggregateDependency, self).clear()
 
+    def reset(self):
+        """
+        Resets the manager, to be reused by another component of the same
+        factory
+
+        :return: True
+        """
+        self.services.clear()
+        self._future_value = None
+        return super(AggregateDependency, self).reset()
+
     def get_bindings(self):
         """
         Retrieves the list of the references to the bound services
@@ -130,6 +130,16 @@ class BestDependency(requires.SimpleDependency):
         self._current_ranking = None
         super(BestDependency, self).clear()
 
+    def reset(self):
+        """
+        Resets the manager, to be reused by another component of the same
+        factory
+
+        :return: True
+        """
+        self._current_ranking = None
+        return super(BestDependency, self).reset()
+
     def on_service_arrival(self, svc_ref):
         """
         Called when a service has been registered in the framework
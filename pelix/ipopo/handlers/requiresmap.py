@@ -37,6 +37,7 @@ from pelix.internals.events import ServiceEvent
 # iPOPO constants
 import pelix.ipopo.constants as ipopo_constants
 import pelix.ipopo.handlers.constants as constants
+import pelix.ipopo.handlers.tracker as tracker
 
 # ------------------------------------------------------------------------------
 
@@ -198,6 +199,9 @@ class _RuntimeDependency(constants.DependencyHandler):
         # Future injected dictionary
         self._future_value = {}
 
+        # The shared tracker notifying the service events
+        self._tracker = None
+
     def manipulate(self, stored_instance, component_instance):
         """
         Stores the given StoredInstance bean.
@@ -231,6 +235,7 @@ class _RuntimeDependency(constants.DependencyHandler):
         self._allow_none = None
         self._future_value = None
         self._field = None
+        self._tracker = None
 
     def get_bindings(self):
         """
@@ -326,12 +331,29 @@ class _RuntimeDependency(constants.DependencyHandler):
             # Modified properties (can be a new injection)
             self.on_service_modify(svc_ref, event.get_previous_properties())
 
+    def services_changed(self, events):
+        """
+        Called by the framework when a batch of service events occurs: the
+        life cycle of the component is updated once, after all events have
+        been handled
+        """
+        stored_instance = self._ipopo_instance
+        if stored_instance is None:
+            # stop() and clean() have been called
+            return
+
+        with stored_instance.batch():
+            for event in events:
+                self.service_changed(event)
+
     def start(self):
         """
         Starts the dependency manager
         """
-        self._context.add_service_listener(
-            self, self.requirement.filter, self.requirement.specification)
+        # Dependencies with the same requirement share a service listener
+        self._tracker = tracker.subscribe(
+            self._context, self, self.requirement.specification,
+            self.requirement.filter)
 
     def stop(self):
         """
@@ -339,7 +361,10 @@ class _RuntimeDependency(constants.DependencyHandler):
 
         :return: The removed bindings (list) or None
         """
-        self._context.remove_service_listener(self)
+        if self._tracker is not None:
+            self._tracker.unsubscribe(self)
+            self._tracker = None
+
         if self.services:
             return [(service, reference)
                     for reference, service in self.services.items()]
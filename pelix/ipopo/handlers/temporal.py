@@ -270,6 +270,15 @@ class TemporalDependency(requires.SimpleDependency):
         self._value = None
         super(TemporalDependency, self).clear()
 
+    def reset(self):
+        """
+        Temporal dependencies can't be reused: components with one aren't
+        pooled
+
+        :return: False
+        """
+        return False
+
     def on_service_arrival(self, svc_ref):
         """
         Called when a service has been registered in the framework
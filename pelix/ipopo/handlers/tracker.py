@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Service listeners shared by dependency handlers
+
+Dependency handlers of the same bundle which look for the same specification
+with the same filter can subscribe to a single service listener: the
+framework filters each service event once, and the shared listener gives it
+to all of them.
+
+:author: Thomas Calmant
+:copyright: Copyright 2015, Thomas Calmant
+:license: Apache License 2.0
+:version: 0.6.4
+
+..
+
+    Copyright 2015 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+# Standard library
+import collections
+import logging
+import threading
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 6, 4)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+_logger = logging.getLogger("ipopo.handlers.tracker")
+
+# (Bundle context, specification, filter string) -> SharedTracker
+_TRACKERS = {}
+_TRACKERS_LOCK = threading.Lock()
+
+# ------------------------------------------------------------------------------
+
+
+class SharedTracker(object):
+    """
+    A service listener which notifies its subscribers of the events it
+    receives
+    """
+    def __init__(self, key, context, specification, ldap_filter):
+        """
+        Sets up the tracker
+
+        :param key: The key of the tracker in the registry
+        :param context: The bundle context used to register the listener
+        :param specification: The tracked specification
+        :param ldap_filter: The filter on the service properties (or None)
+        """
+        self.__key = key
+        self.__context = context
+        self.__specification = specification
+        self.__filter = ldap_filter
+
+        # Subscribed handlers, in subscription order (used as a set)
+        self.__handlers = collections.OrderedDict()
+
+        # Immutable copy of the handlers, computed on the next event after a
+        # (un)subscription
+        self.__snapshot = ()
+
+        # The listener is registered by the thread which created the tracker,
+        # without the registry lock: the other subscribers wait for it
+        self.__starter = threading.current_thread()
+        self.__started = threading.Event()
+        self.__failed = False
+
+    def __get_handlers(self):
+        """
+        Returns the snapshot of the subscribed handlers
+
+        :return: A tuple of handlers
+        """
+        snapshot = self.__snapshot
+        if snapshot is None:
+            with _TRACKERS_LOCK:
+                snapshot = self.__snapshot = tuple(self.__handlers)
+
+        return snapshot
+
+    def __len__(self):
+        """
+        Returns the number of subscribed handlers
+        """
+        return len(self.__handlers)
+
+    def _add(self, handler):
+        """
+        Adds a handler (called with the registry lock)
+
+        :param handler: A dependency handler
+        """
+        self.__handlers[handler] = True
+        self.__snapshot = None
+
+    def _remove(self, handler):
+        """
+        Removes a handler (called with the registry lock)
+
+        :param handler: A dependency handler
+        :return: True if the handler was subscribed
+        """
+        try:
+            del self.__handlers[handler]
+        except KeyError:
+            return False
+
+        self.__snapshot = None
+        return True
+
+    def _start(self):
+        """
+        Registers the service listener (called without the registry lock) and
+        wakes up the subscribers waiting for it
+
+        :raise BundleException: Invalid filter
+        """
+        try:
+            self.__context.add_service_listener(
+                self, self.__filter, self.__specification)
+        except:
+            # Forget this tracker
+            with _TRACKERS_LOCK:
+                self.__failed = True
+                if _TRACKERS.get(self.__key) is self:
+                    del _TRACKERS[self.__key]
+            raise
+        finally:
+            self.__started.set()
+
+    def _wait(self):
+        """
+        Waits for the service listener to be registered by the thread which
+        created the tracker. Returns immediately if called from that thread.
+
+        :return: False if the listener couldn't be registered
+        """
+        if threading.current_thread() is not self.__starter:
+            self.__started.wait()
+
+        return not self.__failed
+
+    def _stop(self):
+        """
+        Unregisters the service listener (called without the registry lock)
+        """
+        self.__context.remove_service_listener(self)
+
+    def unsubscribe(self, handler):
+        """
+        Removes the given handler from the subscribers. The service listener
+        is unregistered with the last subscriber.
+
+        :param handler: A dependency handler
+        """
+        with _TRACKERS_LOCK:
+            if not self._remove(handler) or self.__handlers:
+                return
+
+            if _TRACKERS.get(self.__key) is self:
+                del _TRACKERS[self.__key]
+
+        # Unregister the listener outside the registry lock, as the framework
+        # calls back the other bundles
+        self._stop()
+
+    def service_changed(self, event):
+        """
+        Called by the framework when a service event occurs
+
+        :param event: A ServiceEvent
+        """
+        for handler in self.__get_handlers():
+            try:
+                handler.service_changed(event)
+            except:
+                _logger.exception("Error notifying a dependency handler")
+
+    def services_changed(self, events):
+        """
+        Called by the framework when a batch of service events occurs
+
+        :param events: The list of ServiceEvent objects
+        """
+        for handler in self.__get_handlers():
+            try:
+                services_changed = handler.services_changed
+            except AttributeError:
+                # Notify each event
+                for event in events:
+                    try:
+                        handler.service_changed(event)
+                    except:
+                        _logger.exception(
+                            "Error notifying a dependency handler")
+            else:
+                try:
+                    services_changed(events)
+                except:
+                    _logger.exception("Error notifying a dependency handler")
+
+# ------------------------------------------------------------------------------
+
+
+def subscribe(context, handler, specification, ldap_filter=None):
+    """
+    Subscribes the given handler to the service events matching the given
+    specification and filter, using the shared tracker of the bundle context
+
+    :param context: The bundle context of the component
+    :param handler: A dependency handler, with a service_changed() method
+    :param specification: The tracked specification
+    :param ldap_filter: The filter on the service properties (or None)
+    :return: The SharedTracker the handler subscribed to
+    :raise BundleException: Invalid filter
+    """
+    key = (context, specification,
+           str(ldap_filter) if ldap_filter is not None else None)
+    while True:
+        with _TRACKERS_LOCK:
+            tracker = _TRACKERS.get(key)
+            created = tracker is None
+            if created:
+                tracker = _TRACKERS[key] = \
+                    SharedTracker(key, context, specification, ldap_filter)
+
+            tracker._add(handler)
+
+        if created:
+            # Register the listener outside the registry lock: it can activate
+            # lazy bundles, whose components subscribe to their own trackers
+            tracker._start()
+            return tracker
+        elif tracker._wait():
+            return tracker
+
+        # The creator of the tracker failed to register its listener: retry
+
+
+def get_trackers_count():
+    """
+    Returns the number of active shared trackers
+
+    :return: The number of trackers
+    """
+    with _TRACKERS_LOCK:
+        return len(_TRACKERS)
@@ -26,12 +26,15 @@ Instance manager class definition
 """
 
 # Standard library
+import contextlib
 import logging
 import threading
 import traceback
 
 # Pelix
-from pelix.constants import FrameworkException
+from pelix.constants import FrameworkException, FRAMEWORK_EVENT_LOOP
+from pelix.internals.tracer import trace, TRACE_VALIDATE
+from pelix.utilities import is_coroutine, run_coroutine
 
 # iPOPO constants
 import pelix.ipopo.constants as constants
@@ -59,8 +62,9 @@ class StoredInstance(object):
     # Try to reduce memory footprint (stored instances)
     __slots__ = ('bundle_context', 'context', 'factory_name', 'instance',
                  'name', 'state', '_controllers_state', '_handlers',
-                 '_ipopo_service', '_lock', '_logger', 'error_trace',
-                 '__all_handlers')
+                 '_ipopo_service', '_lock', '_logger', '_tracer',
+                 '_batch_depth', '_lifecycle_pending', '_validation_queued',
+                 'error_trace', '__all_handlers')
 
     INVALID = 0
     """ This component has been invalidated """
@@ -120,9 +124,21 @@ class StoredInstance(object):
         # Store the bundle context
         self.bundle_context = self.context.get_bundle_context()
 
+        # The framework startup tracer (None if disabled)
+        self._tracer = self.bundle_context.get_bundle(0).get_startup_tracer()
+
         # The controllers state dictionary
         self._controllers_state = {}
 
+        # Depth of nested batches, and flag indicating that the life cycle
+        # must be checked at the end of the batch
+        self._batch_depth = 0
+        self._lifecycle_pending = False
+
+        # Flag indicating that the component is waiting for an asynchronous
+        # validation
+        self._validation_queued = False
+
         # Handlers: kind -> [handlers]
         self._handlers = {}
         self.__all_handlers = set(handlers)
@@ -199,10 +215,55 @@ class StoredInstance(object):
             # Call unbind() and remove the injection
             self.__unset_binding(dependency, svc, svc_ref)
 
-            # Try a new configuration
-            if self.update_bindings():
+            if self._batch_depth:
+                # Try a new configuration at the end of the batch
+                self._lifecycle_pending = True
+            elif self.update_bindings():
+                # Try a new configuration
+                self.check_lifecycle()
+
+    def begin_batch(self):
+        """
+        Starts a batch of dependency changes: until the matching call to
+        end_batch(), the component is invalidated as soon as a dependency is
+        missing, but its validation is delayed to the end of the batch.
+        Batches can be nested.
+        """
+        with self._lock:
+            self._batch_depth += 1
+
+    def end_batch(self):
+        """
+        Ends a batch of dependency changes. The bindings and the life cycle of
+        the component are updated once at the end of the outermost batch.
+        """
+        with self._lock:
+            if self._batch_depth <= 0:
+                # Not in a batch
+                return
+
+            self._batch_depth -= 1
+            if self._batch_depth or not self._lifecycle_pending:
+                # Still in a batch or nothing to do
+                return
+
+            self._lifecycle_pending = False
+            if self.state != StoredInstance.KILLED:
+                # Single revalidation pass
+                self.update_bindings()
                 self.check_lifecycle()
 
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Context manager calling begin_batch() and end_batch()
+        """
+        self.begin_batch()
+        try:
+            yield self
+        finally:
+            self.end_batch()
+
     def get_controller_state(self, name):
         """
         Retrieves the state of the controller with the given name
@@ -273,8 +334,39 @@ class StoredInstance(object):
                 self.invalidate(True)
             elif can_validate and handlers_valid \
                     and self._ipopo_service.running:
-                # We're all good
-                self.validate(True)
+                if self._batch_depth:
+                    # Validate at the end of the batch
+                    self._lifecycle_pending = True
+                elif self._validation_queued:
+                    # Already waiting for an asynchronous validation
+                    pass
+                elif self._ipopo_service._validate_async(self):
+                    # Validation will be done by a worker thread
+                    self._validation_queued = True
+                else:
+                    # We're all good
+                    self.validate(True)
+
+    def run_queued_validation(self):
+        """
+        Validates the component after its validation has been queued, if its
+        dependencies are still there. Called by the iPOPO validation threads.
+
+        :return: True if the component has been validated
+        """
+        with self._lock:
+            if not self._validation_queued:
+                # Killed component
+                return False
+
+            self._validation_queued = False
+            if self.state == StoredInstance.INVALID \
+                    and self._ipopo_service.running \
+                    and self.__safe_handlers_callback(
+                        'is_valid', break_on_false=True):
+                return self.validate(True)
+
+            return False
 
     def update_bindings(self):
         """
@@ -372,48 +464,112 @@ class StoredInstance(object):
             if self.state == StoredInstance.KILLED:
                 return False
 
-            try:
-                self.invalidate(True)
-            except:
-                self._logger.exception("%s: Error invalidating the instance",
-                                       self.name)
-
-            # Now that we are nearly clean, be sure we were in a good registry
-            # state
-            assert not self._ipopo_service.is_registered_instance(self.name)
-
-            # Stop all handlers (can tell to unset a binding)
-            for handler in self.get_handlers():
-                results = self.__safe_handler_callback(handler, 'stop')
-                if results:
-                    try:
-                        for binding in results:
-                            self.__unset_binding(handler, binding[0],
-                                                 binding[1])
-                    except Exception as ex:
-                        self._logger.exception(
-                            "Error stopping handler '%s': %s", handler, ex)
+            self.__kill(False)
+            return True
+
+    def recycle(self):
+        """
+        Kills this instance like kill(), but keeps its handlers and its
+        component instance to be reused by another component of the same
+        factory (see reuse()). The handlers are reset and the component
+        instance is reset by calling its ``__init__()`` method again.
+        If this isn't possible, the instance is cleaned up like by kill().
+
+        A recycled instance doesn't hold any service nor listener: it can be
+        dropped without further clean up.
+
+        :return: True if the instance can be reused, else False
+        """
+        with self._lock:
+            if self.state == StoredInstance.KILLED:
+                return False
+
+            return self.__kill(True)
+
+    def __kill(self, recycle):
+        """
+        Kills this instance (the caller must hold the lock)
+
+        :param recycle: If True, try to keep the handlers and the component
+                        instance
+        :return: True if the instance has been recycled
+        """
+        try:
+            self.invalidate(True)
+        except:
+            self._logger.exception("%s: Error invalidating the instance",
+                                   self.name)
+
+        # Now that we are nearly clean, be sure we were in a good registry
+        # state
+        assert not self._ipopo_service.is_registered_instance(self.name)
+
+        # Stop all handlers (can tell to unset a binding)
+        for handler in self.get_handlers():
+            results = self.__safe_handler_callback(handler, 'stop')
+            if results:
+                try:
+                    for binding in results:
+                        self.__unset_binding(handler, binding[0], binding[1])
+                except Exception as ex:
+                    self._logger.exception(
+                        "Error stopping handler '%s': %s", handler, ex)
+
+        if recycle:
+            # Reset the handlers, then the component instance
+            recycle = self.__safe_handlers_callback(
+                'reset', exception_as_error=True, break_on_false=True)
+            if recycle:
+                try:
+                    type(self.instance).__init__(self.instance)
+                except Exception as ex:
+                    self._logger.exception(
+                        "Error resetting the component: %s", ex)
+                    recycle = False
 
+        if not recycle:
             # Call the handlers
             self.__safe_handlers_callback('clear')
 
-            # Change the state
-            self.state = StoredInstance.KILLED
-
-            # Trigger the event
-            self._ipopo_service._fire_ipopo_event(constants.IPopoEvent.KILLED,
-                                                  self.factory_name, self.name)
-
-            # Clean up members
-            self._handlers.clear()
-            self.__all_handlers.clear()
-            self._handlers = None
-            self.__all_handlers = None
-            self.context = None
-            self.instance = None
-            self._ipopo_service = None
+        # Change the state (and cancel the queued validation)
+        self.state = StoredInstance.KILLED
+        self._validation_queued = False
+
+        # Trigger the event
+        self._ipopo_service._fire_ipopo_event(constants.IPopoEvent.KILLED,
+                                              self.factory_name, self.name)
+
+        if recycle:
             return True
 
+        # Clean up members
+        self._handlers.clear()
+        self.__all_handlers.clear()
+        self._handlers = None
+        self.__all_handlers = None
+        self.context = None
+        self.instance = None
+        self._ipopo_service = None
+        return False
+
+    def reuse(self, context):
+        """
+        Prepares a recycled instance for a new component of the same factory.
+        The handlers must then manipulate the component instance again.
+
+        :param context: The ComponentContext of the new component
+        """
+        with self._lock:
+            self._logger = logging.getLogger(
+                '-'.join(("InstanceManager", context.name)))
+            self.context = context
+            self.name = context.name
+            self.state = StoredInstance.INVALID
+            self.error_trace = None
+            self._controllers_state.clear()
+            self._batch_depth = 0
+            self._lifecycle_pending = False
+
     def validate(self, safe_callback=True):
         """
         Ends the component validation, registering services
@@ -432,38 +588,57 @@ class StoredInstance(object):
             if self.state == StoredInstance.KILLED:
                 raise RuntimeError("{0}: Zombies !".format(self.name))
 
-            # Clear the error trace
-            self.error_trace = None
-
-            # Call the handlers
-            self.__safe_handlers_callback('pre_validate')
-
-            if safe_callback:
-                # Safe call back needed and not yet passed
-                self.state = StoredInstance.VALIDATING
-                if not self.safe_callback(constants.IPOPO_CALLBACK_VALIDATE,
-                                          self.bundle_context):
-                    # Stop there if the callback failed
-                    self.state = StoredInstance.VALID
-                    self.invalidate(True)
-
-                    # Consider the component has erroneous
-                    self.state = StoredInstance.ERRONEOUS
-                    return False
+            with trace(self._tracer, TRACE_VALIDATE, self.name,
+                       factory=self.factory_name):
+                # Clear the error trace
+                self.error_trace = None
+
+                # Call the handlers
+                self.__safe_handlers_callback('pre_validate')
+
+                if safe_callback:
+                    # Safe call back needed and not yet passed
+                    self.state = StoredInstance.VALIDATING
+                    if not self.safe_callback(
+                            constants.IPOPO_CALLBACK_VALIDATE,
+                            self.bundle_context):
+                        # Stop there if the callback failed
+                        self.state = StoredInstance.VALID
+                        self.invalidate(True)
+
+                        # Consider the component has erroneous
+                        self.state = StoredInstance.ERRONEOUS
+                        return False
+
+                # All good
+                self.state = StoredInstance.VALID
+
+                # Call the handlers
+                self.__safe_handlers_callback('post_validate')
+
+                # We may have caused a framework error, so check if iPOPO is
+                # active
+                if self._ipopo_service is not None:
+                    # Trigger the iPOPO event (after the service registration)
+                    self._ipopo_service._fire_ipopo_event(
+                        constants.IPopoEvent.VALIDATED,
+                        self.factory_name, self.name)
+        return True
 
-            # All good
-            self.state = StoredInstance.VALID
+    def __await(self, result):
+        """
+        Waits for the result of a coroutine callback (``async def``), executed
+        on the framework event loop if any
 
-            # Call the handlers
-            self.__safe_handlers_callback('post_validate')
+        :param result: The value returned by a component callback
+        :return: The result of the coroutine, or the given value
+        :raise Exception: The exception raised by the coroutine
+        """
+        if not is_coroutine(result):
+            return result
 
-            # We may have caused a framework error, so check if iPOPO is active
-            if self._ipopo_service is not None:
-                # Trigger the iPOPO event (after the service _registration)
-                self._ipopo_service._fire_ipopo_event(
-                    constants.IPopoEvent.VALIDATED,
-                    self.factory_name, self.name)
-        return True
+        return run_coroutine(
+            result, self.bundle_context.get_property(FRAMEWORK_EVENT_LOOP))
 
     def __callback(self, event, *args, **kwargs):
         """
@@ -479,7 +654,7 @@ class StoredInstance(object):
             return True
 
         # Call it
-        result = comp_callback(self.instance, *args, **kwargs)
+        result = self.__await(comp_callback(self.instance, *args, **kwargs))
         if result is None:
             # Special case, if the call back returns nothing
             return True
@@ -509,7 +684,7 @@ class StoredInstance(object):
             return True
 
         # Call it
-        result = callback(self.instance, field, *args, **kwargs)
+        result = self.__await(callback(self.instance, field, *args, **kwargs))
         if result is None:
             # Special case, if the call back returns nothing
             return True
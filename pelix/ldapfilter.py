@@ -25,8 +25,13 @@ Dependency-less LDAP filter parser for Python
     limitations under the License.
 """
 
-from pelix.utilities import is_string
+# Standard library
+import collections
 import inspect
+import threading
+
+# Pelix utilities
+from pelix.utilities import is_string, PYTHON_3
 
 # ------------------------------------------------------------------------------
 
@@ -62,6 +67,11 @@ NOT = 2
 
 # ------------------------------------------------------------------------------
 
+CACHE_SIZE = 512
+""" Maximum number of parsed filters kept by get_ldap_filter() """
+
+# ------------------------------------------------------------------------------
+
 
 class LDAPFilter(object):
     """
@@ -77,6 +87,9 @@ class LDAPFilter(object):
         self.subfilters = []
         self.operator = operator
 
+        # Compiled version of the filter
+        self.__matcher = None
+
     def __eq__(self, other):
         """
         Equality testing
@@ -139,6 +152,26 @@ class LDAPFilter(object):
             raise ValueError("Not operator only handles one child")
 
         self.subfilters.append(ldap_filter)
+        self.__matcher = None
+
+    def compile(self):
+        """
+        Returns a method testing properties against this filter, like
+        matches(), without walking through the filter tree at each call.
+
+        The compiled method is computed once and reflects the filter at the
+        time of the first call of this method, or of the last call to
+        append().
+
+        :return: A method accepting a dictionary of properties and returning
+                 True if they match this filter
+        """
+        if self.__matcher is None:
+            self.__matcher = _compile_filter(
+                self.operator,
+                [subfilter.compile() for subfilter in self.subfilters])
+
+        return self.__matcher
 
     def matches(self, properties):
         """
@@ -166,6 +199,10 @@ class LDAPFilter(object):
     def normalize(self):
         """
         Returns the first meaningful object in this filter.
+
+        This filter is not modified: if its normalized form differs, a new
+        filter is returned. This allows to normalize shared filters, like
+        those returned by get_ldap_filter().
         """
         if not self.subfilters:
             # No sub-filters
@@ -179,20 +216,25 @@ class LDAPFilter(object):
             if norm_filter is not None and norm_filter not in new_filters:
                 new_filters.append(norm_filter)
 
-        # Update the instance
-        self.subfilters = new_filters
+        if not new_filters:
+            # Only empty sub-filters
+            return None
+
+        elif len(new_filters) == 1 and self.operator != NOT:
+            # Return the only child as the filter object (NOT is the only
+            # operator to accept 1 operand)
+            return new_filters[0]
 
-        size = len(self.subfilters)
-        if size > 1:
-            # Normal filter
+        elif len(new_filters) == len(self.subfilters) \
+                and all(new is old for new, old
+                        in zip(new_filters, self.subfilters)):
+            # Already normalized
             return self
-        else:
-            if self.operator == NOT:
-                # NOT is the only operator to accept 1 operand
-                return self
-            else:
-                # Return the only child as the filter object
-                return self.subfilters[0].normalize()
+
+        # Normalized copy of this filter
+        new_filter = LDAPFilter(self.operator)
+        new_filter.subfilters = new_filters
+        return new_filter
 
 
 class LDAPCriteria(object):
@@ -219,6 +261,9 @@ class LDAPCriteria(object):
         self.value = value
         self.comparator = comparator
 
+        # Compiled version of the criterion
+        self.__matcher = None
+
     def __eq__(self, other):
         """
         Equality testing
@@ -273,6 +318,23 @@ class LDAPCriteria(object):
             # Criterion key is not in the properties
             return False
 
+    def compile(self):
+        """
+        Returns a method testing properties against this criterion, like
+        matches(), with a comparator prepared for the criterion value.
+
+        The compiled method is computed once and reflects the criterion at the
+        time of the first call of this method.
+
+        :return: A method accepting a dictionary of properties and returning
+                 True if they match this criterion
+        """
+        if self.__matcher is None:
+            self.__matcher = _compile_criteria(
+                self.name, _compile_comparator(self.comparator, self.value))
+
+        return self.__matcher
+
     def normalize(self):
         """
         Returns this criterion
@@ -350,6 +412,13 @@ def unescape_LDAP(ldap_string):
 ITERABLES = (list, tuple, set)
 """ The types that are considered iterable in comparators """
 
+if PYTHON_3:
+    _STRING_TYPES = (str,)
+else:
+    # pylint: disable=E0602
+    _STRING_TYPES = (str, unicode)
+""" The types considered as strings by is_string() """
+
 
 def _comparator_presence(_, tested_value):
     """
@@ -589,6 +658,288 @@ _COMPARATOR_SYMBOL = {
     _comparator_gt: ">"}
 
 
+# ------------------------------------------------------------------------------
+
+
+def _star_matcher(filter_value):
+    """
+    Prepares the test of a string against a filter containing jokers.
+    Behaves like _star_comparison(), but splits the filter value only once.
+
+    :param filter_value: A filter value containing jokers
+    :return: A method testing a single value
+    """
+    parts = filter_value.split('*')
+    first_part = parts[0]
+    middle_parts = parts[1:-1]
+    last_part = parts[-1]
+    last_len = len(last_part)
+
+    def star_match(tested_value):
+        """
+        Tests a value against the prepared filter value
+        """
+        if not isinstance(tested_value, _STRING_TYPES) \
+                or not tested_value.startswith(first_part):
+            # Unhandled value type or invalid prefix
+            return False
+
+        idx = len(first_part)
+        for part in middle_parts:
+            # Find the part in the tested value
+            idx = tested_value.find(part, idx)
+            if idx == -1:
+                # Part not found
+                return False
+
+            # Be sure to test the next part
+            idx += len(part)
+
+        if last_part:
+            # Its first occurrence must be at the end of the tested value
+            idx = tested_value.find(last_part, idx)
+            return idx != -1 and idx == len(tested_value) - last_len
+
+        return True
+
+    return star_match
+
+
+def _compile_star(filter_value):
+    """
+    Prepares _comparator_star() for the given filter value
+    """
+    star_match = _star_matcher(filter_value)
+
+    def compare_star(tested_value):
+        """
+        Tests a value or a list of values against the prepared joker filter
+        """
+        if isinstance(tested_value, ITERABLES):
+            for value in tested_value:
+                if star_match(value):
+                    return True
+            return False
+
+        return star_match(tested_value)
+
+    return compare_star
+
+
+def _compile_eq(filter_value):
+    """
+    Prepares _comparator_eq() for the given filter value
+    """
+    def compare_eq(tested_value):
+        """
+        Tests the equality of a value against the filter value
+        """
+        if isinstance(tested_value, _STRING_TYPES):
+            # String vs string
+            return filter_value == tested_value
+
+        elif isinstance(tested_value, ITERABLES):
+            for value in tested_value:
+                if isinstance(value, _STRING_TYPES):
+                    if filter_value == value:
+                        return True
+                elif filter_value == repr(value):
+                    # String vs string representation
+                    return True
+            return False
+
+        # String vs string representation
+        return filter_value == repr(tested_value)
+
+    return compare_eq
+
+
+def _compile_approximate(filter_value):
+    """
+    Prepares _comparator_approximate() for the given filter value
+    """
+    lower_filter_value = filter_value.lower()
+
+    def compare_approximate(tested_value):
+        """
+        Tests the approximate equality of a value against the filter value
+        """
+        if isinstance(tested_value, _STRING_TYPES):
+            # Lower case comparison
+            return lower_filter_value == tested_value.lower()
+
+        return _comparator_approximate(filter_value, tested_value)
+
+    return compare_approximate
+
+
+def _compile_approximate_star(filter_value):
+    """
+    Prepares _comparator_approximate_star() for the given filter value
+    """
+    lower_star = _compile_star(filter_value.lower())
+
+    def compare_approximate_star(tested_value):
+        """
+        Tests a value against the prepared approximate joker filter
+        """
+        if isinstance(tested_value, _STRING_TYPES):
+            # Lower case comparison
+            return lower_star(tested_value.lower())
+
+        return _comparator_approximate_star(filter_value, tested_value)
+
+    return compare_approximate_star
+
+
+def _compile_order(comparator, filter_value, strict_test):
+    """
+    Prepares an order comparator (<, <=, >, >=) for the given filter value:
+    the conversions of the filter value to numbers are done only once.
+
+    :param comparator: The original comparator
+    :param filter_value: The filter value
+    :param strict_test: A method comparing the tested value to the converted
+                        filter value
+    :return: A method testing a single value
+    """
+    or_equal = comparator in (_comparator_le, _comparator_ge)
+
+    # Pre-convert the filter value
+    try:
+        float_value = float(filter_value)
+    except (TypeError, ValueError):
+        # Not a number
+        float_value = None
+
+    try:
+        int_value = int(filter_value)
+    except (TypeError, ValueError):
+        # Integer/float comparison trick
+        int_value = float_value
+
+    def compare_order(tested_value):
+        """
+        Tests a value against the prepared filter value
+        """
+        value_type = type(tested_value)
+        if value_type is int:
+            converted = int_value
+        elif value_type is float:
+            converted = float_value
+        else:
+            # Other types: use the original comparator
+            return comparator(filter_value, tested_value)
+
+        if converted is not None and strict_test(tested_value, converted):
+            return True
+        elif or_equal:
+            # Equality is tested with the string representation
+            return filter_value == repr(tested_value)
+
+        return False
+
+    return compare_order
+
+
+def _compile_comparator(comparator, filter_value):
+    """
+    Prepares the given comparator for the given filter value
+
+    :param comparator: A comparator method
+    :param filter_value: The value given in the filter
+    :return: A method accepting the tested value as parameter
+    """
+    if not is_string(filter_value):
+        # Programmatically created criterion: use the comparator as is
+        pass
+
+    elif comparator is _comparator_eq:
+        return _compile_eq(filter_value)
+
+    elif comparator is _comparator_star:
+        return _compile_star(filter_value)
+
+    elif comparator is _comparator_approximate:
+        return _compile_approximate(filter_value)
+
+    elif comparator is _comparator_approximate_star:
+        return _compile_approximate_star(filter_value)
+
+    elif comparator in (_comparator_lt, _comparator_le):
+        return _compile_order(comparator, filter_value,
+                              lambda tested, value: tested < value)
+
+    elif comparator in (_comparator_gt, _comparator_ge):
+        return _compile_order(comparator, filter_value,
+                              lambda tested, value: tested > value)
+
+    # Default behavior
+    return lambda tested_value: comparator(filter_value, tested_value)
+
+
+def _compile_criteria(name, compare):
+    """
+    Prepares the method testing properties against a criterion
+
+    :param name: Name of the tested property
+    :param compare: Method testing the value of the property
+    :return: A method accepting a dictionary of properties
+    """
+    def match_criteria(properties):
+        """
+        Tests the properties against the criterion
+        """
+        try:
+            return compare(properties[name])
+        except KeyError:
+            # Criterion key is not in the properties
+            return False
+
+    return match_criteria
+
+
+def _compile_filter(operator, matchers):
+    """
+    Prepares the method testing properties against a filter
+
+    :param operator: The filter operator (AND, OR, NOT)
+    :param matchers: The compiled sub-filters
+    :return: A method accepting a dictionary of properties
+    """
+    matchers = tuple(matchers)
+
+    if operator == OR:
+        def match_or(properties):
+            """
+            At least one sub-filter must match
+            """
+            for matcher in matchers:
+                if matcher(properties):
+                    return True
+            return False
+
+        return match_or
+
+    if operator == NOT and len(matchers) == 1:
+        matcher = matchers[0]
+        return lambda properties: not matcher(properties)
+
+    def match_and(properties):
+        """
+        All sub-filters must match
+        """
+        for sub_matcher in matchers:
+            if not sub_matcher(properties):
+                return False
+        return True
+
+    if operator == NOT:
+        return lambda properties: not match_and(properties)
+
+    return match_and
+
+
 def comparator2str(comparator):
     """
     Converts an operator method to a string
@@ -881,10 +1232,117 @@ def _parse_ldap(ldap_filter):
     return root.normalize()
 
 
+class _FilterCache(object):
+    """
+    A thread-safe, bounded LRU cache of parsed LDAP filters, keyed by their
+    string representation.
+
+    The cached filters are shared: they must not be modified by their users.
+    """
+    def __init__(self, max_size):
+        """
+        Sets up the cache
+
+        :param max_size: Maximum number of filters in the cache
+        """
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+
+        # Filter string -> Parsed filter
+        self.__filters = collections.OrderedDict()
+
+        # Statistics
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def clear(self):
+        """
+        Clears the cache content and resets its statistics
+        """
+        with self.__lock:
+            self.__filters.clear()
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+
+    def get(self, ldap_filter):
+        """
+        Retrieves the parsed version of the given filter string, parsing it
+        if it is not yet known
+
+        :param ldap_filter: An LDAP filter string
+        :return: The corresponding filter, can be None
+        :raise ValueError: Invalid filter string found
+        """
+        with self.__lock:
+            try:
+                parsed = self.__filters.pop(ldap_filter)
+            except KeyError:
+                # Unknown filter
+                self.__misses += 1
+            else:
+                # Put it back on top of the LRU list
+                self.__hits += 1
+                self.__filters[ldap_filter] = parsed
+                return parsed
+
+        # Parse the filter outside the lock (errors are not cached)
+        parsed = _parse_ldap(ldap_filter)
+
+        with self.__lock:
+            if ldap_filter not in self.__filters:
+                self.__filters[ldap_filter] = parsed
+                while len(self.__filters) > self.__max_size:
+                    # Forget the least recently used filter
+                    self.__filters.popitem(last=False)
+                    self.__evictions += 1
+
+        return parsed
+
+    def stats(self):
+        """
+        Returns the statistics of the cache
+
+        :return: A dictionary with the size, max_size, hits, misses and
+                 evictions entries
+        """
+        with self.__lock:
+            return {'size': len(self.__filters),
+                    'max_size': self.__max_size,
+                    'hits': self.__hits,
+                    'misses': self.__misses,
+                    'evictions': self.__evictions}
+
+
+_CACHE = _FilterCache(CACHE_SIZE)
+""" The filters cache used by get_ldap_filter() """
+
+
+def clear_cache():
+    """
+    Clears the cache of parsed filters and resets its statistics
+    """
+    _CACHE.clear()
+
+
+def get_cache_stats():
+    """
+    Returns the statistics of the cache of parsed filters
+
+    :return: A dictionary with the size, max_size, hits, misses and evictions
+             entries
+    """
+    return _CACHE.stats()
+
+
 def get_ldap_filter(ldap_filter):
     """
     Retrieves the LDAP filter object corresponding to the given filter.
-    Parses it the argument if it is an LDAPFilter instance
+    Parses it the argument if it is an LDAPFilter instance.
+
+    Parsed filter strings are kept in a cache: the returned objects are shared
+    and must not be modified.
 
     :param ldap_filter: An LDAP filter (LDAPFilter or string)
     :return: The corresponding filter, can be None
@@ -899,8 +1357,8 @@ def get_ldap_filter(ldap_filter):
         return ldap_filter
 
     elif is_string(ldap_filter):
-        # Parse the filter
-        return _parse_ldap(ldap_filter)
+        # Parse the filter, or get it from the cache
+        return _CACHE.get(ldap_filter)
 
     # Unknown type
     raise TypeError("Unhandled filter type {0}"
@@ -353,7 +353,7 @@ class EndpointDescription(object):
         # Set up properties
         all_properties = {}
         if svc_ref is not None:
-            all_properties.update(svc_ref.get_properties())
+            all_properties.update(svc_ref.properties_view())
 
         if properties:
             all_properties.update(properties)
@@ -236,7 +236,7 @@ class Dispatcher(object):
             return
 
         # Prepare an endpoint name
-        name = self._compute_endpoint_name(svc_ref.get_properties())
+        name = self._compute_endpoint_name(svc_ref.properties_view())
 
         # Create endpoints
         endpoints = []
@@ -299,7 +299,7 @@ class Dispatcher(object):
 
                 # Compute the previous name
                 new_name = \
-                    self._compute_endpoint_name(svc_ref.get_properties())
+                    self._compute_endpoint_name(svc_ref.properties_view())
 
                 try:
                     exporter.update_export(endpoint, new_name, old_properties)
@@ -394,7 +394,7 @@ class Dispatcher(object):
             # Tell the exporter to export already known services
             for svc_ref in self.__service_uids:
                 # Compute the endpoint name
-                name = self._compute_endpoint_name(svc_ref.get_properties())
+                name = self._compute_endpoint_name(svc_ref.properties_view())
 
                 try:
                     # Create the endpoint
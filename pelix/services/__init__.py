@@ -54,6 +54,12 @@ PROP_EVENT_TOPICS = "event.topics"
 PROP_EVENT_FILTER = "event.filter"
 """ Filter on events properties for an event handler """
 
+PROP_EVENT_DEEPCOPY = "event.deepcopy"
+"""
+If True, the event handler receives a private deep copy of the event
+properties instead of a shallow copy sharing their values with other handlers
+"""
+
 EVENT_PROP_FRAMEWORK_UID = "event.sender.framework.uid"
 """ UID of the framework that emitted the event """
 
@@ -26,15 +26,20 @@ An EventAdmin-like implementation for Pelix: a publish-subscribe service
 """
 
 # Standard library
+import collections
 import copy
 import fnmatch
+import functools
 import logging
+import os
+import re
+import threading
 import time
 
 # Pelix
 from pelix.ipopo.decorators import ComponentFactory, Provides, Property, \
     Validate, Invalidate
-from pelix.utilities import to_iterable
+from pelix.utilities import to_iterable, is_coroutine, run_coroutine
 import pelix.constants
 import pelix.framework
 import pelix.ldapfilter
@@ -54,12 +59,393 @@ __docformat__ = "restructuredtext en"
 
 _logger = logging.getLogger(__name__)
 
+TOPICS_CACHE_SIZE = 1024
+""" Maximum number of topics kept in the cache of matching handlers """
+
+DELIVERY_EVENT = "event"
+""" Posted events are delivered to all their handlers by a single task """
+
+DELIVERY_HANDLER = "handler"
+"""
+Posted events are stored in per-handler FIFO queues, drained by the thread
+pool: each handler receives its events in order, while different handlers are
+notified in parallel
+"""
+
+OVERFLOW_BLOCK = "block"
+"""
+post() waits until the full queue of a handler has room for the event.
+Events posted by an event handler while it is notified of a queued event are
+dropped instead, as waiting could lead to a dead lock.
+"""
+
+OVERFLOW_DROP_OLDEST = "drop-oldest"
+""" The oldest event of the full queue of a handler is dropped """
+
+OVERFLOW_DROP_NEWEST = "drop-newest"
+""" The posted event is dropped for handlers which queue is full """
+
+QUEUE_BATCH_SIZE = 32
+"""
+Maximum number of events delivered to a handler by a pool task before letting
+the other handlers use the thread
+"""
+
+_DRAINING = threading.local()
+""" The "active" attribute is True in threads delivering queued events """
+
+# ------------------------------------------------------------------------------
+
+
+class _EventHandler(object):
+    """
+    Keeps the pre-computed description of an event handler service
+    """
+    __slots__ = ('reference', 'service_id', 'topics', 'matcher', 'deep_copy')
+
+    def __init__(self, svc_ref):
+        """
+        Sets up members
+
+        :param svc_ref: Reference to an event handler service
+        :raise ValueError: Invalid event filter
+        """
+        self.reference = svc_ref
+        self.service_id = svc_ref.get_property(pelix.constants.SERVICE_ID)
+
+        # Topics patterns, compiled into a single regular expression
+        topics = to_iterable(
+            svc_ref.get_property(pelix.services.PROP_EVENT_TOPICS), True)
+        if topics:
+            self.topics = re.compile('|'.join(
+                '(?:{0})'.format(fnmatch.translate(os.path.normcase(topic)))
+                for topic in topics))
+        else:
+            # Accept all topics
+            self.topics = None
+
+        # Compiled event filter
+        ldap_filter = svc_ref.get_property(pelix.services.PROP_EVENT_FILTER)
+        if ldap_filter:
+            self.matcher = pelix.ldapfilter.get_ldap_filter(ldap_filter) \
+                .compile()
+        else:
+            # Accept all events
+            self.matcher = None
+
+        # Private copy of the event properties
+        self.deep_copy = bool(
+            svc_ref.get_property(pelix.services.PROP_EVENT_DEEPCOPY))
+
+    def matches_topic(self, topic):
+        """
+        Tests if the given topic is handled
+
+        :param topic: An event topic
+        :return: True if the handler accepts this topic
+        """
+        if self.topics is None:
+            return True
+
+        # Same normalization as fnmatch.fnmatch()
+        return self.topics.match(os.path.normcase(topic)) is not None
+
+    def copy_properties(self, properties):
+        """
+        Prepares the copy of the event properties given to the handler
+
+        :param properties: Event properties
+        :return: A deep copy of the properties if the handler asked for it,
+                 else a shallow copy
+        """
+        if self.deep_copy:
+            return copy.deepcopy(properties)
+
+        return properties.copy()
+
+# ------------------------------------------------------------------------------
+
+
+def _read_only(*_):
+    """
+    Replaces the methods modifying the read-only containers
+    """
+    raise TypeError("Event properties values are read-only")
+
+
+class _ReadOnlyDict(dict):
+    """
+    A dictionary which can't be modified. Its copies are standard, writable
+    dictionaries.
+    """
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = \
+        _read_only
+
+    def __copy__(self):
+        """
+        Returns a writable copy of this dictionary
+        """
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        """
+        Returns a writable deep copy of this dictionary
+        """
+        return dict((copy.deepcopy(key, memo), copy.deepcopy(value, memo))
+                    for key, value in self.items())
+
+    def __reduce__(self):
+        """
+        Pickles this dictionary as a standard one
+        """
+        return dict, (dict(self),)
+
+    def copy(self):
+        """
+        Returns a writable copy of this dictionary
+        """
+        return dict(self)
+
+
+class _ReadOnlyList(list):
+    """
+    A list which can't be modified. Its copies are standard, writable lists.
+    """
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = append = extend = \
+        insert = pop = remove = reverse = sort = _read_only
+
+    # Python 2
+    __setslice__ = __delslice__ = _read_only
+
+    def __copy__(self):
+        """
+        Returns a writable copy of this list
+        """
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        """
+        Returns a writable deep copy of this list
+        """
+        return [copy.deepcopy(value, memo) for value in self]
+
+    def __reduce__(self):
+        """
+        Pickles this list as a standard one
+        """
+        return list, (list(self),)
+
+
+class _ReadOnlySet(set):
+    """
+    A set which can't be modified. Its copies are standard, writable sets.
+    """
+    __slots__ = ()
+
+    __ior__ = __iand__ = __ixor__ = __isub__ = add = clear = discard = pop = \
+        remove = update = difference_update = intersection_update = \
+        symmetric_difference_update = _read_only
+
+    def __copy__(self):
+        """
+        Returns a writable copy of this set
+        """
+        return set(self)
+
+    def __deepcopy__(self, memo):
+        """
+        Returns a writable deep copy of this set
+        """
+        return set(copy.deepcopy(value, memo) for value in self)
+
+    def __reduce__(self):
+        """
+        Pickles this set as a standard one
+        """
+        return set, (set(self),)
+
+    def copy(self):
+        """
+        Returns a writable copy of this set
+        """
+        return set(self)
+
+
+def _freeze(value):
+    """
+    Converts the lists, dictionaries and sets in the given value into
+    read-only containers
+
+    :param value: An event property value
+    :return: The value itself, or a read-only copy of it
+    """
+    if isinstance(value, (_ReadOnlyDict, _ReadOnlyList, _ReadOnlySet,
+                          frozenset)):
+        # Already read-only
+        return value
+
+    elif isinstance(value, dict):
+        return _ReadOnlyDict((key, _freeze(item))
+                             for key, item in value.items())
+
+    elif isinstance(value, list):
+        return _ReadOnlyList(_freeze(item) for item in value)
+
+    elif isinstance(value, set):
+        # Sets content is hashable, i.e. immutable
+        return _ReadOnlySet(value)
+
+    elif type(value) is tuple:
+        return tuple(_freeze(item) for item in value)
+
+    return value
+
+# ------------------------------------------------------------------------------
+
+
+class _HandlerQueue(object):
+    """
+    FIFO of the events posted to an event handler
+    """
+    def __init__(self, max_depth=0, overflow=OVERFLOW_BLOCK):
+        """
+        Sets up members
+
+        :param max_depth: Maximum number of events in the queue (0 for
+                          infinite)
+        :param overflow: Policy to apply when the queue is full
+        """
+        self.__events = collections.deque()
+        self.__max_depth = max_depth
+        self.__overflow = overflow
+        self.__condition = threading.Condition()
+
+        # A pool task is in charge of draining the queue
+        self.__scheduled = False
+
+        # The handler is gone
+        self.__closed = False
+
+        # Statistics
+        self.__peak = 0
+        self.__dropped = 0
+        self.__delivered = 0
+
+    def push(self, event):
+        """
+        Appends an event to the queue, applying the overflow policy if the
+        queue is full
+
+        :param event: The event to store
+        :return: True if a pool task must be scheduled to drain the queue
+        """
+        with self.__condition:
+            if self.__max_depth > 0:
+                while not self.__closed \
+                        and len(self.__events) >= self.__max_depth:
+                    if self.__overflow == OVERFLOW_DROP_NEWEST:
+                        # Ignore the new event
+                        self.__dropped += 1
+                        return False
+
+                    elif self.__overflow == OVERFLOW_DROP_OLDEST:
+                        # Make some room
+                        self.__events.popleft()
+                        self.__dropped += 1
+
+                    elif getattr(_DRAINING, "active", False):
+                        # Posted by a handler: waiting for another handler,
+                        # or for itself, could never end
+                        _logger.warning("Queue full: dropping an event "
+                                        "posted by an event handler")
+                        self.__dropped += 1
+                        return False
+
+                    else:
+                        # Wait for the handler to consume an event
+                        self.__condition.wait()
+
+            if self.__closed:
+                return False
+
+            self.__events.append(event)
+            self.__peak = max(self.__peak, len(self.__events))
+
+            if self.__scheduled:
+                # Already being drained
+                return False
+
+            self.__scheduled = True
+            return True
+
+    def pop(self):
+        """
+        Pops the next event to deliver. If the queue is empty, it is
+        considered as not scheduled anymore.
+
+        :return: The next event, or None
+        """
+        with self.__condition:
+            if self.__closed or not self.__events:
+                self.__scheduled = False
+                return None
+
+            self.__delivered += 1
+            event = self.__events.popleft()
+            self.__condition.notify_all()
+            return event
+
+    def suspend(self):
+        """
+        Called when the draining task gives its thread back to the pool: the
+        queue stays scheduled
+
+        :return: False if the queue has been closed
+        """
+        with self.__condition:
+            if self.__closed:
+                self.__scheduled = False
+                return False
+
+            return True
+
+    def close(self):
+        """
+        Drops the pending events and releases the waiting producers
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__dropped += len(self.__events)
+            self.__events.clear()
+            self.__condition.notify_all()
+
+    def stats(self):
+        """
+        Returns the statistics of the queue
+
+        :return: A dictionary with the current depth, the maximum depth, the
+                 peak depth and the number of delivered and dropped events
+        """
+        with self.__condition:
+            return {"depth": len(self.__events),
+                    "max_depth": self.__max_depth,
+                    "peak": self.__peak,
+                    "delivered": self.__delivered,
+                    "dropped": self.__dropped}
+
 # ------------------------------------------------------------------------------
 
 
 @ComponentFactory(pelix.services.FACTORY_EVENT_ADMIN)
 @Provides(pelix.services.SERVICE_EVENT_ADMIN)
 @Property("_nb_threads", "pool.threads", 10)
+@Property("_delivery", "delivery.mode", DELIVERY_EVENT)
+@Property("_queue_depth", "queue.depth", 0)
+@Property("_queue_overflow", "queue.overflow", OVERFLOW_BLOCK)
 class EventAdmin(object):
     """
     The EventAdmin implementation
@@ -80,6 +466,24 @@ class EventAdmin(object):
         # Thread pool
         self._pool = None
 
+        # Framework event loop, executing the coroutine handlers
+        self._loop = None
+
+        # Delivery of posted events
+        self._delivery = DELIVERY_EVENT
+        self._queue_depth = 0
+        self._queue_overflow = OVERFLOW_BLOCK
+
+        # Service ID -> _EventHandler
+        self.__handlers = {}
+
+        # Service ID -> _HandlerQueue (per-handler delivery only)
+        self.__queues = {}
+
+        # Topic -> Sorted tuple of _EventHandler (cleared on handlers update)
+        self.__topics_cache = {}
+        self.__handlers_lock = threading.Lock()
+
     def _get_handlers_ids(self, topic, properties):
         """
         Retrieves the IDs of the listeners that requested to handle this event
@@ -88,55 +492,100 @@ class EventAdmin(object):
         :param properties: Associated properties
         :return: The IDs of the services to call back for this event
         """
-        handlers = []
+        return [handler.service_id
+                for handler in self._get_handlers(topic, properties)]
 
-        # Get the handler service references
-        handlers_refs = self._context.get_all_service_references(
-            pelix.services.SERVICE_EVENT_HANDLER, None)
+    def _get_handlers(self, topic, properties):
+        """
+        Retrieves the description of the listeners that requested to handle
+        this event
 
-        if handlers_refs is None:
-            # No service found
-            return
+        :param topic: Topic of the event
+        :param properties: Associated properties
+        :return: The _EventHandler beans of the services to call back
+        """
+        # Check the LDAP filters
+        return [handler for handler in self.__get_topic_handlers(topic)
+                if handler.matcher is None or handler.matcher(properties)]
 
-        for svc_ref in handlers_refs:
-            # Check the LDAP filter
-            ldap_filter = \
-                svc_ref.get_property(pelix.services.PROP_EVENT_FILTER)
-            if self.__match_filter(properties, ldap_filter):
-                # Get the service ID
-                svc_id = svc_ref.get_property(pelix.constants.SERVICE_ID)
-
-                # Filter matches the event, test the topic
-                topics = to_iterable(svc_ref.get_property(
-                    pelix.services.PROP_EVENT_TOPICS), True)
-                if not topics:
-                    # Filter matches, and no topic filter given: notify it
-                    handlers.append(svc_id)
-                else:
-                    for handled_topic in to_iterable(topics, False):
-                        if fnmatch.fnmatch(topic, handled_topic):
-                            # Full match, keep the service ID
-                            handlers.append(svc_id)
-                            break
+    def __get_topic_handlers(self, topic):
+        """
+        Retrieves the description of the listeners handling the given topic,
+        without checking their filter
+
+        :param topic: Topic of the event
+        :return: A sorted tuple of _EventHandler beans
+        """
+        with self.__handlers_lock:
+            try:
+                handlers = self.__topics_cache[topic]
+            except KeyError:
+                # Look for the handlers of this topic
+                handlers = tuple(sorted(
+                    (handler for handler in self.__handlers.values()
+                     if handler.matches_topic(topic)),
+                    key=lambda handler: handler.reference))
+
+                if len(self.__topics_cache) >= TOPICS_CACHE_SIZE:
+                    # Too many topics: start over
+                    self.__topics_cache.clear()
+                self.__topics_cache[topic] = handlers
 
         return handlers
 
-    @staticmethod
-    def __match_filter(properties, ldap_filter):
+    def __add_handler(self, svc_ref):
         """
-        Tests if the given properties match the given filter
+        Stores the description of an event handler service
 
-        :param properties: A set of properties
-        :param ldap_filter: An LDAP filter string, object or None
-        :return: True if the properties match the filter
+        :param svc_ref: Reference to an event handler service
         """
-        if not ldap_filter:
-            # No filter
-            return True
+        try:
+            handler = _EventHandler(svc_ref)
+        except ValueError as ex:
+            _logger.error("Ignoring event handler %s: invalid filter: %s",
+                          svc_ref, ex)
+            self.__remove_handler(svc_ref)
+            return
+
+        with self.__handlers_lock:
+            self.__handlers[handler.service_id] = handler
+            self.__topics_cache.clear()
+
+            if self._delivery == DELIVERY_HANDLER \
+                    and handler.service_id not in self.__queues:
+                self.__queues[handler.service_id] = _HandlerQueue(
+                    self._queue_depth, self._queue_overflow)
+
+    def __remove_handler(self, svc_ref):
+        """
+        Forgets the description of an event handler service
+
+        :param svc_ref: Reference to an event handler service
+        """
+        svc_id = svc_ref.get_property(pelix.constants.SERVICE_ID)
+        with self.__handlers_lock:
+            if self.__handlers.pop(svc_id, None) is not None:
+                self.__topics_cache.clear()
+
+            queue = self.__queues.pop(svc_id, None)
 
-        # Normalize the filter
-        ldap_filter = pelix.ldapfilter.get_ldap_filter(ldap_filter)
-        return ldap_filter.matches(properties)
+        if queue is not None:
+            # Drop pending events
+            queue.close()
+
+    def service_changed(self, event):
+        """
+        Called by Pelix when an event handler service event occurred
+
+        :param event: A ServiceEvent object
+        """
+        if event.get_kind() in (pelix.framework.ServiceEvent.REGISTERED,
+                                pelix.framework.ServiceEvent.MODIFIED):
+            # New or modified handler
+            self.__add_handler(event.get_service_reference())
+        else:
+            # Handler gone
+            self.__remove_handler(event.get_service_reference())
 
     def __get_service(self, service_id):
         """
@@ -150,12 +599,8 @@ class EventAdmin(object):
         :return: A (reference, service) tuple or (None, None)
         """
         try:
-            # Prepare the filter
-            ldap_filter = "({0}={1})".format(pelix.constants.SERVICE_ID,
-                                             service_id)
-
             # Get the reference
-            ref = self._context.get_service_reference(None, ldap_filter)
+            ref = self._context.get_service_reference_by_id(service_id)
             if ref is None:
                 # Unknown service
                 return None, None
@@ -167,27 +612,132 @@ class EventAdmin(object):
             # Service disappeared
             return None, None
 
-    def __notify_handlers(self, topic, properties, handlers_ids):
+    def __notify_handlers(self, topic, properties, handlers):
         """
-        Notifies the handlers of an event
+        Notifies the handlers of an event.
+
+        Each handler receives a shallow copy of the event properties: it can
+        add, replace or remove entries without disturbing the other handlers.
+        The lists and dictionaries in the values are read-only views, shared
+        by all handlers: a handler must copy them (with ``copy.copy()``,
+        ``list()``, ``dict()``, ...) to modify them. Handlers with the
+        PROP_EVENT_DEEPCOPY property set receive a private, writable deep
+        copy instead.
 
         :param topic: Topic of the event
         :param properties: Associated properties
-        :param handlers_ids: IDs of the services to notify
+        :param handlers: Descriptions (_EventHandler) of the services to
+                         notify
         """
         if self._context is None:
             # No more context
             return
 
-        for handler_id in handlers_ids:
+        for event_handler in handlers:
+            handler_id = event_handler.service_id
+
             # Define the "ref" variable name (and reset it on each loop)
             ref = None
             try:
                 # Get the service
                 ref, handler = self.__get_service(handler_id)
                 if handler is not None:
-                    # Use a copy of the properties each time
-                    handler.handle_event(topic, copy.deepcopy(properties))
+                    self.__call_handler(
+                        handler_id, handler.handle_event, topic,
+                        event_handler.copy_properties(properties))
+            except Exception as ex:
+                _logger.exception("Error notifying event handler %d: %s (%s)",
+                                  handler_id, ex, type(ex).__name__)
+            finally:
+                if ref is not None:
+                    self._context.unget_service(ref)
+
+    def __call_handler(self, handler_id, method, topic, argument):
+        """
+        Calls a method of an event handler. If it returns a coroutine, it is
+        scheduled on the framework event loop, if it is running, without
+        waiting for it. Otherwise, the coroutine is executed by a temporary
+        event loop and waited for.
+
+        :param handler_id: Service ID of the handler
+        :param method: The handler method
+        :param topic: Topic of the event
+        :param argument: Properties of the event(s)
+        """
+        result = method(topic, argument)
+        if not is_coroutine(result):
+            return
+
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            # pylint: disable=F0401
+            import asyncio
+            future = asyncio.run_coroutine_threadsafe(result, loop)
+            future.add_done_callback(
+                functools.partial(self.__coroutine_done, handler_id))
+        else:
+            run_coroutine(result, loop)
+
+    @staticmethod
+    def __coroutine_done(handler_id, future):
+        """
+        Logs the error raised by the coroutine of an event handler, if any
+
+        :param handler_id: Service ID of the handler
+        :param future: The future of the coroutine
+        """
+        if future.cancelled():
+            return
+
+        ex = future.exception()
+        if ex is not None:
+            _logger.error("Error in the coroutine of event handler %d: %s (%s)",
+                          handler_id, ex, type(ex).__name__, exc_info=ex)
+
+    def __notify_batches(self, topic, batches):
+        """
+        Notifies the handlers of a batch of events.
+
+        Handlers implementing a ``handle_events(topic, properties_list)``
+        method receive all their events in a single call, the others get one
+        ``handle_event()`` call per event.
+
+        :param topic: Topic of the events
+        :param batches: A list of (_EventHandler, list of properties) tuples
+        """
+        if self._context is None:
+            # No more context
+            return
+
+        for event_handler, events in batches:
+            handler_id = event_handler.service_id
+
+            # Define the "ref" variable name (and reset it on each loop)
+            ref = None
+            try:
+                # Get the service
+                ref, handler = self.__get_service(handler_id)
+                if handler is None:
+                    continue
+
+                events = [event_handler.copy_properties(properties)
+                          for properties in events]
+                try:
+                    handle_events = handler.handle_events
+                except AttributeError:
+                    # Notify events one by one
+                    for properties in events:
+                        try:
+                            self.__call_handler(
+                                handler_id, handler.handle_event, topic,
+                                properties)
+                        except Exception as ex:
+                            _logger.exception(
+                                "Error notifying event handler %d: %s (%s)",
+                                handler_id, ex, type(ex).__name__)
+                else:
+                    self.__call_handler(
+                        handler_id, handle_events, topic, events)
             except Exception as ex:
                 _logger.exception("Error notifying event handler %d: %s (%s)",
                                   handler_id, ex, type(ex).__name__)
@@ -195,24 +745,108 @@ class EventAdmin(object):
                 if ref is not None:
                     self._context.unget_service(ref)
 
-    def __setup_properties(self, properties):
+    def __prepare_batch(self, topic, properties_list):
+        """
+        Prepares the properties of a batch of events, all with the same time
+        stamp, and sorts them by handler
+
+        :param topic: Topic of the events
+        :param properties_list: An iterable of event properties
+        :return: A list of (_EventHandler, list of properties) tuples
+        """
+        handlers = self.__get_topic_handlers(topic)
+        if not handlers:
+            return []
+
+        timestamp = time.time()
+        batches = [(handler, []) for handler in handlers]
+        for properties in properties_list:
+            properties = self.__setup_properties(properties, timestamp)
+            for handler, events in batches:
+                if handler.matcher is None or handler.matcher(properties):
+                    events.append(properties)
+
+        return [(handler, events) for handler, events in batches if events]
+
+    def __drain_queue(self, queue):
+        """
+        Delivers the events stored in the queue of a handler, in order.
+        Gives the thread back to the pool after QUEUE_BATCH_SIZE events.
+
+        :param queue: A _HandlerQueue
+        """
+        _DRAINING.active = True
+        try:
+            for _ in range(QUEUE_BATCH_SIZE):
+                event = queue.pop()
+                if event is None:
+                    # Queue is empty
+                    return
+
+                topic, properties, handler = event
+                self.__notify_handlers(topic, properties, (handler,))
+        finally:
+            _DRAINING.active = False
+
+        pool = self._pool
+        if queue.suspend() and pool is not None:
+            # Let the other handlers be notified before continuing
+            pool.enqueue(self.__drain_queue, queue)
+
+    def __enqueue_event(self, topic, properties, handlers):
+        """
+        Stores a posted event in the queues of its handlers
+
+        :param topic: Topic of the event
+        :param properties: Associated properties
+        :param handlers: Descriptions (_EventHandler) of the services to
+                         notify
+        """
+        for handler in handlers:
+            with self.__handlers_lock:
+                queue = self.__queues.get(handler.service_id)
+
+            if queue is not None \
+                    and queue.push((topic, properties, handler)):
+                # Queue wasn't being drained
+                self._pool.enqueue(self.__drain_queue, queue)
+
+    def get_queues_stats(self):
+        """
+        Returns the statistics of the per-handler queues of posted events.
+        The dictionary is empty if the per-handler delivery mode is not
+        active.
+
+        :return: A Service ID -> statistics dictionary (see
+                 _HandlerQueue.stats())
+        """
+        with self.__handlers_lock:
+            queues = list(self.__queues.items())
+
+        return dict((svc_id, queue.stats()) for svc_id, queue in queues)
+
+    def __setup_properties(self, properties, timestamp=None):
         """
         Adds the EventAdmin specific properties to the event
 
         :param properties: The initial event properties
+        :param timestamp: Time stamp of the event (computed if None)
         :return: A copy of the initial properties, or new ones, with the
-                 EventAdmin specific properties
+                 EventAdmin specific properties. The containers in the values
+                 are converted to read-only ones.
         """
-        # Compute the event time stamp
-        timestamp = time.time()
+        if timestamp is None:
+            # Compute the event time stamp
+            timestamp = time.time()
 
         if not isinstance(properties, dict):
             # Create a new dictionary
             props = {}
 
         else:
-            # Copy the given one
-            props = properties.copy()
+            # Copy the given one, once for all handlers
+            props = dict((key, _freeze(value))
+                         for key, value in properties.items())
 
         # ... event time stamp
         props[pelix.services.EVENT_PROP_TIMESTAMP] = timestamp
@@ -233,10 +867,10 @@ class EventAdmin(object):
         properties = self.__setup_properties(properties)
 
         # Get the currently available handlers
-        handlers_ids = self._get_handlers_ids(topic, properties)
-        if handlers_ids:
+        handlers = self._get_handlers(topic, properties)
+        if handlers:
             # Notify them
-            self.__notify_handlers(topic, properties, handlers_ids)
+            self.__notify_handlers(topic, properties, handlers)
 
     def post(self, topic, properties=None):
         """
@@ -249,11 +883,64 @@ class EventAdmin(object):
         properties = self.__setup_properties(properties)
 
         # Get the currently available handlers
-        handlers_ids = self._get_handlers_ids(topic, properties)
-        if handlers_ids:
+        handlers = self._get_handlers(topic, properties)
+        if not handlers:
+            return
+
+        if self._delivery == DELIVERY_HANDLER:
+            # Use the FIFO of each handler
+            self.__enqueue_event(topic, properties, handlers)
+        else:
             # Enqueue the task in the thread pool
             self._pool.enqueue(self.__notify_handlers, topic, properties,
-                               handlers_ids)
+                               handlers)
+
+    def send_many(self, topic, properties_list):
+        """
+        Sends synchronously a batch of events with the same topic.
+
+        Handlers are looked for once and all events get the same time stamp.
+        Handlers implementing a ``handle_events(topic, properties_list)``
+        method receive their events in a single call.
+
+        :param topic: Topic of the events
+        :param properties_list: An iterable of event properties
+        """
+        batches = self.__prepare_batch(topic, properties_list)
+        if batches:
+            # Notify handlers
+            self.__notify_batches(topic, batches)
+
+    def post_many(self, topic, properties_list):
+        """
+        Sends asynchronously a batch of events with the same topic.
+
+        Handlers are looked for once and all events get the same time stamp.
+        Handlers implementing a ``handle_events(topic, properties_list)``
+        method receive their events in a single call, unless events are
+        delivered through per-handler queues.
+
+        :param topic: Topic of the events
+        :param properties_list: An iterable of event properties
+        """
+        batches = self.__prepare_batch(topic, properties_list)
+        if not batches:
+            return
+
+        if self._delivery == DELIVERY_HANDLER:
+            # Use the FIFO of each handler
+            for handler, events in batches:
+                with self.__handlers_lock:
+                    queue = self.__queues.get(handler.service_id)
+
+                if queue is not None:
+                    for properties in events:
+                        if queue.push((topic, properties, handler)):
+                            # Queue wasn't being drained
+                            self._pool.enqueue(self.__drain_queue, queue)
+        else:
+            # Enqueue a single task in the thread pool
+            self._pool.enqueue(self.__notify_batches, topic, batches)
 
     @Validate
     def validate(self, context):
@@ -277,19 +964,59 @@ class EventAdmin(object):
             # Default value
             self._nb_threads = 10
 
+        if self._delivery not in (DELIVERY_EVENT, DELIVERY_HANDLER):
+            _logger.warning("Unknown delivery mode %s, using %s",
+                            self._delivery, DELIVERY_EVENT)
+            self._delivery = DELIVERY_EVENT
+
+        try:
+            self._queue_depth = max(0, int(self._queue_depth or 0))
+        except (TypeError, ValueError):
+            # Infinite queues
+            self._queue_depth = 0
+
+        if self._queue_overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST,
+                                        OVERFLOW_DROP_NEWEST):
+            _logger.warning("Unknown queue overflow policy %s, using %s",
+                            self._queue_overflow, OVERFLOW_BLOCK)
+            self._queue_overflow = OVERFLOW_BLOCK
+
+        self._loop = context.get_property(
+            pelix.constants.FRAMEWORK_EVENT_LOOP)
+
         # Create the thread pool
         self._pool = pelix.threadpool.ThreadPool(self._nb_threads,
                                                  logname="eventadmin-pool")
         self._pool.start()
 
+        # Keep track of the event handlers
+        context.add_service_listener(
+            self, None, pelix.services.SERVICE_EVENT_HANDLER)
+        for svc_ref in context.get_all_service_references(
+                pelix.services.SERVICE_EVENT_HANDLER) or []:
+            self.__add_handler(svc_ref)
+
     @Invalidate
     def invalidate(self, context):
         """
         Component invalidated
         """
+        # Forget the event handlers
+        context.remove_service_listener(self)
+        with self.__handlers_lock:
+            self.__handlers.clear()
+            self.__topics_cache.clear()
+            queues = list(self.__queues.values())
+            self.__queues.clear()
+
+        # Release the producers waiting for room in the queues
+        for queue in queues:
+            queue.close()
+
         # Stop the thread pool (empties its queue)
         self._pool.stop()
         self._pool = None
+        self._loop = None
 
         # Forget the bundle context
         self._context = None
@@ -392,8 +392,13 @@ class _ShellService(parser.Shell):
         """
         Prints the details of the service with the given ID
         """
-        svc_ref = self._context.get_service_reference(
-            None, '({0}={1})'.format(constants.SERVICE_ID, service_id))
+        try:
+            svc_ref = self._context.get_service_reference_by_id(
+                int(service_id))
+        except ValueError:
+            # Invalid service ID
+            svc_ref = None
+
         if svc_ref is None:
             io_handler.write_line('Service not found: {0}', service_id)
             return False
@@ -407,7 +412,7 @@ class _ShellService(parser.Shell):
                 svc_ref.get_property(constants.OBJECTCLASS)),
             "Bundle........: {0}".format(svc_ref.get_bundle()),
             "Properties....:"]
-        for key, value in sorted(svc_ref.get_properties().items()):
+        for key, value in sorted(svc_ref.properties_view().items()):
             lines.append("\t{0} = {1}".format(key, value))
 
         lines.append("Bundles using this service:")
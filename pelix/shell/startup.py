@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Startup tracer shell commands
+
+Provides commands to the Pelix shell to show and export the startup timeline
+recorded when the framework has been created with the
+``pelix.framework.startup_tracer`` property.
+
+:author: Thomas Calmant
+:copyright: Copyright 2015, Thomas Calmant
+:license: Apache License 2.0
+:version: 0.6.4
+
+..
+
+    Copyright 2015 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+# Pelix
+from pelix.ipopo.decorators import ComponentFactory, Requires, Provides, \
+    Instantiate, Validate, Invalidate
+from pelix.internals.tracer import FORMAT_JSON
+import pelix.constants
+import pelix.shell
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 6, 4)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+
+@ComponentFactory("startup-shell-commands-factory")
+@Requires("_utils", pelix.shell.SERVICE_SHELL_UTILS)
+@Provides(pelix.shell.SERVICE_SHELL_COMMAND)
+@Instantiate("startup-shell-commands")
+class StartupCommands(object):
+    """
+    Startup tracer shell commands
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        # Injected services
+        self._utils = None
+
+        # The startup tracer of the framework
+        self._tracer = None
+
+    @Validate
+    def _validate(self, context):
+        """
+        Component validated
+        """
+        self._tracer = context.get_bundle(0).get_startup_tracer()
+
+    @Invalidate
+    def _invalidate(self, context):
+        """
+        Component invalidated
+        """
+        self._tracer = None
+
+    @staticmethod
+    def get_namespace():
+        """
+        Retrieves the name space of this command handler
+        """
+        return "startup"
+
+    def get_methods(self):
+        """
+        Retrieves the list of tuples (command, method) for this command handler
+        """
+        return [("timeline", self.timeline),
+                ("export", self.export)]
+
+    def __check_tracer(self, session):
+        """
+        Checks if the startup tracer is enabled
+
+        :param session: The shell session
+        :return: True if the tracer is enabled
+        """
+        if self._tracer is None:
+            session.write_line("Startup tracer disabled: set the '{0}' "
+                               "framework property to enable it.",
+                               pelix.constants.FRAMEWORK_STARTUP_TRACER)
+            return False
+
+        return True
+
+    def timeline(self, session, count=10, category=None):
+        """
+        Prints the slowest phases of the startup (count=0 to print all)
+        """
+        if not self.__check_tracer(session):
+            return False
+
+        try:
+            count = int(count) or None
+        except ValueError:
+            session.write_line("Invalid count: {0}", count)
+            return False
+
+        events = self._tracer.get_slowest(count, category)
+        headers = ('Category', 'Name', 'Start (ms)', 'Duration (ms)',
+                   'Thread')
+        lines = [(event.category, event.name,
+                  "{0:.3f}".format(event.start * 1000),
+                  "{0:.3f}".format(event.duration * 1000),
+                  event.thread)
+                 for event in events]
+
+        session.write(self._utils.make_table(headers, lines))
+        session.write_line("{0} phases shown", len(lines))
+
+    def export(self, session, filename, trace_format=FORMAT_JSON):
+        """
+        Exports the startup timeline to a file (json or chrome format)
+        """
+        if not self.__check_tracer(session):
+            return False
+
+        try:
+            self._tracer.export(filename, trace_format)
+        except (ValueError, IOError) as ex:
+            session.write_line("Error exporting the timeline: {0}", ex)
+            return False
+
+        session.write_line("Timeline written to {0}", filename)
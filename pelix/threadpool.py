@@ -26,8 +26,11 @@ Pelix Utilities: Cached thread pool
 """
 
 # Standard library
+import collections
+import itertools
 import logging
 import threading
+import time
 
 try:
     # Python 3
@@ -38,6 +41,19 @@ except ImportError:
     # pylint: disable=F0401
     import Queue as queue
 
+try:
+    # Python 3, or Python 2 with the "futures" back-port
+    # pylint: disable=F0401
+    from concurrent.futures import Future as _Future, CancelledError
+except ImportError:
+    _Future = object
+
+    class CancelledError(Exception):
+        """
+        The job has been cancelled
+        """
+        pass
+
 # Pelix
 import pelix.utilities
 
@@ -52,10 +68,36 @@ __version__ = ".".join(str(x) for x in __version_info__)
 
 # ------------------------------------------------------------------------------
 
+PRIORITY_HIGH = 0
+""" Priority of latency-critical tasks """
+
+PRIORITY_NORMAL = 50
+""" Default priority of tasks """
+
+PRIORITY_LOW = 100
+""" Priority of bulk tasks """
+
+_WAKE_UP = object()
+""" Queued to wake up an idle thread, to let it steal a task """
+
+
+class DeadlineError(OSError):
+    """
+    Exception given to the FutureResult of a task which deadline expired
+    before its execution
+    """
+    pass
+
+# ------------------------------------------------------------------------------
+
 
-class FutureResult(object):
+class FutureResult(_Future):
     """
-    An object to wait for the result of a threaded execution
+    An object to wait for the result of a threaded execution.
+
+    When the ``concurrent.futures`` module is available, this class inherits
+    from its ``Future`` class: it can be given to ``concurrent.futures.wait()``
+    or to ``asyncio.wrap_future()``.
     """
     def __init__(self, logger=None):
         """
@@ -63,11 +105,19 @@ class FutureResult(object):
 
         :param logger: The Logger to use in case of error (optional)
         """
+        if _Future is not object:
+            _Future.__init__(self)
+
         self._logger = logger or logging.getLogger(__name__)
         self._done_event = pelix.utilities.EventData()
         self.__callback = None
         self.__extra = None
 
+        # Methods called with the future as argument, once it is done (set to
+        # None once called)
+        self.__done_callbacks = []
+        self.__callbacks_lock = threading.Lock()
+
     def __notify(self):
         """
         Notify the given callback about the result of the execution
@@ -80,6 +130,51 @@ class FutureResult(object):
             except Exception as ex:
                 self._logger.exception("Error calling back method: %s", ex)
 
+    def __set_done(self, result=None, exception=None):
+        """
+        Stores the result or the exception of the job and notifies the
+        callbacks
+
+        :param result: Result of the job
+        :param exception: Exception raised by the job (if any)
+        """
+        if exception is None:
+            self._done_event.set(result)
+        else:
+            self._done_event.raise_exception(exception)
+
+        if _Future is not object:
+            # Wake up concurrent.futures.wait() callers
+            if exception is None:
+                _Future.set_result(self, result)
+            else:
+                _Future.set_exception(self, exception)
+
+        self.__notify_all()
+
+    def __notify_all(self):
+        """
+        Notifies the legacy callback and the done callbacks
+        """
+        self.__notify()
+
+        with self.__callbacks_lock:
+            callbacks, self.__done_callbacks = self.__done_callbacks, None
+
+        for callback in callbacks:
+            self.__call_done_callback(callback)
+
+    def __call_done_callback(self, callback):
+        """
+        Calls a done callback, logging its errors
+
+        :param callback: A method accepting the future as argument
+        """
+        try:
+            callback(self)
+        except Exception as ex:
+            self._logger.exception("Error calling back method: %s", ex)
+
     def set_callback(self, method, extra=None):
         """
         Sets a callback method, called once the result has been computed or in
@@ -97,6 +192,50 @@ class FutureResult(object):
             # The execution has already finished
             self.__notify()
 
+    def add_done_callback(self, method):
+        """
+        Adds a method to call once the job is done, with this future as
+        argument. Unlike set_callback(), any number of callbacks can be
+        added. The method is called immediately if the job is already done.
+
+        :param method: A method accepting the future as argument
+        """
+        with self.__callbacks_lock:
+            if self.__done_callbacks is not None:
+                self.__done_callbacks.append(method)
+                return
+
+        # Already done
+        self.__call_done_callback(method)
+
+    def then(self, method):
+        """
+        Chains a method to this future: once the job is done, the method is
+        called with its result. If the job raised an exception, the method
+        isn't called and the exception is propagated.
+
+        :param method: A method accepting the result of the job
+        :return: The FutureResult of the call to the method
+        """
+        future = FutureResult(self._logger)
+
+        def chain(_):
+            """
+            Calls the chained method when the job is done
+            """
+            exception = self._done_event.exception
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                try:
+                    future.execute(method, (self._done_event.data,), None)
+                except Exception:
+                    # Already stored in the future
+                    pass
+
+        self.add_done_callback(chain)
+        return future
+
     def execute(self, method, args, kwargs):
         """
         Execute the given method and stores its result.
@@ -107,6 +246,10 @@ class FutureResult(object):
         :param kwargs: Method keyword arguments
         :raise Exception: The exception raised by the method
         """
+        if not self.__set_running():
+            # The future has been cancelled
+            return
+
         # Normalize arguments
         if args is None:
             args = []
@@ -119,14 +262,69 @@ class FutureResult(object):
             result = method(*args, **kwargs)
         except Exception as ex:
             # Something went wrong: propagate to the event and to the caller
-            self._done_event.raise_exception(ex)
+            self.__set_done(exception=ex)
             raise
         else:
             # Store the result
-            self._done_event.set(result)
-        finally:
-            # In any case: notify the call back (if any)
-            self.__notify()
+            self.__set_done(result)
+
+    def set_result(self, result):
+        """
+        Considers the job as done with the given result, without executing
+        anything
+
+        :param result: The result of the job
+        """
+        if self.__set_running():
+            self.__set_done(result)
+
+    def set_exception(self, exception):
+        """
+        Considers the job as done with the given exception, without
+        executing anything
+
+        :param exception: The exception raised by result()
+        """
+        if self.__set_running():
+            self.__set_done(exception=exception)
+
+    def __set_running(self):
+        """
+        Marks the job as running, unless it has been cancelled
+
+        :return: False if the job has been cancelled
+        """
+        if _Future is object or self.running():
+            return True
+
+        return self.set_running_or_notify_cancel()
+
+    def cancel(self):
+        """
+        Cancels the job if it hasn't been started yet.
+        Only supported when the concurrent.futures module is available.
+
+        :return: True if the job has been cancelled
+        """
+        if _Future is object or self.cancelled():
+            return False
+
+        if not _Future.cancel(self):
+            # Already running or done
+            return False
+
+        self._done_event.raise_exception(CancelledError())
+        self.__notify_all()
+        return True
+
+    def cancelled(self):
+        """
+        Returns True if the job has been cancelled
+        """
+        if _Future is object:
+            return False
+
+        return _Future.cancelled(self)
 
     def done(self):
         """
@@ -134,6 +332,29 @@ class FutureResult(object):
         """
         return self._done_event.is_set()
 
+    def exception(self, timeout=None):
+        """
+        Waits up to timeout for the job to finish and returns the exception
+        it raised, if any
+
+        :param timeout: The maximum time to wait (in seconds)
+        :return: The exception raised by the job, or None
+        :raise OSError: The timeout raised before the job finished
+        :raise CancelledError: The job has been cancelled
+        """
+        if self.cancelled():
+            raise CancelledError()
+
+        if not self._done_event.is_set():
+            try:
+                self.result(timeout)
+            except Exception:
+                if not self._done_event.is_set():
+                    # Timeout
+                    raise
+
+        return self._done_event.exception
+
     def result(self, timeout=None):
         """
         Waits up to timeout for the result the threaded job.
@@ -148,15 +369,83 @@ class FutureResult(object):
         else:
             raise OSError("Timeout raised")
 
+
+def _wait_futures(futures, count, timeout):
+    """
+    Waits for the given number of futures to be done
+
+    :param futures: An iterable of futures
+    :param count: Number of futures to wait for
+    :param timeout: The maximum time to wait (in seconds)
+    :return: A (done, not done) tuple of sets of futures
+    """
+    futures = set(futures)
+    remaining = [min(count, len(futures))]
+    lock = threading.Lock()
+    event = threading.Event()
+    if not remaining[0]:
+        event.set()
+
+    def on_done(_):
+        """
+        A future is done
+        """
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] <= 0:
+                event.set()
+
+    for future in futures:
+        future.add_done_callback(on_done)
+
+    event.wait(timeout)
+    done = set(future for future in futures if future.done())
+    return done, futures - done
+
+
+def wait_all(futures, timeout=None):
+    """
+    Waits for all the given futures to be done, without blocking a thread
+    per future
+
+    :param futures: An iterable of FutureResult (or concurrent.futures.Future)
+    :param timeout: The maximum time to wait (in seconds)
+    :return: A (done, not done) tuple of sets of futures
+    """
+    futures = set(futures)
+    return _wait_futures(futures, len(futures), timeout)
+
+
+def wait_any(futures, timeout=None):
+    """
+    Waits for at least one of the given futures to be done
+
+    :param futures: An iterable of FutureResult (or concurrent.futures.Future)
+    :param timeout: The maximum time to wait (in seconds)
+    :return: A (done, not done) tuple of sets of futures
+    """
+    return _wait_futures(futures, 1, timeout)
+
 # ------------------------------------------------------------------------------
 
 
 class ThreadPool(object):
     """
-    Executes the tasks stored in a FIFO in a thread pool
+    Executes the tasks stored in a FIFO in a thread pool.
+
+    Tasks can be given a priority, lower values being executed first, and a
+    deadline after which they are not executed anymore. Tasks with the same
+    priority are executed in order.
+
+    Idle threads are tracked with an atomic counter (a deque of tokens), so
+    that enqueuing a task when a thread is idle doesn't need the pool lock.
+    Optionally, tasks with the normal priority enqueued by a worker thread
+    while no thread is idle are stored in the deque of this worker, from
+    which idle workers steal them. Those tasks can be executed before older
+    tasks with the same priority, but not before tasks with a higher one.
     """
     def __init__(self, max_threads, min_threads=1, queue_size=0, timeout=60,
-                 logname=None):
+                 logname=None, work_stealing=False):
         """
         Sets up the thread pool.
 
@@ -167,6 +456,8 @@ class ThreadPool(object):
         :param queue_size: Size of the task queue (0 for infinite)
         :param timeout: Queue timeout (in seconds, 60s by default)
         :param logname: Name of the logger
+        :param work_stealing: If True, use per-worker deques with work
+                              stealing for the tasks enqueued by workers
         :raise ValueError: Invalid number of threads
         """
         # Validate parameters
@@ -200,7 +491,10 @@ class ThreadPool(object):
             # Not a valid integer
             queue_size = 0
 
-        self._queue = queue.Queue(queue_size)
+        self._queue = queue.PriorityQueue(queue_size)
+
+        # Order of the tasks with the same priority (next() is atomic)
+        self.__sequence = itertools.count()
         self._timeout = timeout
         self.__lock = threading.RLock()
 
@@ -212,9 +506,29 @@ class ThreadPool(object):
         # Thread count
         self._thread_id = 0
 
-        # Current number of threads, active and alive
+        # Current number of threads (updated with the lock, on thread start
+        # and stop only)
         self.__nb_threads = 0
-        self.__nb_active_threads = 0
+
+        # One token per idle thread: append(), pop() and len() are atomic
+        self.__idle_tokens = collections.deque()
+
+        # One token per queued task with a priority higher than the normal one
+        self.__urgent_tokens = collections.deque()
+
+        # Work stealing: the deques of the workers, replaced as a whole
+        self.__work_stealing = work_stealing
+        self.__local_queues = ()
+        self.__thread_data = threading.local()
+
+        # Number of tasks stored in the deques or being executed
+        self.__nb_local_tasks = 0
+        self.__local_tasks = threading.Condition()
+
+        # Wait statistics: one dictionary per worker, and the statistics of
+        # the stopped workers
+        self.__workers_stats = ()
+        self.__stopped_stats = {}
 
     def start(self):
         """
@@ -257,6 +571,9 @@ class ThreadPool(object):
             name = "{0}-{1}".format(self._logger.name, self._thread_id)
             self._thread_id += 1
 
+            # Count the thread right now, to avoid starting too many of them
+            self.__nb_threads += 1
+
             thread = threading.Thread(target=self.__run, name=name)
             thread.daemon = True
             self._threads.append(thread)
@@ -278,7 +595,8 @@ class ThreadPool(object):
             # Add something in the queue (to unlock the join())
             try:
                 for _ in self._threads:
-                    self._queue.put(self._done_event, True, self._timeout)
+                    self.__put((PRIORITY_HIGH, next(self.__sequence),
+                                self._done_event), True, self._timeout)
             except queue.Full:
                 # There is already something in the queue
                 pass
@@ -287,7 +605,12 @@ class ThreadPool(object):
             threads = self._threads[:]
 
         # Join threads outside the lock
+        current_thread = threading.current_thread()
         for thread in threads:
+            if thread is current_thread:
+                # Stopped by one of its tasks: it will stop after it
+                continue
+
             while thread.is_alive():
                 # Wait 3 seconds
                 thread.join(3)
@@ -302,31 +625,113 @@ class ThreadPool(object):
 
     def enqueue(self, method, *args, **kwargs):
         """
-        Queues a task in the pool
+        Queues a task in the pool, with the normal priority
 
         :param method: Method to call
         :return: A FutureResult object, to get the result of the task
         :raise ValueError: Invalid method
         :raise Full: The task queue is full
         """
+        return self.enqueue_with(method, args, kwargs)
+
+    def enqueue_with(self, method, args=None, kwargs=None,
+                     priority=PRIORITY_NORMAL, deadline=None):
+        """
+        Queues a task in the pool, with the given priority and deadline.
+
+        If the task hasn't been started before its deadline, it is not
+        executed and its FutureResult raises a DeadlineError.
+
+        :param method: Method to call
+        :param args: Method positional arguments
+        :param kwargs: Method keyword arguments
+        :param priority: Priority of the task (lower values first)
+        :param deadline: Maximum delay (in seconds) before the execution of
+                         the task starts (None for no limit)
+        :return: A FutureResult object, to get the result of the task
+        :raise ValueError: Invalid method
+        :raise Full: The task queue is full
+        """
         if not hasattr(method, '__call__'):
             raise ValueError("{0} has no __call__ member."
                              .format(method.__name__))
 
         # Prepare the future result object
         future = FutureResult(self._logger)
+        now = time.time()
+        if deadline is not None:
+            deadline += now
+
+        task = (priority, next(self.__sequence),
+                (method, args, kwargs, future, now, deadline))
+
+        if self.__work_stealing and not self.__idle_tokens \
+                and priority == PRIORITY_NORMAL:
+            local_queue = getattr(self.__thread_data, "queue", None)
+            if local_queue is not None:
+                # Enqueued by a busy worker: keep the task in its deque
+                with self.__local_tasks:
+                    self.__nb_local_tasks += 1
+                local_queue.append(task)
+
+                if self.__idle_tokens:
+                    # A thread became idle meanwhile: wake it up
+                    try:
+                        self._queue.put_nowait(
+                            (PRIORITY_NORMAL, next(self.__sequence),
+                             _WAKE_UP))
+                    except queue.Full:
+                        # Threads will steal the task before taking a new one
+                        pass
+                elif self.__nb_threads < self._max_threads:
+                    # Start a thread which will steal the task
+                    self.__start_thread()
+
+                return future
+
+        # Add the task to the queue
+        self.__put(task, True, self._timeout)
+
+        if not self.__idle_tokens and self.__nb_threads < self._max_threads:
+            # All threads are taken: start a new one
+            self.__start_thread()
 
-        # Use a lock, as we might be "resetting" the queue
-        with self.__lock:
-            # Add the task to the queue
-            self._queue.put((method, args, kwargs, future), True,
-                            self._timeout)
+        return future
 
-            if self.__nb_active_threads == self.__nb_threads:
-                # All threads are taken: start a new one
-                self.__start_thread()
+    def __put(self, item, block=True, timeout=None):
+        """
+        Puts an item in the queue, keeping track of the urgent ones
 
-        return future
+        :param item: A (priority, sequence, task or event) tuple
+        :param block: If True, wait for room in the queue
+        :param timeout: Maximum time to wait for room in the queue
+        :raise Full: The queue is full
+        """
+        urgent = item[0] < PRIORITY_NORMAL
+        if urgent:
+            # Count the task before anyone can take it
+            self.__urgent_tokens.append(None)
+
+        try:
+            self._queue.put(item, block, timeout)
+        except queue.Full:
+            if urgent:
+                self.__urgent_tokens.pop()
+            raise
+
+    def __get(self, block=True, timeout=None):
+        """
+        Gets the next item from the queue, keeping track of the urgent ones
+
+        :param block: If True, wait for an item
+        :param timeout: Maximum time to wait for an item
+        :return: A (priority, sequence, task or event) tuple
+        :raise Empty: No item in the queue
+        """
+        item = self._queue.get(block, timeout)
+        if item[0] < PRIORITY_NORMAL:
+            self.__urgent_tokens.pop()
+        return item
 
     def clear(self):
         """
@@ -337,15 +742,44 @@ class ThreadPool(object):
             # Empty the current queue
             try:
                 while True:
-                    self._queue.get_nowait()
+                    self.__get(False)
                     self._queue.task_done()
             except queue.Empty:
                 # Queue is now empty
                 pass
 
+            # Empty the deques of the workers
+            for local_queue in self.__local_queues:
+                self.__clear_local_queue(local_queue)
+
             # Wait for the tasks currently executed
             self.join()
 
+    def __clear_local_queue(self, local_queue):
+        """
+        Drops the tasks stored in the given worker deque
+
+        :param local_queue: The deque of a worker
+        """
+        while True:
+            try:
+                local_queue.popleft()
+            except IndexError:
+                # Deque is now empty
+                break
+            else:
+                self.__local_task_done()
+
+    def __local_task_done(self):
+        """
+        Indicates that a task taken from a worker deque has been executed or
+        dropped
+        """
+        with self.__local_tasks:
+            self.__nb_local_tasks -= 1
+            if not self.__nb_local_tasks:
+                self.__local_tasks.notify_all()
+
     def join(self, timeout=None):
         """
         Waits for all the tasks to be executed
@@ -353,66 +787,237 @@ class ThreadPool(object):
         :param timeout: Maximum time to wait (in seconds)
         :return: True if the queue has been emptied, else False
         """
-        if self._queue.empty():
+        if self._queue.empty() \
+                and not any(local_queue
+                            for local_queue in self.__local_queues):
             # Nothing to wait for...
             return True
-        elif timeout is None:
-            # Use the original join
-            self._queue.join()
-            return True
-        else:
-            # Wait for the condition
-            with self._queue.all_tasks_done:
-                self._queue.all_tasks_done.wait(timeout)
-                return not bool(self._queue.unfinished_tasks)
 
-    def __run(self):
+        end = None if timeout is None else time.time() + timeout
+        while True:
+            if end is None:
+                # Use the original join
+                self._queue.join()
+            else:
+                # Wait for the condition
+                with self._queue.all_tasks_done:
+                    while self._queue.unfinished_tasks:
+                        remaining = end - time.time()
+                        if remaining <= 0:
+                            return False
+                        self._queue.all_tasks_done.wait(remaining)
+
+            # Wait for the tasks of the worker deques
+            with self.__local_tasks:
+                while self.__nb_local_tasks:
+                    if end is None:
+                        self.__local_tasks.wait()
+                    else:
+                        remaining = end - time.time()
+                        if remaining <= 0:
+                            return False
+                        self.__local_tasks.wait(remaining)
+
+            if not self._queue.unfinished_tasks:
+                # The tasks of the deques didn't enqueue new tasks
+                return True
+
+    def __steal(self, local_queue):
         """
-        The main loop
+        Retrieves a task from the deque of the worker, or from the deque of
+        another worker
+
+        :param local_queue: The deque of the worker
+        :return: A (priority, sequence, task) tuple, or None
         """
-        with self.__lock:
-            self.__nb_threads += 1
+        try:
+            # Our own tasks, in order
+            return local_queue.popleft()
+        except IndexError:
+            pass
 
-        while not self._done_event.is_set():
+        for other_queue in self.__local_queues:
             try:
-                # Wait for an action (blocking)
-                task = self._queue.get(True, self._timeout)
-                if task is self._done_event:
-                    # Stop event in the queue: get out
-                    self._queue.task_done()
-                    with self.__lock:
-                        self.__nb_threads -= 1
-                        return
-            except queue.Empty:
-                # Nothing to do yet
+                # Steal the newest task of another worker
+                return other_queue.pop()
+            except IndexError:
                 pass
-            else:
-                with self.__lock:
-                    self.__nb_active_threads += 1
 
-                # Extract elements
-                method, args, kwargs, future = task
-                try:
-                    # Call the method
-                    future.execute(method, args, kwargs)
-                except Exception as ex:
-                    self._logger.exception("Error executing %s: %s",
-                                           method.__name__, ex)
-                finally:
-                    # Mark the action as executed
-                    self._queue.task_done()
+        return None
 
-                    # Thread is not active anymore
-                    self.__nb_active_threads -= 1
+    def __next_task(self, local_queue):
+        """
+        Retrieves the next task to execute: from the shared queue if it
+        holds a task with a priority higher than the normal one, else from
+        the deque of the worker, from the deque of another worker, or from
+        the shared queue
+
+        :param local_queue: The deque of the worker (or None)
+        :return: A ((priority, sequence, task or event), from deque) tuple
+        :raise queue.Empty: No task received before the timeout
+        """
+        if local_queue is not None and not self.__urgent_tokens:
+            item = self.__steal(local_queue)
+            if item is not None:
+                return item, True
 
-            # Clean up thread if necessary
-            with self.__lock:
-                if self.__nb_threads > self._min_threads:
-                    # No more work for this thread, and we're above the
-                    # minimum number of threads: stop this one
-                    self.__nb_threads -= 1
-                    return
+        # Wait for a task, as an idle thread
+        self.__idle_tokens.append(None)
+        try:
+            if local_queue is not None and not self.__urgent_tokens:
+                # A task might have been stored in a deque before its worker
+                # saw us idle
+                item = self.__steal(local_queue)
+                if item is not None:
+                    return item, True
+
+            item = self.__get(True, self._timeout)
+        finally:
+            self.__idle_tokens.pop()
+
+        if not self.__idle_tokens and self.__nb_threads < self._max_threads \
+                and not self._queue.empty():
+            # Tasks have been enqueued while we were seen as idle
+            self.__start_thread()
+
+        return item, False
 
+    def get_stats(self):
+        """
+        Returns the wait statistics of the tasks, by priority: number of
+        tasks taken from the queue, number of expired tasks, mean and maximum
+        time spent in the queue (in seconds)
+
+        :return: A priority -> statistics dictionary
+        """
         with self.__lock:
-            # Thread stops
-            self.__nb_threads -= 1
+            all_stats = (self.__stopped_stats,) + self.__workers_stats
+            merged = {}
+            for stats in all_stats:
+                self.__merge_stats(merged, stats)
+
+        return dict((priority, {"tasks": count,
+                                "expired": expired,
+                                "mean_wait": total / count,
+                                "max_wait": maximum})
+                    for priority, (count, expired, total, maximum)
+                    in merged.items())
+
+    @staticmethod
+    def __merge_stats(target, stats):
+        """
+        Adds the statistics of a worker to the given ones
+
+        :param target: Statistics to update
+        :param stats: Statistics of a worker
+        """
+        for priority, (count, expired, total, maximum) in list(stats.items()):
+            try:
+                entry = target[priority]
+            except KeyError:
+                target[priority] = [count, expired, total, maximum]
+            else:
+                entry[0] += count
+                entry[1] += expired
+                entry[2] += total
+                entry[3] = max(entry[3], maximum)
+
+    def __run(self):
+        """
+        The main loop
+        """
+        # Statistics of this worker: priority -> [tasks, expired, total wait,
+        # maximum wait]
+        stats = {}
+        with self.__lock:
+            self.__workers_stats += (stats,)
+
+        if self.__work_stealing:
+            # Register the deque of this worker
+            local_queue = collections.deque()
+            self.__thread_data.queue = local_queue
+            with self.__lock:
+                self.__local_queues += (local_queue,)
+        else:
+            local_queue = None
+
+        try:
+            while not self._done_event.is_set():
+                try:
+                    # Wait for an action (blocking)
+                    item, from_deque = self.__next_task(local_queue)
+                    priority, _, task = item
+                    if task is self._done_event:
+                        # Stop event in the queue: get out
+                        self._queue.task_done()
+                        return
+                    elif task is _WAKE_UP:
+                        # Look for tasks to steal
+                        self._queue.task_done()
+                        continue
+                except queue.Empty:
+                    # Nothing to do yet
+                    pass
+                else:
+                    # Extract elements
+                    method, args, kwargs, future, enqueued, deadline = task
+
+                    # Update statistics
+                    now = time.time()
+                    wait = now - enqueued
+                    expired = deadline is not None and now > deadline
+                    try:
+                        entry = stats[priority]
+                    except KeyError:
+                        stats[priority] = [1, int(expired), wait, wait]
+                    else:
+                        entry[0] += 1
+                        entry[1] += expired
+                        entry[2] += wait
+                        if wait > entry[3]:
+                            entry[3] = wait
+
+                    try:
+                        if expired:
+                            # Too late
+                            future.set_exception(DeadlineError(
+                                "Task expired after {0:.3f}s in queue"
+                                .format(wait)))
+                        else:
+                            # Call the method
+                            future.execute(method, args, kwargs)
+                    except Exception as ex:
+                        self._logger.exception("Error executing %s: %s",
+                                               method.__name__, ex)
+                    finally:
+                        # Mark the action as executed
+                        if from_deque:
+                            self.__local_task_done()
+                        else:
+                            self._queue.task_done()
+
+                # Clean up thread if necessary
+                with self.__lock:
+                    if self.__nb_threads > self._min_threads \
+                            and self._queue.empty() \
+                            and not any(self.__local_queues):
+                        # No more work for this thread, and we're above the
+                        # minimum number of threads: stop this one
+                        return
+        finally:
+            with self.__lock:
+                # Thread stops
+                self.__nb_threads -= 1
+
+                # Keep its statistics
+                self.__workers_stats = tuple(
+                    other_stats for other_stats in self.__workers_stats
+                    if other_stats is not stats)
+                self.__merge_stats(self.__stopped_stats, stats)
+
+                if local_queue is not None:
+                    # Forget about our deque
+                    self.__local_queues = tuple(
+                        other_queue for other_queue in self.__local_queues
+                        if other_queue is not local_queue)
+                    self.__clear_local_queue(local_queue)
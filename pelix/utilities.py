@@ -34,6 +34,7 @@ import contextlib
 import functools
 import logging
 import sys
+import inspect
 import threading
 import traceback
 
@@ -581,3 +582,88 @@ class CountdownEvent(object):
         """
         # The 'or' part is for Python 2.6
         return self.__event.wait(timeout) or self.__event.is_set()
+
+# ------------------------------------------------------------------------------
+
+
+def is_coroutine(obj):
+    """
+    Checks if the given object is a coroutine, e.g. the result of the call to
+    an ``async def`` method
+
+    :param obj: The object to test
+    :return: True if the object is a coroutine
+    """
+    try:
+        # Python 3.5+: avoids to import asyncio
+        return inspect.iscoroutine(obj)
+    except AttributeError:
+        # Python 2
+        return False
+
+
+def get_running_loop():
+    """
+    Returns the asyncio event loop running in the current thread, if any
+
+    :return: The running event loop or None
+    """
+    try:
+        # Python 3.4+
+        # pylint: disable=F0401
+        import asyncio
+    except ImportError:
+        return None
+
+    try:
+        # Python 3.7+
+        return asyncio.get_running_loop()
+    except AttributeError:
+        # Python 3.5.3+
+        return asyncio._get_running_loop()
+    except RuntimeError:
+        # No running loop
+        return None
+
+
+def run_coroutine(coroutine, loop=None, timeout=None):
+    """
+    Executes the given coroutine and waits for its result.
+
+    * If the given loop is running in another thread, the coroutine is
+      executed by this loop;
+    * else, the coroutine is executed by a temporary event loop.
+
+    The coroutine can't be waited for in the thread of the loop which would
+    execute it.
+
+    :param coroutine: The coroutine to execute
+    :param loop: The asyncio event loop to use (optional)
+    :param timeout: Maximum time to wait for the result (in seconds)
+    :return: The result of the coroutine
+    :raise RuntimeError: Called from the thread of the event loop
+    :raise Exception: The exception raised by the coroutine
+    """
+    # pylint: disable=F0401
+    import asyncio
+
+    running_loop = get_running_loop()
+    if running_loop is not None and loop in (None, running_loop):
+        # Waiting for the coroutine would block the loop executing it
+        coroutine.close()
+        raise RuntimeError("Can't wait for a coroutine in the thread of "
+                           "its event loop")
+
+    if loop is not None and loop.is_running():
+        # Use the loop of its own thread
+        return asyncio.run_coroutine_threadsafe(coroutine, loop) \
+            .result(timeout)
+
+    # Use a temporary loop
+    private_loop = asyncio.new_event_loop()
+    try:
+        if timeout is not None:
+            coroutine = asyncio.wait_for(coroutine, timeout)
+        return private_loop.run_until_complete(coroutine)
+    finally:
+        private_loop.close()
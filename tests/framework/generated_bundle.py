@@ -0,0 +1,7 @@
+#!/usr/bin/python
+# Auto-generated bundle, for Pelix tests
+__version__ = "1.0.0"
+test_var = False
+
+def test_fct():
+    return False
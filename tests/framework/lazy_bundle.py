@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Bundle registering a service, installed lazily
+
+:author: Thomas Calmant
+"""
+
+__version__ = (1, 0, 0)
+
+from pelix.constants import BundleActivator
+
+LAZY_SPEC = "lazy.spec"
+""" Specification of the service provided by this bundle """
+
+OTHER_SPEC = "lazy.other"
+""" Another specification of this bundle, without service """
+
+
+@BundleActivator
+class Activator(object):
+    """
+    Test activator
+    """
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.registration = None
+
+    def start(self, context):
+        """
+        Bundle started
+        """
+        # Looking for its own specification must not activate it again
+        assert context.get_service_reference(OTHER_SPEC) is None
+        self.registration = context.register_service(LAZY_SPEC, self, {})
+
+    def stop(self, context):
+        """
+        Bundle stopped
+        """
+        self.registration.unregister()
+        self.registration = None
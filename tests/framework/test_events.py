@@ -15,6 +15,10 @@ from pelix.framework import FrameworkFactory, Bundle, BundleException, \
     BundleContext, BundleEvent, ServiceEvent
 
 # Standard library
+import os
+import sys
+import time
+
 try:
     import unittest2 as unittest
 except ImportError:
@@ -368,6 +372,136 @@ class ServiceEventTest(unittest.TestCase):
         # Unregister from events
         context.remove_service_listener(self)
 
+    def testListenerSnapshot(self):
+        """
+        Tests the listeners notified of an event while listeners are added or
+        removed
+        """
+        context = self.framework.get_bundle_context()
+        spec = "snapshot.spec"
+        added = _CountingListener()
+        removed = _CountingListener()
+        other = _CountingListener()
+
+        class Changer(_CountingListener):
+            """
+            Changes the listeners while the first event is dispatched
+            """
+            def service_changed(self, event):
+                if not self.count:
+                    context.add_service_listener(added, None, spec)
+                    context.remove_service_listener(removed)
+                _CountingListener.service_changed(self, event)
+
+        changer = Changer()
+        for listener in (changer, removed):
+            context.add_service_listener(listener, None, spec)
+        context.add_service_listener(other, None, "snapshot.other")
+
+        # The event is given to the listeners registered when it was fired
+        reg = context.register_service(spec, object(), {})
+        self.assertEqual(changer.count, 1)
+        self.assertEqual(removed.count, 1)
+        self.assertEqual(added.count, 0)
+
+        # The next event sees the changes
+        reg.unregister()
+        self.assertEqual(changer.count, 2)
+        self.assertEqual(removed.count, 1)
+        self.assertEqual(added.count, 1)
+        self.assertEqual(other.count, 0)
+
+# ------------------------------------------------------------------------------
+
+
+class _CountingListener(object):
+    """
+    Service listener counting the events it receives
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self.count = 0
+
+    def service_changed(self, event):
+        """
+        Called by the framework when a service event is triggered
+        """
+        self.count += 1
+
+
+@unittest.skipUnless(os.environ.get("PELIX_BENCHMARK"),
+                     "Set PELIX_BENCHMARK to run the benchmarks")
+class ServiceEventBenchmarkTest(unittest.TestCase):
+    """
+    Measures the dispatch of service events to many filtered listeners, like
+    the ones registered by the requirements of iPOPO components
+    """
+    NB_SPECS = 20
+    """ Number of specifications """
+
+    NB_LISTENERS = 5000
+    """ Number of service listeners """
+
+    NB_EVENTS = 200
+    """ Number of services registered then unregistered """
+
+    def setUp(self):
+        """
+        Called before each test. Initiates a framework.
+        """
+        self.framework = FrameworkFactory.get_framework()
+        self.framework.start()
+
+    def tearDown(self):
+        """
+        Called after each test
+        """
+        self.framework.stop()
+        FrameworkFactory.delete_framework()
+
+    def testRequirementListeners(self):
+        """
+        Registers thousands of listeners and fires service events
+        """
+        context = self.framework.get_bundle_context()
+        specs = ["bench.spec.{0}".format(idx)
+                 for idx in range(self.NB_SPECS)]
+
+        # Listeners as registered by iPOPO requirements
+        listeners = []
+        for idx in range(self.NB_LISTENERS):
+            spec = specs[idx % self.NB_SPECS]
+            listener = _CountingListener()
+            context.add_service_listener(
+                listener, "(&(objectClass={0})(bench.id={1}))"
+                .format(spec, idx % self.NB_EVENTS), spec)
+            listeners.append(listener)
+
+        start = time.time()
+        for idx in range(self.NB_EVENTS):
+            spec = specs[idx % self.NB_SPECS]
+            context.register_service(
+                spec, object(), {"bench.id": idx}).unregister()
+        duration = time.time() - start
+
+        # Each listener matches exactly one service: registered, unregistering
+        for listener in listeners:
+            self.assertEqual(listener.count, 2)
+
+        sys.stderr.write("\n{0} listeners: {1:.0f} events/s"
+                         .format(self.NB_LISTENERS,
+                                 2 * self.NB_EVENTS / max(duration, 1e-6)))
+
+        # Removing a listener invalidates the snapshots
+        for listener in listeners:
+            self.assertTrue(context.remove_service_listener(listener))
+            listener.count = 0
+
+        context.register_service(specs[0], object(), {"bench.id": 0})
+        self.assertFalse(any(listener.count for listener in listeners))
+
 # ------------------------------------------------------------------------------
 
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Tests the lazy activation of bundles.
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.framework import FrameworkFactory, Bundle, BundleException
+
+# Standard library
+import sys
+import threading
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+LAZY_BUNDLE = "tests.framework.lazy_bundle"
+LAZY_SPEC = "lazy.spec"
+OTHER_SPEC = "lazy.other"
+
+# ------------------------------------------------------------------------------
+
+
+class _Listener(object):
+    """
+    Service listener storing the received events
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self.events = []
+
+    def service_changed(self, event):
+        """
+        Called by the framework when a service event is triggered
+        """
+        self.events.append(event)
+
+
+class LazyBundleTest(unittest.TestCase):
+    """
+    Tests the lazy activation of bundles
+    """
+    def setUp(self):
+        """
+        Starts a framework
+        """
+        sys.modules.pop(LAZY_BUNDLE, None)
+        self.framework = FrameworkFactory.get_framework()
+        self.framework.start()
+        self.context = self.framework.get_bundle_context()
+
+    def tearDown(self):
+        """
+        Cleans up the framework
+        """
+        self.framework.stop()
+        FrameworkFactory.delete_framework()
+        sys.modules.pop(LAZY_BUNDLE, None)
+
+    def _get_bundle(self):
+        """
+        Returns the installed lazy bundle, or None
+        """
+        for bundle in self.context.get_bundles():
+            if bundle.get_symbolic_name() == LAZY_BUNDLE:
+                return bundle
+
+    def testServiceReference(self):
+        """
+        The bundle is activated by a service reference lookup
+        """
+        self.assertTrue(self.context.install_lazy_bundle(
+            LAZY_BUNDLE, [LAZY_SPEC, OTHER_SPEC]))
+        self.assertFalse(self.context.install_lazy_bundle(
+            LAZY_BUNDLE, LAZY_SPEC))
+        self.assertDictEqual(self.framework.get_lazy_bundles(),
+                             {LAZY_BUNDLE: set([LAZY_SPEC, OTHER_SPEC])})
+
+        # Not imported nor installed
+        self.assertNotIn(LAZY_BUNDLE, sys.modules)
+        self.assertIsNone(self._get_bundle())
+
+        # Other lookups don't activate the bundle
+        self.assertIsNone(self.context.get_service_reference("other.spec"))
+        self.assertListEqual(
+            self.context.get_all_service_references(None), [])
+        self.assertNotIn(LAZY_BUNDLE, sys.modules)
+
+        # First request
+        ref = self.context.get_service_reference(LAZY_SPEC)
+        self.assertIsNotNone(ref)
+        self.assertIn(LAZY_BUNDLE, sys.modules)
+
+        bundle = self._get_bundle()
+        self.assertIs(ref.get_bundle(), bundle)
+        self.assertEqual(bundle.get_state(), Bundle.ACTIVE)
+        self.assertDictEqual(self.framework.get_lazy_bundles(), {})
+
+        # Can't be declared lazy once installed
+        self.assertFalse(self.context.install_lazy_bundle(
+            LAZY_BUNDLE, LAZY_SPEC))
+
+    def testServiceListener(self):
+        """
+        The bundle is activated by the registration of a service listener
+        """
+        self.context.install_lazy_bundle(LAZY_BUNDLE, OTHER_SPEC)
+
+        listener = _Listener()
+        self.context.add_service_listener(listener, None, LAZY_SPEC)
+        self.assertNotIn(LAZY_BUNDLE, sys.modules)
+        self.context.remove_service_listener(listener)
+
+        self.context.add_service_listener(listener, None, OTHER_SPEC)
+        self.assertEqual(self._get_bundle().get_state(), Bundle.ACTIVE)
+        self.assertIsNotNone(self.context.get_service_reference(LAZY_SPEC))
+
+    def testStoppedFramework(self):
+        """
+        Lazy bundles are activated only while the framework is running
+        """
+        self.framework.stop()
+        self.context.install_lazy_bundle(LAZY_BUNDLE, LAZY_SPEC)
+        self.assertIsNone(self.context.get_service_reference(LAZY_SPEC))
+        self.assertNotIn(LAZY_BUNDLE, sys.modules)
+
+        self.framework.start()
+        self.assertIsNotNone(self.context.get_service_reference(LAZY_SPEC))
+
+    def testErrors(self):
+        """
+        Tests the declaration of invalid lazy bundles
+        """
+        for specs in (None, "", [], [LAZY_SPEC, 42]):
+            self.assertRaises(BundleException,
+                              self.context.install_lazy_bundle,
+                              LAZY_BUNDLE, specs)
+        self.assertDictEqual(self.framework.get_lazy_bundles(), {})
+
+        # Unknown module: nothing found, the error is logged
+        unknown = "tests.framework.unknown_bundle"
+        self.context.install_lazy_bundle(unknown, LAZY_SPEC)
+        self.assertIsNone(self.context.get_service_reference(LAZY_SPEC))
+        self.assertDictEqual(self.framework.get_lazy_bundles(), {})
+
+        # ... and the bundle is marked as failed
+        self.assertDictEqual(self.framework.get_failed_lazy_bundles(),
+                             {unknown: set([LAZY_SPEC])})
+
+        # It can be declared again
+        self.assertTrue(self.context.install_lazy_bundle(unknown, LAZY_SPEC))
+        self.assertDictEqual(self.framework.get_failed_lazy_bundles(), {})
+        self.assertDictEqual(self.framework.get_lazy_bundles(),
+                             {unknown: set([LAZY_SPEC])})
+
+    def testActivationOutsideLock(self):
+        """
+        Lazy bundles can be declared while another one is being activated
+        """
+        declared = []
+
+        def declare():
+            declared.append(self.context.install_lazy_bundle(
+                "tests.framework.other_bundle", "other.spec"))
+
+        class _Declarer(_Listener):
+            """
+            Declares a lazy bundle from another thread, while the first one
+            is starting
+            """
+            def service_changed(self, event):
+                super(_Declarer, self).service_changed(event)
+                thread = threading.Thread(target=declare)
+                thread.start()
+                thread.join(5)
+
+        self.context.install_lazy_bundle(LAZY_BUNDLE, LAZY_SPEC)
+        listener = _Declarer()
+        self.context.add_service_listener(listener)
+        self.assertIsNotNone(self.context.get_service_reference(LAZY_SPEC))
+        self.assertEqual(len(listener.events), 1)
+        self.assertListEqual(declared, [True])
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
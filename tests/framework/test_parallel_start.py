@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Tests the ordered and parallel start of the bundles of a framework.
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.framework import FrameworkFactory, Bundle
+import pelix.constants
+
+# Standard library
+import sys
+import threading
+import time
+import types
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+# ------------------------------------------------------------------------------
+
+
+class _Barrier(object):
+    """
+    Blocks threads until a given number of them are waiting
+    """
+    def __init__(self, parties):
+        """
+        :param parties: Number of threads to wait for
+        """
+        self.__parties = parties
+        self.__count = 0
+        self.__condition = threading.Condition()
+
+    def wait(self, timeout):
+        """
+        Waits for the other threads
+
+        :param timeout: Maximum time to wait (in seconds)
+        :return: True if all threads reached the barrier in time
+        """
+        deadline = time.time() + timeout
+        with self.__condition:
+            self.__count += 1
+            self.__condition.notify_all()
+            while self.__count < self.__parties:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.__condition.wait(remaining)
+
+        return True
+
+
+class _Activator(object):
+    """
+    Bundle activator logging its calls
+    """
+    def __init__(self, name, log, delay, fail):
+        """
+        :param name: Name of the bundle
+        :param log: List where to store the calls
+        :param delay: Time to wait in start()
+        :param fail: If True, start() raises an exception
+        """
+        self.name = name
+        self.log = log
+        self.delay = delay
+        self.fail = fail
+        self.thread = None
+
+        # Barrier to reach in start(), if any, and the result of its wait
+        self.barrier = None
+        self.reached = None
+
+        # Method called at the end of start(), if any
+        self.callback = None
+
+    def start(self, context):
+        """
+        Bundle started
+        """
+        self.thread = threading.current_thread()
+        if self.barrier is not None:
+            self.reached = self.barrier.wait(5)
+
+        time.sleep(self.delay)
+        if self.fail:
+            raise ValueError("Start failure")
+
+        self.log.append(("start", self.name))
+        if self.callback is not None:
+            self.callback()
+
+    def stop(self, context):
+        """
+        Bundle stopped
+        """
+        self.log.append(("stop", self.name))
+
+
+class FrameworkStartOrderTest(unittest.TestCase):
+    """
+    Tests the start order of bundles, sequential or parallel
+    """
+    def setUp(self):
+        """
+        Prepares the bundles modules
+        """
+        self.framework = None
+        self.log = []
+        self.modules = []
+
+    def tearDown(self):
+        """
+        Cleans up the framework and the bundles modules
+        """
+        if self.framework is not None:
+            self.framework.stop()
+            FrameworkFactory.delete_framework()
+
+        for name in self.modules:
+            sys.modules.pop(name, None)
+
+    def _make_bundle(self, name, requires=None, delay=0, fail=False):
+        """
+        Prepares the module of a bundle
+
+        :param name: Module name
+        :param requires: Content of the BUNDLE_REQUIRES module member
+        :param delay: Time spent in the activator start() method
+        :param fail: If True, the activator fails to start
+        :return: The bundle activator
+        """
+        module = types.ModuleType(name)
+        activator = _Activator(name, self.log, delay, fail)
+        setattr(module, pelix.constants.ACTIVATOR, activator)
+        if requires is not None:
+            setattr(module, pelix.constants.BUNDLE_REQUIRES, requires)
+
+        sys.modules[name] = module
+        self.modules.append(name)
+        return activator
+
+    def _start(self, names, nb_threads):
+        """
+        Installs the given bundles then starts the framework
+
+        :param names: Names of the bundles to install, in order
+        :param nb_threads: Number of threads to use to start the bundles
+        :return: The installed bundles
+        """
+        self.framework = FrameworkFactory.get_framework(
+            {pelix.constants.FRAMEWORK_PARALLEL_START: nb_threads})
+        context = self.framework.get_bundle_context()
+        bundles = [context.install_bundle(name) for name in names]
+        self.framework.start()
+        return bundles
+
+    def testRequirementsOrder(self):
+        """
+        Bundles are started after the bundles they require, and stopped
+        before them
+        """
+        for nb_threads in (0, 4):
+            del self.log[:]
+            self._make_bundle("test.start.c", "test.start.b")
+            self._make_bundle("test.start.b", ["test.start.a"])
+            self._make_bundle("test.start.a", None, .05)
+            self._make_bundle("test.start.d")
+
+            bundles = self._start(
+                ["test.start.c", "test.start.b", "test.start.a",
+                 "test.start.d"], nb_threads)
+            for bundle in bundles:
+                self.assertEqual(bundle.get_state(), Bundle.ACTIVE)
+
+            started = [name for action, name in self.log]
+            self.assertLess(started.index("test.start.a"),
+                            started.index("test.start.b"))
+            self.assertLess(started.index("test.start.b"),
+                            started.index("test.start.c"))
+
+            del self.log[:]
+            self.framework.stop()
+            FrameworkFactory.delete_framework()
+            self.framework = None
+
+            # Reverse order
+            stopped = [name for action, name in self.log]
+            self.assertListEqual(stopped, ["test.start.d", "test.start.c",
+                                           "test.start.b", "test.start.a"])
+
+    def testParallelStart(self):
+        """
+        Independent bundles are started concurrently
+        """
+        activators = [self._make_bundle("test.start.{0}".format(idx),
+                                        delay=.2)
+                      for idx in range(4)]
+
+        # All activators must be in start() at the same time
+        barrier = _Barrier(len(activators))
+        for activator in activators:
+            activator.barrier = barrier
+
+        bundles = self._start(self.modules, 4)
+        for activator in activators:
+            self.assertTrue(activator.reached)
+
+        self.assertEqual(len(set(activator.thread
+                                 for activator in activators)), 4)
+
+        # Start timings
+        timings = self.framework.get_start_timings()
+        self.assertSetEqual(set(timings.keys()), set(bundles))
+        for bundle in bundles:
+            self.assertGreaterEqual(timings[bundle], .19)
+
+    def testSequentialStart(self):
+        """
+        Bundles are started in the main thread by default
+        """
+        activators = [self._make_bundle("test.start.{0}".format(idx),
+                                        delay=.01)
+                      for idx in range(3)]
+        bundles = self._start(self.modules, None)
+
+        for activator in activators:
+            self.assertIs(activator.thread, threading.current_thread())
+
+        started = [name for action, name in self.log]
+        self.assertListEqual(started, self.modules)
+
+        timings = self.framework.get_start_timings()
+        self.assertSetEqual(set(timings.keys()), set(bundles))
+
+    def testFailedRequirement(self):
+        """
+        A bundle isn't started in parallel if one of its requirements failed
+        """
+        self._make_bundle("test.start.a", fail=True)
+        self._make_bundle("test.start.b", "test.start.a")
+        self._make_bundle("test.start.c", "test.start.b")
+        self._make_bundle("test.start.d")
+
+        bundles = self._start(self.modules, 4)
+        self.assertEqual(self.framework.get_state(), Bundle.ACTIVE)
+        self.assertListEqual([bundle.get_state() for bundle in bundles],
+                             [Bundle.RESOLVED, Bundle.RESOLVED,
+                              Bundle.RESOLVED, Bundle.ACTIVE])
+
+    def testStopFromActivator(self):
+        """
+        An activator started in parallel can stop the framework while it is
+        raising its start level
+        """
+        self._make_bundle("test.start.a", delay=.05)
+        activator = self._make_bundle("test.start.b")
+        self._make_bundle("test.start.c", "test.start.a")
+
+        self.framework = FrameworkFactory.get_framework(
+            {pelix.constants.FRAMEWORK_PARALLEL_START: 4})
+        context = self.framework.get_bundle_context()
+        bundles = [context.install_bundle(name) for name in self.modules]
+        for bundle in bundles:
+            bundle.set_start_level(2)
+        self.framework.start()
+        activator.callback = self.framework.stop
+
+        thread = threading.Thread(target=self.framework.set_start_level,
+                                  args=(2,))
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+        # The framework has been stopped, and the last bundle not started
+        self.assertEqual(self.framework.get_state(), Bundle.RESOLVED)
+        self.assertNotIn(("start", "test.start.c"), self.log)
+        for bundle in bundles:
+            self.assertEqual(bundle.get_state(), Bundle.RESOLVED)
+
+    def testRequirementsCycle(self):
+        """
+        Requirement cycles don't block the start of the bundles
+        """
+        for nb_threads in (0, 4):
+            self._make_bundle("test.start.a", "test.start.b")
+            self._make_bundle("test.start.b", "test.start.a")
+
+            bundles = self._start(["test.start.a", "test.start.b"],
+                                  nb_threads)
+            for bundle in bundles:
+                self.assertEqual(bundle.get_state(), Bundle.ACTIVE)
+
+            self.framework.stop()
+            FrameworkFactory.delete_framework()
+            self.framework = None
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
@@ -12,7 +12,7 @@ from tests.interfaces import IEchoService
 
 # Pelix
 from pelix.framework import FrameworkFactory, Bundle, BundleException, \
-    BundleContext, ServiceReference
+    BundleContext, ServiceReference, ServiceEvent
 import pelix.constants
 
 # Standard library
@@ -325,6 +325,45 @@ class ServicesTest(unittest.TestCase):
         self.assertEqual(ref.get_property("test"), 21,
                          "Extra property not updated")
 
+    def testPropertiesView(self):
+        """
+        Tests the read-only view of the service properties
+        """
+        context = self.framework.get_bundle_context()
+        reg = context.register_service("class", self, {"test": 42})
+        ref = reg.get_reference()
+
+        view = ref.properties_view()
+        self.assertIs(ref.properties_view(), view)
+        self.assertDictEqual(dict(view), ref.get_properties())
+        self.assertEqual(view["test"], 42)
+        self.assertEqual(view.get("test"), 42)
+        self.assertIsNone(view.get("unknown"))
+        self.assertIn(pelix.constants.SERVICE_ID, view)
+
+        # The view can't be modified
+        try:
+            view["test"] = 21
+        except TypeError:
+            pass
+        else:
+            self.fail("The properties view can be modified")
+        self.assertEqual(ref.get_property("test"), 42)
+
+        # An update replaces the view, the previous one is kept unchanged
+        reg.set_properties({"test": 21, "other": True})
+        self.assertEqual(view["test"], 42)
+        self.assertNotIn("other", view)
+
+        new_view = ref.properties_view()
+        self.assertIsNot(new_view, view)
+        self.assertEqual(new_view["test"], 21)
+        self.assertTrue(new_view["other"])
+
+        # Unchanged properties don't replace the view
+        reg.set_properties({"test": 21})
+        self.assertIs(ref.properties_view(), new_view)
+
     def testGetAllReferences(self):
         """
         Tests get_all_service_references() method
@@ -374,6 +413,40 @@ class ServicesTest(unittest.TestCase):
         self.assertRaises(BundleException, context.get_all_service_references,
                           None, "/// Invalid Filter ///")
 
+    def testGetReferenceById(self):
+        """
+        Tests get_service_reference_by_id()
+        """
+        context = self.framework.get_bundle_context()
+
+        # Register a service
+        registration = context.register_service("test", self, None)
+        ref = registration.get_reference()
+        svc_id = ref.get_property(pelix.constants.SERVICE_ID)
+
+        self.assertIs(context.get_service_reference_by_id(svc_id), ref)
+        self.assertIsNone(context.get_service_reference_by_id(svc_id + 1))
+        self.assertIsNone(context.get_service_reference_by_id(None))
+
+        # Service properties don't change the ID
+        registration.set_properties({"test": 42})
+        self.assertIs(context.get_service_reference_by_id(svc_id), ref)
+
+        # Unregister the service
+        registration.unregister()
+        self.assertIsNone(context.get_service_reference_by_id(svc_id))
+
+        # Hidden services are not found
+        bundle = context.install_bundle(self.test_bundle_name)
+        bundle.start()
+        ref = context.get_service_reference(IEchoService)
+        svc_id = ref.get_property(pelix.constants.SERVICE_ID)
+        self.assertIs(context.get_service_reference_by_id(svc_id), ref)
+
+        bundle.stop()
+        self.assertIsNone(context.get_service_reference_by_id(svc_id))
+        bundle.uninstall()
+
     def testMultipleUnregistrations(self):
         """
         Tests behavior when unregistering the same service twice
@@ -409,6 +482,264 @@ class ServicesTest(unittest.TestCase):
 
 # ------------------------------------------------------------------------------
 
+
+class ServicesIndexTest(unittest.TestCase):
+    """
+    Tests the service properties indexes of the registry
+    """
+    def setUp(self):
+        """
+        Starts a framework indexing the "test.index" property
+        """
+        self.framework = FrameworkFactory.get_framework(
+            {pelix.constants.REGISTRY_INDEXES: "service.id, test.index"})
+        self.framework.start()
+        self.context = self.framework.get_bundle_context()
+
+    def tearDown(self):
+        """
+        Called after each test
+        """
+        self.framework.stop()
+        FrameworkFactory.delete_framework()
+
+    def _find(self, ldap_filter, clazz=None):
+        """
+        Returns the set of references found with the given filter
+        """
+        return set(self.context.get_all_service_references(clazz, ldap_filter)
+                   or [])
+
+    def testEqualityFilters(self):
+        """
+        Tests the lookups of services with equality filters on indexed
+        properties
+        """
+        ref_a = self.context.register_service(
+            "spec.a", object(), {"test.index": "a", "other": 1}) \
+            .get_reference()
+        ref_b = self.context.register_service(
+            ["spec.a", "spec.b"], object(), {"test.index": ["b", 42]}) \
+            .get_reference()
+        ref_c = self.context.register_service(
+            "spec.b", object(), {"test.index": 42, "other": 2}) \
+            .get_reference()
+
+        self.assertEqual(self._find("(test.index=a)"), set([ref_a]))
+        self.assertEqual(self._find("(test.index=42)"), set([ref_b, ref_c]))
+        self.assertEqual(self._find("(test.index=42)", "spec.a"),
+                         set([ref_b]))
+        self.assertEqual(self._find("(test.index=unknown)"), set())
+
+        # Combined filters
+        self.assertEqual(self._find("(&(test.index=42)(other=2))"),
+                         set([ref_c]))
+        self.assertEqual(self._find("(|(test.index=a)(test.index=b))"),
+                         set([ref_a, ref_b]))
+        self.assertEqual(self._find("(|(test.index=a)(other=2))"),
+                         set([ref_a, ref_c]))
+        self.assertEqual(self._find("(!(test.index=42))"), set([ref_a]))
+
+        # Default framework lookup by service ID
+        svc_id = ref_b.get_property(pelix.constants.SERVICE_ID)
+        self.assertIs(self.context.get_service_reference(
+            None, "(service.id={0})".format(svc_id)), ref_b)
+
+        # Sort order is kept
+        refs = self.context.get_all_service_references(
+            None, "(test.index=42)")
+        self.assertListEqual(refs, sorted([ref_b, ref_c]))
+
+    def testUpdates(self):
+        """
+        Tests the update of the indexes on modification and unregistration
+        """
+        reg_a = self.context.register_service(
+            "spec.a", object(), {"test.index": "a"})
+        ref_a = reg_a.get_reference()
+        self.assertEqual(self._find("(test.index=a)"), set([ref_a]))
+
+        # Modify the indexed property
+        reg_a.set_properties({"test.index": "b"})
+        self.assertEqual(self._find("(test.index=a)"), set())
+        self.assertEqual(self._find("(test.index=b)"), set([ref_a]))
+
+        # Add it to a service which didn't have it
+        reg_c = self.context.register_service("spec.a", object(), {})
+        ref_c = reg_c.get_reference()
+        self.assertEqual(self._find("(test.index=b)"), set([ref_a]))
+        reg_c.set_properties({"test.index": "b"})
+        self.assertEqual(self._find("(test.index=b)"), set([ref_a, ref_c]))
+
+        # Unregister a service
+        reg_a.unregister()
+        self.assertEqual(self._find("(test.index=b)"), set([ref_c]))
+        reg_c.unregister()
+        self.assertEqual(self._find("(test.index=b)"), set())
+
+# ------------------------------------------------------------------------------
+
+
+class _EventsListener(object):
+    """
+    Service listener storing the received events
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self.events = []
+
+    def service_changed(self, event):
+        """
+        Called by the framework when a service event is triggered
+        """
+        self.events.append(event)
+
+
+class _BatchListener(_EventsListener):
+    """
+    Service listener storing the received batches of events
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        super(_BatchListener, self).__init__()
+        self.batches = []
+
+    def services_changed(self, events):
+        """
+        Called by the framework when a batch of service events is fired
+        """
+        self.batches.append(events)
+
+
+class ServicesBatchTest(unittest.TestCase):
+    """
+    Tests the registration and unregistration of services in batches
+    """
+    def setUp(self):
+        """
+        Called before each test. Initiates a framework.
+        """
+        self.framework = FrameworkFactory.get_framework()
+        self.framework.start()
+        self.context = self.framework.get_bundle_context()
+
+    def tearDown(self):
+        """
+        Called after each test
+        """
+        self.framework.stop()
+        FrameworkFactory.delete_framework()
+
+    def testRegisterServices(self):
+        """
+        Tests register_services() and unregister_services()
+        """
+        listener = _EventsListener()
+        batch_listener = _BatchListener()
+        filtered_listener = _BatchListener()
+        self.context.add_service_listener(listener, specification="spec.a")
+        self.context.add_service_listener(batch_listener)
+        self.context.add_service_listener(filtered_listener, "(test=1)")
+
+        svc_a, svc_b, svc_c = object(), object(), object()
+        registrations = self.context.register_services(
+            [("spec.a", svc_a, {"test": 1}),
+             (["spec.a", "spec.b"], svc_b,
+              {pelix.constants.SERVICE_RANKING: 10}),
+             ("spec.b", svc_c, None)])
+        refs = [registration.get_reference()
+                for registration in registrations]
+
+        # Services are registered in the given order
+        self.assertEqual([ref.get_property(pelix.constants.SERVICE_ID)
+                          for ref in refs],
+                         sorted(ref.get_property(pelix.constants.SERVICE_ID)
+                                for ref in refs))
+        for ref, svc in zip(refs, (svc_a, svc_b, svc_c)):
+            self.assertIs(self.context.get_service(ref), svc)
+            self.context.unget_service(ref)
+
+        # References are sorted by ranking
+        self.assertListEqual(
+            self.context.get_all_service_references("spec.a"),
+            [refs[1], refs[0]])
+        self.assertListEqual(
+            self.context.get_all_service_references("spec.b"),
+            [refs[1], refs[2]])
+
+        # Listeners without services_changed() get each event
+        self.assertListEqual([event.get_service_reference()
+                              for event in listener.events], refs[:2])
+        self.assertTrue(all(event.get_kind() == ServiceEvent.REGISTERED
+                            for event in listener.events))
+
+        # ... the others get a single batch
+        self.assertListEqual(batch_listener.events, [])
+        self.assertEqual(len(batch_listener.batches), 1)
+        self.assertListEqual([event.get_service_reference()
+                              for event in batch_listener.batches[0]], refs)
+        self.assertListEqual([[event.get_service_reference()
+                               for event in batch]
+                              for batch in filtered_listener.batches],
+                             [[refs[0]]])
+
+        # Unregister the services
+        del listener.events[:]
+        del batch_listener.batches[:]
+        self.assertTrue(self.context.unregister_services(registrations[:2]))
+
+        self.assertListEqual([event.get_service_reference()
+                              for event in listener.events], refs[:2])
+        self.assertTrue(all(event.get_kind() == ServiceEvent.UNREGISTERING
+                            for event in listener.events))
+        self.assertEqual(len(batch_listener.batches), 1)
+        self.assertListEqual([event.get_service_reference()
+                              for event in batch_listener.batches[0]],
+                             refs[:2])
+
+        self.assertIsNone(self.context.get_all_service_references("spec.a"))
+        self.assertListEqual(
+            self.context.get_all_service_references("spec.b"), [refs[2]])
+        self.assertListEqual(
+            self.context.get_bundle().get_registered_services(), [refs[2]])
+
+        # Empty batches
+        self.assertListEqual(self.context.register_services([]), [])
+        self.assertTrue(self.context.unregister_services([]))
+
+    def testInvalidBatches(self):
+        """
+        Tests the errors in batches
+        """
+        # Invalid service: nothing is registered
+        self.assertRaises(BundleException, self.context.register_services,
+                          [("spec.a", object(), None),
+                           ("spec.a", None, None)])
+        self.assertIsNone(self.context.get_all_service_references("spec.a"))
+
+        # Unknown service: nothing is unregistered
+        registrations = self.context.register_services(
+            [("spec.a", object(), None), ("spec.a", object(), None)])
+        registrations[1].unregister()
+        self.assertRaises(BundleException, self.context.unregister_services,
+                          registrations)
+        self.assertListEqual(
+            self.context.get_all_service_references("spec.a"),
+            [registrations[0].get_reference()])
+
+        # Same service twice
+        self.assertRaises(BundleException, self.context.unregister_services,
+                          [registrations[0], registrations[0]])
+        self.assertListEqual(
+            self.context.get_all_service_references("spec.a"),
+            [registrations[0].get_reference()])
+
+# ------------------------------------------------------------------------------
+
 if __name__ == "__main__":
     # Set logging level
     import logging
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Tests the start levels of the framework.
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.framework import FrameworkFactory, Bundle, BundleException
+import pelix.constants
+
+# Standard library
+import sys
+import types
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+# ------------------------------------------------------------------------------
+
+
+class _Activator(object):
+    """
+    Bundle activator logging its calls
+    """
+    def __init__(self, name, log):
+        """
+        :param name: Name of the bundle
+        :param log: List where to store the calls
+        """
+        self.name = name
+        self.log = log
+
+    def start(self, context):
+        """
+        Bundle started
+        """
+        self.log.append(("start", self.name))
+
+    def stop(self, context):
+        """
+        Bundle stopped
+        """
+        self.log.append(("stop", self.name))
+
+
+class StartLevelTest(unittest.TestCase):
+    """
+    Tests the start levels of bundles and of the framework
+    """
+    def setUp(self):
+        """
+        Prepares the bundles modules
+        """
+        self.framework = None
+        self.log = []
+        self.modules = []
+
+    def tearDown(self):
+        """
+        Cleans up the framework and the bundles modules
+        """
+        if self.framework is not None:
+            self.framework.stop()
+            FrameworkFactory.delete_framework()
+
+        for name in self.modules:
+            sys.modules.pop(name, None)
+
+    def _install(self, levels, properties=None):
+        """
+        Prepares a framework with a bundle for each given start level
+
+        :param levels: The start levels of the bundles (None for default)
+        :param properties: Framework properties
+        :return: The installed bundles
+        """
+        self.framework = FrameworkFactory.get_framework(properties)
+        context = self.framework.get_bundle_context()
+
+        bundles = []
+        for idx, level in enumerate(levels):
+            name = "test.level.bundle_{0}".format(idx)
+            module = types.ModuleType(name)
+            setattr(module, pelix.constants.ACTIVATOR,
+                    _Activator(name, self.log))
+            if level is not None:
+                setattr(module, pelix.constants.BUNDLE_START_LEVEL, level)
+
+            sys.modules[name] = module
+            self.modules.append(name)
+            bundles.append(context.install_bundle(name))
+
+        return bundles
+
+    def _started(self):
+        """
+        Returns the indexes of the bundles started since the last call
+        """
+        started = [int(name.rsplit("_", 1)[1])
+                   for action, name in self.log if action == "start"]
+        del self.log[:]
+        return started
+
+    def _stopped(self):
+        """
+        Returns the indexes of the bundles stopped since the last call
+        """
+        stopped = [int(name.rsplit("_", 1)[1])
+                   for action, name in self.log if action == "stop"]
+        del self.log[:]
+        return stopped
+
+    def testDefaultLevel(self):
+        """
+        Bundles without start level are started with the framework
+        """
+        bundles = self._install([None, 1, 3])
+        self.assertListEqual([bundle.get_start_level() for bundle in bundles],
+                             [pelix.constants.DEFAULT_START_LEVEL, 1, 3])
+        self.assertEqual(self.framework.get_start_level(), 0)
+
+        self.framework.start()
+        self.assertEqual(self.framework.get_start_level(),
+                         pelix.constants.DEFAULT_START_LEVEL)
+        self.assertListEqual(self._started(), [0, 1])
+        self.assertEqual(bundles[2].get_state(), Bundle.RESOLVED)
+
+        self.framework.stop()
+        self.assertEqual(self.framework.get_start_level(), 0)
+        self.assertListEqual(self._stopped(), [1, 0])
+
+    def testWaves(self):
+        """
+        Tests the start and stop of bundles level by level
+        """
+        bundles = self._install(
+            [5, 2, 1, 2, 10],
+            {pelix.constants.FRAMEWORK_BEGINNING_START_LEVEL: 2})
+
+        self.framework.start()
+        self.assertEqual(self.framework.get_start_level(), 2)
+        self.assertListEqual(self._started(), [2, 1, 3])
+
+        # Raise the level
+        self.framework.set_start_level(7)
+        self.assertEqual(self.framework.get_start_level(), 7)
+        self.assertListEqual(self._started(), [0])
+        self.assertEqual(bundles[4].get_state(), Bundle.RESOLVED)
+
+        self.framework.set_start_level(10)
+        self.assertListEqual(self._started(), [4])
+
+        # Lower the level
+        self.framework.set_start_level(1)
+        self.assertEqual(self.framework.get_start_level(), 1)
+        self.assertListEqual(self._stopped(), [4, 0, 3, 1])
+        self.assertListEqual([bundle.get_state() for bundle in bundles],
+                             [Bundle.RESOLVED, Bundle.RESOLVED, Bundle.ACTIVE,
+                              Bundle.RESOLVED, Bundle.RESOLVED])
+
+        # A bundle started explicitly is stopped with the framework
+        bundles[4].start()
+        del self.log[:]
+        self.framework.stop()
+        self.assertListEqual(self._stopped(), [4, 2])
+
+    def testBundleLevel(self):
+        """
+        Tests the modification of the start level of a bundle
+        """
+        bundles = self._install([None, None])
+        self.framework.start()
+        del self.log[:]
+
+        # Higher than the framework level: the bundle is stopped
+        bundles[1].set_start_level(3)
+        self.assertEqual(bundles[1].get_start_level(), 3)
+        self.assertEqual(bundles[1].get_state(), Bundle.RESOLVED)
+        self.assertListEqual(self._stopped(), [1])
+
+        # ... and started when the framework reaches its level
+        self.framework.set_start_level(3)
+        self.assertListEqual(self._started(), [1])
+
+        bundles[0].set_start_level(2)
+        self.assertEqual(bundles[0].get_state(), Bundle.ACTIVE)
+
+        # Lower than the framework level: the bundle is started
+        self.framework.set_start_level(2)
+        self.assertListEqual(self._stopped(), [1])
+        bundles[1].set_start_level(2)
+        self.assertEqual(bundles[1].get_state(), Bundle.ACTIVE)
+        self.assertListEqual(self._started(), [1])
+
+        # Unless the framework isn't active
+        self.framework.stop()
+        del self.log[:]
+        bundles[1].set_start_level(1)
+        self.assertEqual(bundles[1].get_state(), Bundle.RESOLVED)
+        self.assertListEqual(self.log, [])
+
+    def testInvalidLevels(self):
+        """
+        Tests invalid start levels
+        """
+        bundles = self._install(
+            [0, "abc"], {pelix.constants.FRAMEWORK_BEGINNING_START_LEVEL: -1})
+        for bundle in bundles:
+            self.assertEqual(bundle.get_start_level(),
+                             pelix.constants.DEFAULT_START_LEVEL)
+            self.assertRaises(ValueError, bundle.set_start_level, 0)
+
+        # The framework must be active
+        self.assertRaises(BundleException, self.framework.set_start_level, 2)
+
+        self.framework.start()
+        self.assertEqual(self.framework.get_start_level(),
+                         pelix.constants.DEFAULT_START_LEVEL)
+        self.assertRaises(ValueError, self.framework.set_start_level, 0)
+        self.assertRaises(ValueError, self.framework.set_start_level, None)
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
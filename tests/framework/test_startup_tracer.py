@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Tests the startup tracer of the framework and iPOPO.
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.framework import FrameworkFactory, create_framework
+from pelix.internals.tracer import StartupTracer, FORMAT_CHROME, \
+    FORMAT_JSON, TRACE_FACTORIES, TRACE_FRAMEWORK, TRACE_INSTALL, \
+    TRACE_INSTANTIATE, TRACE_START, TRACE_VALIDATE
+import pelix.constants
+import pelix.shell
+import pelix.shell.beans as beans
+
+# Standard library
+import json
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+BASIC_FACTORY = "basic-component-factory"
+BASIC_INSTANCE = "basic-component"
+
+# ------------------------------------------------------------------------------
+
+
+class StartupTracerTest(unittest.TestCase):
+    """
+    Tests the StartupTracer class
+    """
+    def setUp(self):
+        """
+        Prepares a temporary directory
+        """
+        self.directory = tempfile.mkdtemp(prefix="pelix-tracer-")
+
+    def tearDown(self):
+        """
+        Cleans up the temporary directory
+        """
+        shutil.rmtree(self.directory)
+
+    def testTimeline(self):
+        """
+        Tests the recording and sorting of events
+        """
+        tracer = StartupTracer()
+        with tracer.trace(TRACE_START, "slow", extra=42):
+            time.sleep(.05)
+        with tracer.trace(TRACE_INSTALL, "fast"):
+            pass
+
+        try:
+            with tracer.trace(TRACE_START, "error"):
+                raise ValueError("Error")
+        except ValueError:
+            pass
+        else:
+            self.fail("The exception has been swallowed")
+
+        self.assertListEqual([event.name for event in tracer.get_events()],
+                             ["slow", "fast", "error"])
+        self.assertListEqual(
+            [event.name for event in tracer.get_events(TRACE_START)],
+            ["slow", "error"])
+
+        slowest = tracer.get_slowest(1)
+        self.assertEqual(len(slowest), 1)
+        self.assertEqual(slowest[0].name, "slow")
+        self.assertGreaterEqual(slowest[0].duration, .04)
+        self.assertDictEqual(slowest[0].args, {"extra": 42})
+        self.assertDictEqual(tracer.get_events()[2].args,
+                             {"error": "ValueError"})
+
+        tracer.clear()
+        self.assertListEqual(tracer.get_events(), [])
+
+    def testMaxEvents(self):
+        """
+        Only the latest events are kept
+        """
+        tracer = StartupTracer(2)
+        for idx in range(5):
+            with tracer.trace(TRACE_START, str(idx)):
+                pass
+
+        self.assertListEqual([event.name for event in tracer.get_events()],
+                             ["3", "4"])
+
+    def testExport(self):
+        """
+        Tests the JSON and Chrome trace exports
+        """
+        tracer = StartupTracer()
+        with tracer.trace(TRACE_INSTALL, "bundle"):
+            time.sleep(.01)
+
+        json_file = os.path.join(self.directory, "timeline.json")
+        tracer.export(json_file, FORMAT_JSON)
+        with open(json_file) as in_file:
+            data = json.load(in_file)
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]["category"], TRACE_INSTALL)
+        self.assertEqual(data[0]["name"], "bundle")
+
+        chrome_file = os.path.join(self.directory, "timeline.trace")
+        tracer.export(chrome_file, FORMAT_CHROME)
+        with open(chrome_file) as in_file:
+            data = json.load(in_file)
+        event = data["traceEvents"][0]
+        self.assertEqual(event["ph"], "X")
+        self.assertEqual(event["cat"], TRACE_INSTALL)
+        self.assertGreaterEqual(event["dur"], 9000)
+
+        self.assertRaises(ValueError, tracer.export, json_file, "unknown")
+
+
+class FrameworkTracerTest(unittest.TestCase):
+    """
+    Tests the startup tracer in the framework and iPOPO
+    """
+    def tearDown(self):
+        """
+        Cleans up the framework
+        """
+        if FrameworkFactory.is_framework_running():
+            FrameworkFactory.delete_framework()
+
+    def testDisabled(self):
+        """
+        The tracer is disabled by default
+        """
+        for value in (None, False, "false", "0"):
+            framework = FrameworkFactory.get_framework(
+                {pelix.constants.FRAMEWORK_STARTUP_TRACER: value})
+            self.assertIsNone(framework.get_startup_tracer())
+            FrameworkFactory.delete_framework()
+
+    def testPhases(self):
+        """
+        Tests the phases recorded while starting a framework with iPOPO
+        """
+        framework = create_framework(
+            ("pelix.ipopo.core", "tests.ipopo.ipopo_bundle"),
+            {pelix.constants.FRAMEWORK_STARTUP_TRACER: True})
+        framework.start()
+
+        tracer = framework.get_startup_tracer()
+        self.assertIsInstance(tracer, StartupTracer)
+
+        def names(category):
+            """
+            Returns the names of the events of the given category
+            """
+            return [event.name for event in tracer.get_events(category)]
+
+        self.assertIn("tests.ipopo.ipopo_bundle", names(TRACE_INSTALL))
+        self.assertIn("pelix.ipopo.core", names(TRACE_START))
+        self.assertIn("tests.ipopo.ipopo_bundle", names(TRACE_FACTORIES))
+        self.assertListEqual(names(TRACE_FRAMEWORK),
+                             [framework.get_symbolic_name()])
+
+        instantiated = [event for event in tracer.get_events(TRACE_INSTANTIATE)
+                        if event.name == BASIC_INSTANCE]
+        self.assertEqual(len(instantiated), 1)
+        self.assertDictEqual(instantiated[0].args, {"factory": BASIC_FACTORY})
+        self.assertIn(BASIC_INSTANCE, names(TRACE_VALIDATE))
+
+        # The framework start includes the start of the bundles
+        framework_event = tracer.get_events(TRACE_FRAMEWORK)[0]
+        for event in tracer.get_events(TRACE_START):
+            self.assertGreaterEqual(event.start, framework_event.start)
+            self.assertLessEqual(event.duration, framework_event.duration)
+
+    def testShellCommands(self):
+        """
+        Tests the startup shell commands
+        """
+        directory = tempfile.mkdtemp(prefix="pelix-tracer-")
+        try:
+            for enabled in (False, True):
+                framework = create_framework(
+                    ("pelix.ipopo.core", "pelix.shell.core",
+                     "pelix.shell.startup"),
+                    {pelix.constants.FRAMEWORK_STARTUP_TRACER: enabled})
+                framework.start()
+                context = framework.get_bundle_context()
+                shell = context.get_service(context.get_service_reference(
+                    pelix.shell.SERVICE_SHELL))
+
+                output = StringIO()
+                session = beans.ShellSession(beans.IOHandler(None, output))
+                filename = os.path.join(directory, "timeline.json")
+                self.assertEqual(
+                    shell.execute("startup.timeline 3", session), enabled)
+                self.assertEqual(
+                    shell.execute("startup.export {0} chrome"
+                                  .format(filename), session), enabled)
+                self.assertEqual(os.path.exists(filename), enabled)
+
+                if enabled:
+                    self.assertIn(TRACE_FRAMEWORK, output.getvalue())
+                    self.assertIn("3 phases shown", output.getvalue())
+                    with open(filename) as in_file:
+                        self.assertIn("traceEvents", json.load(in_file))
+                else:
+                    self.assertIn("disabled", output.getvalue())
+
+                FrameworkFactory.delete_framework()
+        finally:
+            shutil.rmtree(directory)
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Bundle defining components with coroutine callbacks (Python 3.5+ only)
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.ipopo.decorators import ComponentFactory, Property, Provides, \
+    Validate, Invalidate
+
+# Standard library
+import asyncio
+import threading
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+FACTORY_ASYNC = "ipopo.tests.async"
+FACTORY_ASYNC_ERRONEOUS = "ipopo.tests.async.erroneous"
+SVC_ASYNC = "ipopo.tests.async.service"
+
+# ------------------------------------------------------------------------------
+
+
+@ComponentFactory(FACTORY_ASYNC)
+@Provides(SVC_ASYNC)
+class AsyncComponent(object):
+    """
+    Component with coroutine life cycle callbacks
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self.states = []
+        self.threads = []
+
+    @Validate
+    async def validate(self, context):
+        """
+        Validation
+        """
+        await asyncio.sleep(.01)
+        self.threads.append(threading.current_thread())
+        self.states.append("validated")
+
+    @Invalidate
+    async def invalidate(self, context):
+        """
+        Invalidation
+        """
+        await asyncio.sleep(.01)
+        self.threads.append(threading.current_thread())
+        self.states.append("invalidated")
+
+
+@ComponentFactory(FACTORY_ASYNC_ERRONEOUS)
+@Property("_raise", "raise", True)
+class AsyncErroneousComponent(object):
+    """
+    Component failing to validate, in a coroutine
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self._raise = True
+
+    @Validate
+    async def validate(self, context):
+        """
+        Validation
+        """
+        await asyncio.sleep(0)
+        if self._raise:
+            raise ValueError("Validation error")
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Bundle defining a component with a dependency, installed lazily
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.ipopo.decorators import ComponentFactory, Provides, Requires, \
+    Instantiate
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+FACTORY_LAZY = "ipopo.tests.lazy"
+SPEC_LAZY = "ipopo.tests.lazy.service"
+SPEC_LOG = "ipopo.tests.lazy.log"
+
+# ------------------------------------------------------------------------------
+
+
+@ComponentFactory(FACTORY_LAZY)
+@Provides(SPEC_LAZY)
+@Requires("_log", SPEC_LOG, optional=True)
+@Instantiate("lazy-provider")
+class LazyProvider(object):
+    """
+    Component providing a service, with its own dependency
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self._log = None
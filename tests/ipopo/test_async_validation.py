@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Tests the asynchronous validation of iPOPO components
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.framework import FrameworkFactory
+from pelix.ipopo.constants import use_ipopo, IPOPO_ASYNC_VALIDATE, \
+    IPOPO_VALIDATION_THREADS
+from pelix.ipopo.decorators import ComponentFactory, Property, Provides, \
+    Requires, Validate
+from pelix.ipopo.instance import StoredInstance
+
+# Standard library
+import threading
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+FACTORY_SLOW = "async-slow-factory"
+FACTORY_SYNC = "async-sync-factory"
+FACTORY_CONSUMER = "async-consumer-factory"
+SPEC_SLOW = "async.slow"
+
+# ------------------------------------------------------------------------------
+
+
+class _Rendezvous(object):
+    """
+    Counts the validations which reached it, and blocks them until its gate
+    is opened
+    """
+    def __init__(self, count):
+        """
+        :param count: Number of validations to wait for
+        """
+        self.count = count
+        self.arrived = 0
+        self.all_arrived = threading.Event()
+        self.gate = threading.Event()
+        self.__lock = threading.Lock()
+
+    def arrive(self):
+        """
+        Called by a validation: waits for the gate to be opened
+        """
+        with self.__lock:
+            self.arrived += 1
+            if self.arrived >= self.count:
+                self.all_arrived.set()
+
+        self.gate.wait(5)
+
+
+@ComponentFactory(FACTORY_SLOW)
+@Property("_async", IPOPO_ASYNC_VALIDATE, True)
+@Provides(SPEC_SLOW)
+class SlowComponent(object):
+    """
+    Component with a slow validation
+    """
+    # Rendezvous of the validations
+    rendezvous = None
+
+    # Method called at the end of the validation
+    callback = None
+
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self._async = True
+        self.thread = None
+
+    @Validate
+    def validate(self, context):
+        """
+        Component validated
+        """
+        self.thread = threading.current_thread()
+        if self.rendezvous is not None:
+            self.rendezvous.arrive()
+        if self.callback is not None:
+            self.callback()
+
+
+@ComponentFactory(FACTORY_SYNC)
+class SyncComponent(object):
+    """
+    Component which must be validated synchronously
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self.thread = None
+
+    @Validate
+    def validate(self, context):
+        """
+        Component validated
+        """
+        self.thread = threading.current_thread()
+
+
+@ComponentFactory(FACTORY_CONSUMER)
+@Requires("_slow", SPEC_SLOW, aggregate=True)
+class Consumer(SyncComponent):
+    """
+    Component depending on the slow ones
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        SyncComponent.__init__(self)
+        self._slow = None
+
+# ------------------------------------------------------------------------------
+
+
+class AsyncValidationTest(unittest.TestCase):
+    """
+    Tests the asynchronous validation of components
+    """
+    def setUp(self):
+        """
+        Prepares members
+        """
+        self.framework = None
+        self.ipopo = None
+
+    def tearDown(self):
+        """
+        Cleans up the framework
+        """
+        SlowComponent.rendezvous = None
+        SlowComponent.callback = None
+        if self.framework is not None:
+            self.framework.stop()
+            FrameworkFactory.delete_framework()
+
+    def _start(self, nb_threads):
+        """
+        Starts a framework with iPOPO and registers the test factories
+
+        :param nb_threads: Number of validation threads
+        """
+        self.framework = FrameworkFactory.get_framework(
+            {IPOPO_VALIDATION_THREADS: nb_threads})
+        self.framework.start()
+        context = self.framework.get_bundle_context()
+        context.install_bundle("pelix.ipopo.core").start()
+
+        with use_ipopo(context) as ipopo:
+            self.ipopo = ipopo
+            for factory in (SlowComponent, SyncComponent, Consumer):
+                ipopo.register_factory(context, factory)
+
+    def _state(self, name):
+        """
+        Returns the state of the given component
+        """
+        return self.ipopo.get_instance_details(name)["state"]
+
+    def testParallelValidation(self):
+        """
+        Components flagged as asynchronous are validated concurrently
+        """
+        self._start(4)
+        consumer = self.ipopo.instantiate(FACTORY_CONSUMER, "consumer")
+
+        # The validations wait for each other: instantiate() must not wait
+        # for them
+        rendezvous = _Rendezvous(4)
+        SlowComponent.rendezvous = rendezvous
+        components = [self.ipopo.instantiate(FACTORY_SLOW,
+                                             "slow-{0}".format(idx))
+                      for idx in range(4)]
+        self.assertTrue(rendezvous.all_arrived.wait(5))
+        self.assertFalse(self.ipopo.wait_validations(0))
+        self.assertNotEqual(self._state("consumer"), StoredInstance.VALID)
+
+        rendezvous.gate.set()
+        self.assertTrue(self.ipopo.wait_validations(5))
+
+        for idx, component in enumerate(components):
+            self.assertEqual(self._state("slow-{0}".format(idx)),
+                             StoredInstance.VALID)
+            self.assertIsNot(component.thread, threading.current_thread())
+        self.assertEqual(len(set(component.thread
+                                 for component in components)), 4)
+
+        # The consumer is validated synchronously
+        self.assertEqual(self._state("consumer"), StoredInstance.VALID)
+        self.assertEqual(len(consumer._slow), 4)
+
+        sync = self.ipopo.instantiate(FACTORY_SYNC, "sync")
+        self.assertIs(sync.thread, threading.current_thread())
+
+    def testWaitTimeout(self):
+        """
+        Tests the timeout of wait_validations()
+        """
+        self._start(2)
+        self.assertTrue(self.ipopo.wait_validations(0))
+
+        rendezvous = _Rendezvous(1)
+        SlowComponent.rendezvous = rendezvous
+        try:
+            self.ipopo.instantiate(FACTORY_SLOW, "slow")
+            self.assertTrue(rendezvous.all_arrived.wait(5))
+            self.assertFalse(self.ipopo.wait_validations(.05))
+        finally:
+            rendezvous.gate.set()
+
+        self.assertTrue(self.ipopo.wait_validations(5))
+        self.assertEqual(self._state("slow"), StoredInstance.VALID)
+
+    def testStopDuringValidation(self):
+        """
+        Stopping iPOPO from a validation drops the queued validations, and
+        waits for the running ones only
+        """
+        self._start(1)
+        ipopo_bundle = self.framework.get_bundle_by_name("pelix.ipopo.core")
+
+        rendezvous = _Rendezvous(1)
+        SlowComponent.rendezvous = rendezvous
+        SlowComponent.callback = ipopo_bundle.stop
+
+        first = self.ipopo.instantiate(FACTORY_SLOW, "slow-1")
+        self.assertTrue(rendezvous.all_arrived.wait(5))
+
+        # Queued behind the first one, in the only thread
+        second = self.ipopo.instantiate(FACTORY_SLOW, "slow-2")
+        self.assertFalse(self.ipopo.wait_validations(0))
+
+        rendezvous.gate.set()
+        self.assertTrue(self.ipopo.wait_validations(5))
+        self.assertIsNotNone(first.thread)
+        self.assertIsNone(second.thread)
+
+        # Still nothing to wait for
+        self.assertTrue(self.ipopo.wait_validations(0))
+
+    def testDisabled(self):
+        """
+        Without validation threads, all components are validated
+        synchronously
+        """
+        self._start(None)
+        component = self.ipopo.instantiate(FACTORY_SLOW, "slow")
+        self.assertIs(component.thread, threading.current_thread())
+        self.assertEqual(self._state("slow"), StoredInstance.VALID)
+        self.assertTrue(self.ipopo.wait_validations())
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
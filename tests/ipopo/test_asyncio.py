@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Tests the coroutine callbacks of iPOPO components
+
+:author: Thomas Calmant
+"""
+
+# Tests
+from tests.ipopo import install_bundle, install_ipopo
+
+# Pelix
+from pelix.framework import FrameworkFactory
+from pelix.ipopo.instance import StoredInstance
+import pelix.constants
+
+# Standard library
+import sys
+import threading
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+# ------------------------------------------------------------------------------
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "Coroutines need Python 3.5+")
+class AsyncCallbacksTest(unittest.TestCase):
+    """
+    Tests the coroutine callbacks, with and without framework event loop
+    """
+    def setUp(self):
+        """
+        Called before each test. Starts an event loop in a thread
+        """
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever)
+        self.loop_thread.daemon = True
+        self.loop_thread.start()
+        self.framework = None
+
+    def tearDown(self):
+        """
+        Called after each test
+        """
+        if self.framework is not None:
+            self.framework.stop()
+            FrameworkFactory.delete_framework()
+            self.framework = None
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join(5)
+        self.loop.close()
+
+    def _start_framework(self, properties=None):
+        """
+        Starts a framework with iPOPO and the test bundle
+        """
+        self.framework = FrameworkFactory.get_framework(properties)
+        self.framework.start()
+        self.ipopo = install_ipopo(self.framework)
+        self.module = install_bundle(self.framework,
+                                     "tests.ipopo.ipopo_async_bundle")
+
+    def testFrameworkLoop(self):
+        """
+        Coroutine callbacks are executed on the framework event loop
+        """
+        self._start_framework(
+            {pelix.constants.FRAMEWORK_EVENT_LOOP: self.loop})
+        component = self.ipopo.instantiate(self.module.FACTORY_ASYNC, "async")
+
+        # The service is registered after the end of the coroutine
+        self.assertEqual(component.states, ["validated"])
+        context = self.framework.get_bundle_context()
+        self.assertIsNotNone(
+            context.get_service_reference(self.module.SVC_ASYNC))
+
+        self.ipopo.kill("async")
+        self.assertEqual(component.states, ["validated", "invalidated"])
+        self.assertEqual(component.threads,
+                         [self.loop_thread, self.loop_thread])
+
+    def testTemporaryLoop(self):
+        """
+        Coroutine callbacks are executed by a temporary loop when the
+        framework has no event loop
+        """
+        self._start_framework()
+        component = self.ipopo.instantiate(self.module.FACTORY_ASYNC, "async")
+        self.assertEqual(component.states, ["validated"])
+        self.assertNotIn(self.loop_thread, component.threads)
+
+    def testErroneous(self):
+        """
+        A coroutine raising an exception fails the validation
+        """
+        self._start_framework(
+            {pelix.constants.FRAMEWORK_EVENT_LOOP: self.loop})
+        self.ipopo.instantiate(self.module.FACTORY_ASYNC_ERRONEOUS, "async")
+        self.assertEqual(self.ipopo.get_instance_details("async")['state'],
+                         StoredInstance.ERRONEOUS)
+
+        # Retry with a valid configuration
+        self.ipopo.retry_erroneous("async", {"raise": False})
+        self.assertEqual(self.ipopo.get_instance_details("async")['state'],
+                         StoredInstance.VALID)
+
+    def testCallbackInLoop(self):
+        """
+        A coroutine callback called in the thread of the framework loop can't
+        be waited for: the validation fails
+        """
+        self._start_framework(
+            {pelix.constants.FRAMEWORK_EVENT_LOOP: self.loop})
+        components = []
+        done = threading.Event()
+
+        def instantiate():
+            components.append(
+                self.ipopo.instantiate(self.module.FACTORY_ASYNC, "async"))
+            done.set()
+
+        self.loop.call_soon_threadsafe(instantiate)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(self.ipopo.get_instance_details("async")['state'],
+                         StoredInstance.ERRONEOUS)
+        self.assertEqual(components[0].states, [])
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
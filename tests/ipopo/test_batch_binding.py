@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Tests the batched binding of dependencies and the iPOPO quiet periods
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.framework import FrameworkFactory
+from pelix.ipopo.constants import use_ipopo
+from pelix.ipopo.decorators import ComponentFactory, Requires, Validate, \
+    Invalidate, Bind
+
+# Standard library
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+FACTORY = "batch-consumer-factory"
+SPEC_SIMPLE = "batch.simple"
+SPEC_AGGREGATE = "batch.aggregate"
+
+# ------------------------------------------------------------------------------
+
+
+@ComponentFactory(FACTORY)
+@Requires("_simple", SPEC_SIMPLE)
+@Requires("_aggregate", SPEC_AGGREGATE, aggregate=True)
+class Consumer(object):
+    """
+    Component logging its life cycle
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self._simple = None
+        self._aggregate = None
+        self.states = []
+
+    @Bind
+    def bind(self, svc, svc_ref):
+        """
+        Service bound
+        """
+        self.states.append("bind")
+
+    @Validate
+    def validate(self, context):
+        """
+        Component validated
+        """
+        self.states.append("validate")
+
+    @Invalidate
+    def invalidate(self, context):
+        """
+        Component invalidated
+        """
+        self.states.append("invalidate")
+
+    def pop_states(self):
+        """
+        Returns and clears the list of states
+        """
+        states = self.states[:]
+        del self.states[:]
+        return states
+
+# ------------------------------------------------------------------------------
+
+
+class BatchBindingTest(unittest.TestCase):
+    """
+    Tests the batched binding of dependencies
+    """
+    def setUp(self):
+        """
+        Starts a framework with iPOPO and instantiates a consumer
+        """
+        self.framework = FrameworkFactory.get_framework()
+        self.framework.start()
+        self.context = self.framework.get_bundle_context()
+        self.context.install_bundle("pelix.ipopo.core").start()
+
+        with use_ipopo(self.context) as ipopo:
+            self.ipopo = ipopo
+            ipopo.register_factory(self.context, Consumer)
+            self.consumer = ipopo.instantiate(FACTORY, "consumer")
+
+    def tearDown(self):
+        """
+        Cleans up the framework
+        """
+        self.framework.stop()
+        FrameworkFactory.delete_framework()
+
+    def testQuietPeriod(self):
+        """
+        Components are validated once at the end of a quiet period
+        """
+        with self.ipopo.quiet_period():
+            self.context.register_service(SPEC_AGGREGATE, object(), {})
+            reg_simple = self.context.register_service(SPEC_SIMPLE, object(),
+                                                       {})
+            self.context.register_service(SPEC_AGGREGATE, object(), {})
+
+            # Nested period
+            self.ipopo.begin_quiet_period()
+            self.context.register_service(SPEC_AGGREGATE, object(), {})
+            self.ipopo.end_quiet_period()
+            self.assertNotIn("validate", self.consumer.states)
+
+        self.assertListEqual(self.consumer.pop_states(),
+                             ["bind"] * 4 + ["validate"])
+        self.assertEqual(len(self.consumer._aggregate), 3)
+
+        # Replace the simple dependency many times
+        self.ipopo.begin_quiet_period()
+        for _ in range(5):
+            reg_simple.unregister()
+            reg_simple = self.context.register_service(SPEC_SIMPLE, object(),
+                                                       {})
+
+        # Invalidated immediately, validated at the end
+        self.assertListEqual(self.consumer.pop_states(),
+                             ["invalidate"] + ["bind"] * 5)
+        self.ipopo.end_quiet_period()
+        self.assertListEqual(self.consumer.pop_states(), ["validate"])
+
+        # Unbalanced calls are ignored
+        self.ipopo.end_quiet_period()
+        reg_simple.unregister()
+        self.context.register_service(SPEC_SIMPLE, object(), {})
+        self.assertListEqual(self.consumer.pop_states(),
+                             ["invalidate", "bind", "validate"])
+
+    def testInstantiateInQuietPeriod(self):
+        """
+        Components instantiated in a quiet period are validated at its end
+        """
+        self.context.register_service(SPEC_SIMPLE, object(), {})
+        self.context.register_service(SPEC_AGGREGATE, object(), {})
+        self.assertListEqual(self.consumer.pop_states(),
+                             ["bind", "bind", "validate"])
+
+        with self.ipopo.quiet_period():
+            other = self.ipopo.instantiate(FACTORY, "other")
+            self.assertListEqual(other.states, ["bind", "bind"])
+
+        self.assertListEqual(other.states, ["bind", "bind", "validate"])
+
+    def testBatchOfEvents(self):
+        """
+        A batch of service events is handled before validating the component
+        """
+        self.context.register_service(SPEC_SIMPLE, object(), {})
+        self.assertListEqual(self.consumer.pop_states(), ["bind"])
+
+        self.context.register_services(
+            [(SPEC_AGGREGATE, object(), {}) for _ in range(3)])
+        self.assertListEqual(self.consumer.pop_states(),
+                             ["bind"] * 3 + ["validate"])
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Tests the iPOPO factories metadata cache
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.framework import FrameworkFactory, create_framework
+from pelix.ipopo.cache import MetadataCache, install_bundles, \
+    get_lazy_specifications
+import pelix.ipopo.cache as cache_module
+import pelix.ipopo.constants as constants
+
+# Standard library
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+MODULE_NAME = "test_cached_bundle"
+BASE_MODULE_NAME = "test_cached_base"
+SPEC = "test.cache.spec"
+
+BUNDLE_CONTENT = """
+from pelix.ipopo.decorators import ComponentFactory, Provides, Instantiate, \\
+    Requires
+
+@ComponentFactory("cached-factory")
+@Provides("{spec}")
+@Requires("_other", "test.cache.other", optional=True)
+@Instantiate("cached-component", {{"answer": 42}})
+class Component(object):
+    pass
+"""
+
+INHERITED_CONTENT = """
+from pelix.ipopo.decorators import ComponentFactory, Provides, Instantiate
+from test_cached_base import Base
+
+@ComponentFactory("cached-factory")
+@Provides("{spec}")
+@Instantiate("cached-component")
+class Component(Base):
+    pass
+"""
+
+BASE_CONTENT = """
+class Base(object):
+    answer = {answer}
+"""
+
+ACTIVATOR_CONTENT = """
+from pelix.constants import BundleActivator
+
+@BundleActivator
+class Activator(object):
+    def start(self, context):
+        pass
+
+    def stop(self, context):
+        pass
+"""
+
+# ------------------------------------------------------------------------------
+
+
+class MetadataCacheTest(unittest.TestCase):
+    """
+    Tests the factories metadata cache
+    """
+    def setUp(self):
+        """
+        Prepares the directories of the cache and of the bundle module
+        """
+        self.directory = tempfile.mkdtemp(prefix="ipopo-cache-")
+        self.cache_dir = os.path.join(self.directory, "cache")
+        self.module_file = os.path.join(self.directory,
+                                        MODULE_NAME + ".py")
+        self.write_module(BUNDLE_CONTENT.format(spec=SPEC))
+        sys.path.insert(0, self.directory)
+
+    def tearDown(self):
+        """
+        Cleans up the framework, the module and the directories
+        """
+        if FrameworkFactory.is_framework_running():
+            FrameworkFactory.delete_framework()
+
+        sys.path.remove(self.directory)
+        sys.modules.pop(MODULE_NAME, None)
+        sys.modules.pop(BASE_MODULE_NAME, None)
+        shutil.rmtree(self.directory)
+
+    def write_module(self, content, module_name=MODULE_NAME):
+        """
+        Writes the bundle module, or another module
+        """
+        with open(os.path.join(self.directory, module_name + ".py"),
+                  "w") as out_file:
+            out_file.write(content)
+
+        # Avoid the byte code of the previous version
+        for name in os.listdir(self.directory):
+            if name.startswith(module_name) and name.endswith(".pyc"):
+                os.remove(os.path.join(self.directory, name))
+        shutil.rmtree(os.path.join(self.directory, "__pycache__"), True)
+
+    def boot(self):
+        """
+        Starts a framework with iPOPO and installs the bundle with
+        install_bundles()
+
+        :return: The framework and the names of the lazy bundles
+        """
+        framework = create_framework(
+            ("pelix.ipopo.core",),
+            {constants.IPOPO_METADATA_CACHE: self.cache_dir})
+        framework.start()
+        _, lazy = install_bundles(framework.get_bundle_context(),
+                                  [MODULE_NAME])
+        return framework, lazy
+
+    def restart(self):
+        """
+        Stops the framework and forgets the bundle module
+        """
+        FrameworkFactory.delete_framework()
+        sys.modules.pop(MODULE_NAME, None)
+
+    def testLazyRestart(self):
+        """
+        An unchanged bundle providing services is installed lazily
+        """
+        # First boot: the bundle is imported and its metadata stored
+        framework, lazy = self.boot()
+        self.assertListEqual(lazy, [])
+        self.assertIn(MODULE_NAME, sys.modules)
+        framework.get_bundle_by_name(MODULE_NAME).start()
+        self.assertTrue(os.path.exists(
+            os.path.join(self.cache_dir, MODULE_NAME + ".json")))
+        self.restart()
+
+        # Second boot: the module isn't imported
+        framework, lazy = self.boot()
+        self.assertListEqual(lazy, [MODULE_NAME])
+        self.assertNotIn(MODULE_NAME, sys.modules)
+
+        # ... until its service is looked for
+        context = framework.get_bundle_context()
+        svc_ref = context.get_service_reference(SPEC)
+        self.assertIsNotNone(svc_ref)
+        self.assertEqual(svc_ref.get_property("answer"), 42)
+        self.assertIn(MODULE_NAME, sys.modules)
+        self.restart()
+
+        # Modified bundle: imported again
+        self.write_module(BUNDLE_CONTENT.format(spec="test.cache.spec2"))
+        framework, lazy = self.boot()
+        self.assertListEqual(lazy, [])
+        self.assertIn(MODULE_NAME, sys.modules)
+
+    def testMetadata(self):
+        """
+        Tests the content of the cache
+        """
+        framework, _ = self.boot()
+        framework.get_bundle_by_name(MODULE_NAME).start()
+
+        cache = MetadataCache(self.cache_dir)
+        metadata = cache.get(MODULE_NAME, self.module_file)
+        self.assertFalse(metadata["activator"])
+        self.assertEqual(len(metadata["factories"]), 1)
+
+        factory = metadata["factories"][0]
+        self.assertEqual(factory["name"], "cached-factory")
+        self.assertListEqual(factory["services"], [[SPEC]])
+        self.assertDictEqual(factory["instances"],
+                             {"cached-component": {"answer": 42}})
+        self.assertEqual(factory["requirements"][0]["specification"],
+                         "test.cache.other")
+        self.assertDictEqual(cache.get_factories(),
+                             {"cached-factory": MODULE_NAME})
+        self.assertSetEqual(get_lazy_specifications(metadata), set([SPEC]))
+
+        # Touching the file without changing it keeps the entry valid
+        stat = os.stat(self.module_file)
+        os.utime(self.module_file, (stat.st_atime, stat.st_mtime + 10))
+        self.assertDictEqual(cache.get(MODULE_NAME, self.module_file),
+                             metadata)
+
+        # Changed content
+        self.write_module(BUNDLE_CONTENT.format(spec="other.spec"))
+        self.assertIsNone(cache.get(MODULE_NAME, self.module_file))
+
+        cache.clear()
+        self.assertFalse(os.listdir(self.cache_dir))
+        self.assertDictEqual(cache.get_factories(), {})
+
+    def testDependencies(self):
+        """
+        The entry is invalidated when the module of a parent class of a
+        factory changes
+        """
+        self.write_module(INHERITED_CONTENT.format(spec=SPEC))
+        self.write_module(BASE_CONTENT.format(answer=42), BASE_MODULE_NAME)
+        framework, _ = self.boot()
+        framework.get_bundle_by_name(MODULE_NAME).start()
+
+        cache = MetadataCache(self.cache_dir)
+        self.assertIsNotNone(cache.get(MODULE_NAME, self.module_file))
+
+        self.write_module(BASE_CONTENT.format(answer=4242), BASE_MODULE_NAME)
+        self.assertIsNone(cache.get(MODULE_NAME, self.module_file))
+
+    def testIPopoVersion(self):
+        """
+        Entries written by another version of iPOPO are ignored
+        """
+        framework, _ = self.boot()
+        framework.get_bundle_by_name(MODULE_NAME).start()
+
+        cache = MetadataCache(self.cache_dir)
+        self.assertIsNotNone(cache.get(MODULE_NAME, self.module_file))
+
+        path = os.path.join(self.cache_dir, MODULE_NAME + ".json")
+        with open(path) as in_file:
+            entry = json.load(in_file)
+        entry["ipopo"] = "0.0.0"
+        with open(path, "w") as out_file:
+            json.dump(entry, out_file)
+
+        self.assertIsNone(cache.get(MODULE_NAME, self.module_file))
+
+    def testHashSkipped(self):
+        """
+        Files are hashed only if their modification time changed
+        """
+        hashed = []
+        original_hash = cache_module._file_hash
+
+        def file_hash(filename):
+            hashed.append(filename)
+            return original_hash(filename)
+
+        cache = MetadataCache(self.cache_dir)
+        cache_module._file_hash = file_hash
+        try:
+            cache.store(MODULE_NAME, self.module_file, {"factories": []})
+            self.assertListEqual(hashed, [self.module_file])
+
+            # Same modification time and size: no hash
+            del hashed[:]
+            self.assertIsNotNone(cache.get(MODULE_NAME, self.module_file))
+            cache.store(MODULE_NAME, self.module_file, {"factories": []})
+            self.assertListEqual(hashed, [])
+
+            # Touched file: its content is checked
+            stat = os.stat(self.module_file)
+            os.utime(self.module_file, (stat.st_atime, stat.st_mtime + 10))
+            self.assertIsNotNone(cache.get(MODULE_NAME, self.module_file))
+            self.assertListEqual(hashed, [self.module_file])
+        finally:
+            cache_module._file_hash = original_hash
+
+    def testActivator(self):
+        """
+        Bundles with an activator are always imported
+        """
+        self.write_module(BUNDLE_CONTENT.format(spec=SPEC) + ACTIVATOR_CONTENT)
+        framework, _ = self.boot()
+        framework.get_bundle_by_name(MODULE_NAME).start()
+        self.restart()
+
+        _, lazy = self.boot()
+        self.assertListEqual(lazy, [])
+        self.assertIn(MODULE_NAME, sys.modules)
+
+    def testDisabled(self):
+        """
+        Without the framework property, bundles are installed normally
+        """
+        framework = create_framework(("pelix.ipopo.core",))
+        framework.start()
+        bundles, lazy = install_bundles(framework.get_bundle_context(),
+                                        [MODULE_NAME])
+        self.assertListEqual(lazy, [])
+        self.assertEqual(bundles[0].get_symbolic_name(), MODULE_NAME)
+        bundles[0].start()
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
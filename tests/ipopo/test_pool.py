@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Tests the pooled component factories of iPOPO
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.framework import FrameworkFactory
+from pelix.ipopo.constants import use_ipopo, IPOPO_REQUIRES_FILTERS
+from pelix.ipopo.decorators import ComponentFactory, PooledFactory, \
+    Property, Provides, Requires, Temporal, Validate, Invalidate, Bind, Unbind
+from pelix.ipopo.handlers.tracker import get_trackers_count
+from pelix.ipopo.instance import StoredInstance
+
+# Standard library
+import os
+import sys
+import time
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+FACTORY_POOLED = "pool-worker-factory"
+FACTORY_PLAIN = "pool-plain-factory"
+FACTORY_TEMPORAL = "pool-temporal-factory"
+SPEC_DEP = "pool.dependency"
+SPEC_OTHER = "pool.other"
+SPEC_WORKER = "pool.worker"
+
+# ------------------------------------------------------------------------------
+
+
+class Worker(object):
+    """
+    Component logging its life cycle
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self._dep = None
+        self._others = None
+        self._job = None
+        self._controller = True
+        self.states = []
+
+    @Bind
+    def bind(self, svc, svc_ref):
+        """
+        Service bound
+        """
+        self.states.append("bind")
+
+    @Unbind
+    def unbind(self, svc, svc_ref):
+        """
+        Service unbound
+        """
+        self.states.append("unbind")
+
+    @Validate
+    def validate(self, context):
+        """
+        Component validated
+        """
+        self.states.append("validate")
+
+    @Invalidate
+    def invalidate(self, context):
+        """
+        Component invalidated
+        """
+        self.states.append("invalidate")
+
+
+@PooledFactory(FACTORY_POOLED, size=2)
+@Requires("_dep", SPEC_DEP)
+@Requires("_others", SPEC_OTHER, aggregate=True, optional=True)
+@Property("_job", "job", None)
+@Provides(SPEC_WORKER, "_controller")
+class PooledWorker(Worker):
+    """
+    Component of a pooled factory
+    """
+    pass
+
+
+@ComponentFactory(FACTORY_PLAIN)
+@Requires("_dep", SPEC_DEP)
+@Requires("_others", SPEC_OTHER, aggregate=True, optional=True)
+@Property("_job", "job", None)
+@Provides(SPEC_WORKER, "_controller")
+class PlainWorker(Worker):
+    """
+    Same component, without pool
+    """
+    pass
+
+
+@PooledFactory(FACTORY_TEMPORAL)
+@Temporal("_dep", SPEC_DEP, timeout=.1)
+class TemporalWorker(Worker):
+    """
+    Component of a pooled factory with a handler which can't be reset
+    """
+    pass
+
+# ------------------------------------------------------------------------------
+
+
+class PooledFactoryTest(unittest.TestCase):
+    """
+    Tests the recycling of the components of pooled factories
+    """
+    def setUp(self):
+        """
+        Starts a framework with iPOPO
+        """
+        self.framework = FrameworkFactory.get_framework()
+        self.framework.start()
+        self.context = self.framework.get_bundle_context()
+        self.context.install_bundle("pelix.ipopo.core").start()
+
+        with use_ipopo(self.context) as ipopo:
+            self.ipopo = ipopo
+            for factory in (PooledWorker, PlainWorker, TemporalWorker):
+                ipopo.register_factory(self.context, factory)
+
+    def tearDown(self):
+        """
+        Cleans up the framework
+        """
+        self.framework.stop()
+        FrameworkFactory.delete_framework()
+
+    def _state(self, name):
+        """
+        Returns the state of the given component
+        """
+        return self.ipopo.get_instance_details(name)["state"]
+
+    def testDecorator(self):
+        """
+        Tests the pool size argument
+        """
+        for size in (0, -1, None, "2"):
+            self.assertRaises(ValueError, PooledFactory, "factory", size=size)
+
+    def testRecycle(self):
+        """
+        A killed component is reused by the next one
+        """
+        self.context.register_service(SPEC_DEP, object(), {})
+        first = self.ipopo.instantiate(FACTORY_POOLED, "first", {"job": 1})
+        self.assertListEqual(first.states, ["bind", "validate"])
+        first.states.append("marker")
+        first._controller = False
+        self.assertIsNone(
+            self.context.get_service_reference(SPEC_WORKER))
+
+        self.ipopo.kill("first")
+        self.assertFalse(self.ipopo.is_registered_instance("first"))
+
+        # Same instance, reset and manipulated again
+        second = self.ipopo.instantiate(FACTORY_POOLED, "second", {"job": 2})
+        self.assertIs(second, first)
+        self.assertListEqual(second.states, ["bind", "validate"])
+        self.assertEqual(second._job, 2)
+        self.assertEqual(self._state("second"), StoredInstance.VALID)
+
+        # The controller has been reset
+        svc_ref = self.context.get_service_reference(SPEC_WORKER)
+        self.assertEqual(svc_ref.get_property("instance.name"), "second")
+        self.assertEqual(svc_ref.get_property("job"), 2)
+
+        # Property updates reach the new component
+        second._job = 3
+        self.assertEqual(svc_ref.get_property("job"), 3)
+
+        # Dependencies are still tracked
+        self.context.register_service(SPEC_OTHER, object(), {})
+        self.assertListEqual(second.states, ["bind", "validate", "bind"])
+        self.assertEqual(len(second._others), 1)
+
+        # Non-pooled factories create new instances
+        plain = self.ipopo.instantiate(FACTORY_PLAIN, "plain")
+        self.ipopo.kill("plain")
+        self.assertIsNot(self.ipopo.instantiate(FACTORY_PLAIN, "plain"),
+                         plain)
+
+    def testUnbindOnRecycle(self):
+        """
+        A recycled component is unbound from its dependencies
+        """
+        reg = self.context.register_service(SPEC_DEP, object(), {})
+        worker = self.ipopo.instantiate(FACTORY_POOLED, "worker")
+        self.ipopo.kill("worker")
+        self.assertListEqual(worker.states, [])
+        self.assertIsNone(worker._dep)
+
+        # The recycled instance ignores service events
+        reg.unregister()
+        self.assertListEqual(worker.states, [])
+
+        # The new component waits for its dependency
+        other = self.ipopo.instantiate(FACTORY_POOLED, "other")
+        self.assertIs(other, worker)
+        self.assertEqual(self._state("other"), StoredInstance.INVALID)
+        self.context.register_service(SPEC_DEP, object(), {})
+        self.assertListEqual(other.states, ["bind", "validate"])
+
+    def testPoolSize(self):
+        """
+        The pool keeps a limited number of components
+        """
+        self.context.register_service(SPEC_DEP, object(), {})
+        workers = [self.ipopo.instantiate(FACTORY_POOLED,
+                                          "worker-{0}".format(idx))
+                   for idx in range(3)]
+        for idx in range(3):
+            self.ipopo.kill("worker-{0}".format(idx))
+
+        # Only two of them have been kept
+        reused = [self.ipopo.instantiate(FACTORY_POOLED,
+                                         "new-{0}".format(idx))
+                  for idx in range(3)]
+        self.assertListEqual([worker in workers for worker in reused],
+                             [True, True, False])
+        self.assertIs(reused[0], workers[1])
+        self.assertIs(reused[1], workers[0])
+
+    def testRequiresFilter(self):
+        """
+        Components are reused only with the same requirements filters
+        """
+        filters = {IPOPO_REQUIRES_FILTERS: {"_dep": "(answer=42)"}}
+        self.context.register_service(SPEC_DEP, object(), {"answer": 42})
+        worker = self.ipopo.instantiate(FACTORY_POOLED, "filtered", filters)
+        self.ipopo.kill("filtered")
+
+        self.assertIsNot(self.ipopo.instantiate(FACTORY_POOLED, "other"),
+                         worker)
+        self.assertIs(self.ipopo.instantiate(FACTORY_POOLED, "filtered",
+                                             filters), worker)
+
+    def testNotReusable(self):
+        """
+        Components with a handler which can't be reset aren't recycled
+        """
+        worker = self.ipopo.instantiate(FACTORY_TEMPORAL, "temporal")
+        self.ipopo.kill("temporal")
+        self.assertIsNot(self.ipopo.instantiate(FACTORY_TEMPORAL, "temporal"),
+                         worker)
+
+    def testFactoryChange(self):
+        """
+        The pool is dropped when the factory is unregistered
+        """
+        worker = self.ipopo.instantiate(FACTORY_POOLED, "worker")
+        self.ipopo.kill("worker")
+
+        self.ipopo.unregister_factory(FACTORY_POOLED)
+        self.ipopo.register_factory(self.context, PooledWorker)
+        self.assertIsNot(self.ipopo.instantiate(FACTORY_POOLED, "worker"),
+                         worker)
+
+    def testSharedListener(self):
+        """
+        The components of a pooled factory share their service listeners
+        """
+        initial = get_trackers_count()
+        workers = [self.ipopo.instantiate(FACTORY_POOLED,
+                                          "worker-{0}".format(idx))
+                   for idx in range(10)]
+
+        # One tracker per requirement
+        self.assertEqual(get_trackers_count(), initial + 2)
+
+        self.context.register_service(SPEC_DEP, object(), {})
+        self.context.register_services(
+            [(SPEC_OTHER, object(), {}) for _ in range(3)])
+        for idx, worker in enumerate(workers):
+            self.assertListEqual(worker.states,
+                                 ["bind", "validate"] + ["bind"] * 3)
+            self.assertEqual(len(worker._others), 3)
+            self.assertEqual(self._state("worker-{0}".format(idx)),
+                             StoredInstance.VALID)
+
+        for idx in range(10):
+            self.ipopo.kill("worker-{0}".format(idx))
+
+        self.assertEqual(get_trackers_count(), initial)
+
+
+@unittest.skipUnless(os.environ.get("PELIX_BENCHMARK"),
+                     "Set PELIX_BENCHMARK to run the benchmarks")
+class PoolBenchmarkTest(unittest.TestCase):
+    """
+    Creates and kills components in a loop
+    """
+    NB_COMPONENTS = 200
+    """ Number of components alive at the same time """
+
+    NB_LOOPS = 5
+    """ Number of creation/kill loops """
+
+    def setUp(self):
+        """
+        Starts a framework with iPOPO
+        """
+        self.framework = FrameworkFactory.get_framework()
+        self.framework.start()
+        self.context = self.framework.get_bundle_context()
+        self.context.install_bundle("pelix.ipopo.core").start()
+
+        with use_ipopo(self.context) as ipopo:
+            self.ipopo = ipopo
+            ipopo.register_factory(self.context, PooledWorker)
+            ipopo.register_factory(self.context, PlainWorker)
+
+        self.context.register_service(SPEC_DEP, object(), {})
+
+    def tearDown(self):
+        """
+        Cleans up the framework
+        """
+        self.framework.stop()
+        FrameworkFactory.delete_framework()
+
+    def _run(self, factory):
+        """
+        Creates and kills components of the given factory
+
+        :return: The number of components created and killed per second
+        """
+        names = ["worker-{0}".format(idx)
+                 for idx in range(self.NB_COMPONENTS)]
+        start = time.time()
+        for _ in range(self.NB_LOOPS):
+            for name in names:
+                self.ipopo.instantiate(factory, name)
+
+            for name in names:
+                self.ipopo.kill(name)
+        duration = time.time() - start
+
+        self.assertListEqual(self.ipopo.get_instances(), [])
+        return self.NB_COMPONENTS * self.NB_LOOPS / max(duration, 1e-6)
+
+    def testChurn(self):
+        """
+        Components of plain and pooled factories
+        """
+        for factory in (FACTORY_PLAIN, FACTORY_POOLED):
+            sys.stderr.write("\n{0}: {1:.0f} components/s"
+                             .format(factory, self._run(factory)))
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Tests the service listeners shared by the dependency handlers
+
+:author: Thomas Calmant
+"""
+
+# Pelix
+from pelix.framework import FrameworkFactory
+from pelix.internals.events import ServiceEvent
+from pelix.ipopo.constants import use_ipopo, IPOPO_REQUIRES_FILTERS
+from pelix.ipopo.decorators import ComponentFactory, Requires, RequiresMap, \
+    Validate, Invalidate
+from pelix.ipopo.instance import StoredInstance
+import pelix.ipopo.handlers.tracker as tracker
+
+# Standard library
+import threading
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+FACTORY_REQUIRES = "tracker-requires-factory"
+FACTORY_MAP = "tracker-map-factory"
+SPEC = "tracker.spec"
+SPEC_MAP = "tracker.map"
+FACTORY_LAZY_CONSUMER = "tracker-lazy-consumer-factory"
+
+NB_INSTANCES = 100
+
+# ------------------------------------------------------------------------------
+
+
+class Consumer(object):
+    """
+    Component logging its life cycle
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self._svc = None
+        self.states = []
+
+    @Validate
+    def validate(self, context):
+        """
+        Component validated
+        """
+        self.states.append("validate")
+
+    @Invalidate
+    def invalidate(self, context):
+        """
+        Component invalidated
+        """
+        self.states.append("invalidate")
+
+
+@ComponentFactory(FACTORY_REQUIRES)
+@Requires("_svc", SPEC)
+class RequiresConsumer(Consumer):
+    """
+    Component with a simple dependency
+    """
+    pass
+
+
+@ComponentFactory(FACTORY_MAP)
+@RequiresMap("_svc", SPEC_MAP, "name", optional=True)
+class MapConsumer(Consumer):
+    """
+    Component with a dictionary of dependencies
+    """
+    pass
+
+
+@ComponentFactory(FACTORY_LAZY_CONSUMER)
+@Requires("_svc", "ipopo.tests.lazy.service")
+class LazyConsumer(Consumer):
+    """
+    Component whose dependency is provided by a lazy bundle
+    """
+    pass
+
+
+class Handler(object):
+    """
+    Dependency handler mock-up
+    """
+    def __init__(self, fail=False):
+        """
+        :param fail: If True, the handler raises an exception on each event
+        """
+        self.fail = fail
+        self.events = []
+
+    def service_changed(self, event):
+        """
+        Called by the tracker
+        """
+        self.events.append(event.get_kind())
+        if self.fail:
+            raise ValueError("Test error")
+
+# ------------------------------------------------------------------------------
+
+
+class SharedTrackerTest(unittest.TestCase):
+    """
+    Tests the shared trackers registry
+    """
+    def setUp(self):
+        """
+        Starts a framework
+        """
+        self.framework = FrameworkFactory.get_framework()
+        self.framework.start()
+        self.context = self.framework.get_bundle_context()
+
+    def tearDown(self):
+        """
+        Cleans up the framework
+        """
+        self.framework.stop()
+        FrameworkFactory.delete_framework()
+
+    def testSubscription(self):
+        """
+        Handlers with the same requirement share a tracker
+        """
+        initial = tracker.get_trackers_count()
+        handlers = [Handler() for _ in range(3)]
+        trackers = [tracker.subscribe(self.context, handler, SPEC)
+                    for handler in handlers]
+        self.assertEqual(tracker.get_trackers_count(), initial + 1)
+        self.assertIs(trackers[0], trackers[1])
+        self.assertIs(trackers[0], trackers[2])
+        self.assertEqual(len(trackers[0]), 3)
+
+        # Filters are keys of the registry
+        other = Handler()
+        filtered = tracker.subscribe(self.context, other, SPEC, "(answer=42)")
+        self.assertIsNot(filtered, trackers[0])
+        self.assertIs(tracker.subscribe(self.context, other, SPEC,
+                                        "(answer=42)"), filtered)
+        self.assertEqual(len(filtered), 1)
+        other_spec = tracker.subscribe(self.context, other, SPEC_MAP)
+        self.assertIsNot(other_spec, trackers[0])
+        self.assertEqual(tracker.get_trackers_count(), initial + 3)
+
+        # Events are given to all handlers
+        reg = self.context.register_service(SPEC, object(), {})
+        for handler in handlers:
+            self.assertListEqual(handler.events, [ServiceEvent.REGISTERED])
+
+        # The listener is removed with the last handler
+        trackers[0].unsubscribe(handlers[0])
+        trackers[0].unsubscribe(handlers[0])
+        trackers[0].unsubscribe(handlers[1])
+        reg.set_properties({"answer": 0})
+        self.assertListEqual(handlers[0].events, [ServiceEvent.REGISTERED])
+        self.assertListEqual(handlers[2].events, [ServiceEvent.REGISTERED,
+                                                  ServiceEvent.MODIFIED])
+
+        trackers[0].unsubscribe(handlers[2])
+        self.assertEqual(len(trackers[0]), 0)
+        self.assertEqual(tracker.get_trackers_count(), initial + 2)
+        reg.unregister()
+        self.assertEqual(len(handlers[2].events), 2)
+
+        # A new tracker is created for the next subscriber
+        new_tracker = tracker.subscribe(self.context, handlers[0], SPEC)
+        self.assertIsNot(new_tracker, trackers[0])
+
+        for shared in (new_tracker, filtered, other_spec):
+            shared.unsubscribe(handlers[0])
+            shared.unsubscribe(other)
+        self.assertEqual(tracker.get_trackers_count(), initial)
+
+    def testHandlerError(self):
+        """
+        An error in a handler doesn't prevent the others to be notified
+        """
+        handlers = [Handler(True), Handler()]
+        for handler in handlers:
+            shared = tracker.subscribe(self.context, handler, SPEC)
+
+        self.context.register_services([(SPEC, object(), {})
+                                        for _ in range(2)])
+        for handler in handlers:
+            self.assertListEqual(handler.events,
+                                 [ServiceEvent.REGISTERED] * 2)
+            shared.unsubscribe(handler)
+
+
+class SharedDependenciesTest(unittest.TestCase):
+    """
+    Tests the dependency handlers sharing their service listeners
+    """
+    def setUp(self):
+        """
+        Starts a framework with iPOPO
+        """
+        self.framework = FrameworkFactory.get_framework()
+        self.framework.start()
+        self.context = self.framework.get_bundle_context()
+        self.context.install_bundle("pelix.ipopo.core").start()
+
+        with use_ipopo(self.context) as ipopo:
+            self.ipopo = ipopo
+            ipopo.register_factory(self.context, RequiresConsumer)
+            ipopo.register_factory(self.context, MapConsumer)
+
+    def tearDown(self):
+        """
+        Cleans up the framework
+        """
+        self.framework.stop()
+        FrameworkFactory.delete_framework()
+
+    def _state(self, name):
+        """
+        Returns the state of the given component
+        """
+        return self.ipopo.get_instance_details(name)["state"]
+
+    def testRequires(self):
+        """
+        Components with the same requirement share a service listener
+        """
+        initial = tracker.get_trackers_count()
+        names = ["consumer-{0}".format(idx) for idx in range(NB_INSTANCES)]
+        components = [self.ipopo.instantiate(FACTORY_REQUIRES, name)
+                      for name in names]
+        self.assertEqual(tracker.get_trackers_count(), initial + 1)
+
+        # Other filter, other tracker
+        filtered = self.ipopo.instantiate(
+            FACTORY_REQUIRES, "filtered",
+            {IPOPO_REQUIRES_FILTERS: {"_svc": "(answer=42)"}})
+        self.assertEqual(tracker.get_trackers_count(), initial + 2)
+
+        svc = object()
+        reg = self.context.register_service(SPEC, svc, {})
+        for name, component in zip(names, components):
+            self.assertIs(component._svc, svc)
+            self.assertListEqual(component.states, ["validate"])
+            self.assertEqual(self._state(name), StoredInstance.VALID)
+        self.assertListEqual(filtered.states, [])
+
+        reg.unregister()
+        for component in components:
+            self.assertIsNone(component._svc)
+            self.assertListEqual(component.states, ["validate", "invalidate"])
+
+        # Listeners are removed with the last component
+        self.ipopo.kill("filtered")
+        self.assertEqual(tracker.get_trackers_count(), initial + 1)
+        for name in names:
+            self.ipopo.kill(name)
+        self.assertEqual(tracker.get_trackers_count(), initial)
+
+    def testRequiresMap(self):
+        """
+        Dictionaries of dependencies share their service listener too
+        """
+        initial = tracker.get_trackers_count()
+        components = [self.ipopo.instantiate(FACTORY_MAP,
+                                             "map-{0}".format(idx))
+                      for idx in range(NB_INSTANCES)]
+        self.assertEqual(tracker.get_trackers_count(), initial + 1)
+
+        svc = object()
+        self.context.register_service(SPEC_MAP, svc, {"name": "a"})
+        for component in components:
+            self.assertDictEqual(component._svc, {"a": svc})
+
+        for idx in range(NB_INSTANCES):
+            self.ipopo.kill("map-{0}".format(idx))
+        self.assertEqual(tracker.get_trackers_count(), initial)
+
+    def testLazyBundle(self):
+        """
+        A dependency can activate a lazy bundle with its own dependencies
+        """
+        self.context.install_lazy_bundle("tests.ipopo.ipopo_lazy_bundle",
+                                         "ipopo.tests.lazy.service")
+        self.ipopo.register_factory(self.context, LazyConsumer)
+
+        # Instantiate from another thread, as a deadlock would block it
+        components = []
+        thread = threading.Thread(
+            target=lambda: components.append(self.ipopo.instantiate(
+                FACTORY_LAZY_CONSUMER, "lazy-consumer")))
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive(), "Subscription deadlock")
+
+        svc_ref = self.context.get_service_reference(
+            "ipopo.tests.lazy.service")
+        self.assertIsNotNone(svc_ref)
+        self.assertIs(components[0]._svc, self.context.get_service(svc_ref))
+        self.assertListEqual(components[0].states, ["validate"])
+        self.assertEqual(self._state("lazy-provider"), StoredInstance.VALID)
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -- Content-Encoding: UTF-8 --
+"""
+Event handler defined as a coroutine (Python 3.5+ only)
+
+:author: Thomas Calmant
+"""
+
+# Standard library
+import asyncio
+import threading
+
+# ------------------------------------------------------------------------------
+
+__version__ = "1.0.0"
+
+# ------------------------------------------------------------------------------
+
+
+class AsyncEventHandler(object):
+    """
+    Event handler keeping all received events, in a coroutine
+    """
+    def __init__(self, count, fail=False):
+        """
+        :param count: Number of events to wait for
+        :param fail: If True, the coroutine raises an exception
+        """
+        self.events = []
+        self.threads = []
+        self.count = count
+        self.fail = fail
+        self.done = threading.Event()
+
+        # The coroutine waits for this event to be set
+        self.release = threading.Event()
+        self.release.set()
+
+    async def handle_event(self, topic, properties):
+        """
+        Handles an event received from EventAdmin
+        """
+        self.threads.append(threading.current_thread())
+        while not self.release.is_set():
+            await asyncio.sleep(.01)
+
+        self.events.append(properties['index'])
+        if len(self.events) >= self.count:
+            self.done.set()
+
+        if self.fail:
+            raise ValueError("Handler failure")
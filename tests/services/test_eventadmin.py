@@ -8,11 +8,17 @@ Tests the EventAdmin service
 
 # Pelix
 from pelix.ipopo.constants import use_ipopo
+import pelix.constants
 import pelix.framework
 import pelix.services
+import pelix.services.eventadmin as eventadmin
 
 # Standard library
+import copy
+import json
+import logging
 import random
+import sys
 import threading
 import time
 try:
@@ -44,10 +50,15 @@ class DummyEventHandler(object):
         self.change_props = False
         self.sleep = 0
 
+        # Thread of the last notification
+        self.thread = None
+
     def handle_event(self, topic, properties):
         """
         Handles an event received from EventAdmin
         """
+        self.thread = threading.current_thread()
+
         # Add some behavior
         if self.change_props:
             properties['change'] = self.change_props
@@ -77,6 +88,112 @@ class DummyEventHandler(object):
         """
         self.__event.wait(timeout)
 
+
+class QueuedEventHandler(object):
+    """
+    Event handler keeping all received events, which can be blocked
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self.events = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def handle_event(self, topic, properties):
+        """
+        Handles an event received from EventAdmin
+        """
+        self.started.set()
+        self.gate.wait(5)
+        self.events.append(properties['index'])
+
+
+class ForwardingEventHandler(QueuedEventHandler):
+    """
+    Event handler posting the events it receives to another topic
+    """
+    def __init__(self, eventadmin, topic):
+        """
+        Sets up members
+
+        :param eventadmin: The EventAdmin service
+        :param topic: Topic of the forwarded events
+        """
+        super(ForwardingEventHandler, self).__init__()
+        self.eventadmin = eventadmin
+        self.topic = topic
+
+        # Forwarding is synchronized with the peer handler, if any
+        self.peer = None
+        self.forwarding = threading.Event()
+        self.forwarded = threading.Event()
+
+    def handle_event(self, topic, properties):
+        """
+        Handles an event received from EventAdmin
+        """
+        super(ForwardingEventHandler, self).handle_event(topic, properties)
+        if properties.get('forward'):
+            self.forwarding.set()
+            if self.peer is not None:
+                self.peer.forwarding.wait(5)
+            self.eventadmin.post(self.topic, {'index': properties['index']})
+
+            # Keep our queue full until the peer has forwarded its event
+            self.forwarded.set()
+            if self.peer is not None:
+                self.peer.forwarded.wait(5)
+
+
+class BatchEventHandler(object):
+    """
+    Event handler accepting batches of events
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        self.single = []
+        self.batches = []
+        self.event = threading.Event()
+
+    def handle_event(self, topic, properties):
+        """
+        Handles an event received from EventAdmin
+        """
+        self.single.append((topic, properties))
+        self.event.set()
+
+    def handle_events(self, topic, properties_list):
+        """
+        Handles a batch of events received from EventAdmin
+        """
+        self.batches.append((topic, properties_list))
+        self.event.set()
+
+
+class _LogCapture(logging.Handler):
+    """
+    Logging handler keeping the error records
+    """
+    def __init__(self):
+        """
+        Sets up members
+        """
+        logging.Handler.__init__(self, logging.ERROR)
+        self.records = []
+        self.logged = threading.Event()
+
+    def emit(self, record):
+        """
+        Keeps the record
+        """
+        self.records.append(record)
+        self.logged.set()
+
 # ------------------------------------------------------------------------------
 
 
@@ -245,3 +362,536 @@ class EventAdminTest(unittest.TestCase):
             # Check that the handler value has been stored
             self.assertEqual(
                 handler.last_props['change'], handler.change_props)
+
+    def testDeepCopy(self):
+        """
+        Tests the read-only views of the properties values shared by
+        handlers, unless a handler asks for a private copy
+        """
+        handler_1, _ = self._register_handler('/titi/*')
+        handler_2, handler_2_reg = self._register_handler('/titi/*')
+
+        # Values are shared by default, as read-only views
+        evt_props = {'values': [1, [2]], 'map': {'a': {'b': 1}},
+                     'set': set([1])}
+        self.eventadmin.send('/titi/toto', evt_props)
+        props_1 = handler_1.last_props
+        self.assertIsNot(props_1, handler_2.last_props)
+        self.assertIs(props_1['values'], handler_2.last_props['values'])
+        for key in evt_props:
+            self.assertEqual(props_1[key], evt_props[key])
+
+        self.assertRaises(TypeError, props_1['values'].append, 4)
+        self.assertRaises(TypeError, props_1['values'][1].append, 4)
+        self.assertRaises(TypeError, props_1['map']['a'].update, {'c': 2})
+        self.assertRaises(TypeError, props_1['set'].add, 2)
+
+        # Top-level entries and copies can be modified
+        props_1['values'] = copy.copy(props_1['values'])
+        props_1['values'].append(4)
+        new_map = props_1['map'].copy()
+        new_map['c'] = 2
+        self.assertEqual(handler_2.last_props['values'], [1, [2]])
+        self.assertNotIn('c', handler_2.last_props['map'])
+
+        # Changes of the sender don't reach the handlers
+        evt_props['values'].append(5)
+        self.assertEqual(handler_2.last_props['values'], [1, [2]])
+
+        # Views can be serialized and forwarded
+        self.assertEqual(json.loads(json.dumps(handler_2.last_props['map'])),
+                         evt_props['map'])
+        self.eventadmin.send('/titi/tata', handler_2.last_props)
+        self.assertIs(handler_1.last_props['map'],
+                      handler_2.last_props['map'])
+
+        # Ask for a deep copy
+        handler_2_reg.set_properties(
+            {pelix.services.PROP_EVENT_DEEPCOPY: True})
+        self.eventadmin.send('/titi/toto', evt_props)
+        self.assertIsNot(handler_2.last_props['values'],
+                         handler_1.last_props['values'])
+        self.assertEqual(handler_2.last_props['values'], evt_props['values'])
+        handler_2.last_props['values'][1].append(3)
+        handler_2.last_props['map']['a']['b'] = 2
+        self.assertEqual(handler_1.last_props['values'], [1, [2], 5])
+        self.assertEqual(handler_1.last_props['map'], {'a': {'b': 1}})
+
+    def testSendMany(self):
+        """
+        Tests the publication of a batch of events
+        """
+        context = self.framework.get_bundle_context()
+        batch_handler = BatchEventHandler()
+        context.register_service(
+            pelix.services.SERVICE_EVENT_HANDLER, batch_handler,
+            {pelix.services.PROP_EVENT_TOPICS: '/titi/*',
+             pelix.services.PROP_EVENT_FILTER: '(answer>=10)'})
+        handler, _ = self._register_handler('/titi/*')
+        handler.change_props = True
+
+        evt_props = [{'answer': answer} for answer in range(20)]
+        self.eventadmin.send_many('/toto/titi', evt_props)
+        self.assertEqual(handler.pop_event(), None)
+        self.assertListEqual(batch_handler.batches, [])
+
+        self.eventadmin.send_many('/titi/toto', evt_props)
+
+        # Batch handler: a single call with the filtered events
+        self.assertListEqual(batch_handler.single, [])
+        self.assertEqual(len(batch_handler.batches), 1)
+        topic, props_list = batch_handler.batches[0]
+        self.assertEqual(topic, '/titi/toto')
+        self.assertListEqual([props['answer'] for props in props_list],
+                             list(range(10, 20)))
+
+        # All events have the same time stamp
+        self.assertEqual(
+            len(set(props[pelix.services.EVENT_PROP_TIMESTAMP]
+                    for props in props_list)), 1)
+
+        # Other handler: one call per event, the last one being kept
+        self.assertEqual(handler.pop_event(), '/titi/toto')
+        self.assertEqual(handler.last_props['answer'], 19)
+
+        # Each handler gets its own copies, the original ones are untouched
+        self.assertNotIn('change', props_list[-1])
+        for props in evt_props:
+            self.assertListEqual(list(props.keys()), ['answer'])
+
+    def testPostMany(self):
+        """
+        Tests the asynchronous publication of a batch of events
+        """
+        batch_handler = BatchEventHandler()
+        self.framework.get_bundle_context().register_service(
+            pelix.services.SERVICE_EVENT_HANDLER, batch_handler,
+            {pelix.services.PROP_EVENT_TOPICS: '/titi/*'})
+
+        self.eventadmin.post_many('/titi/toto',
+                                  ({'answer': answer} for answer in range(5)))
+        batch_handler.event.wait(5)
+        self.assertEqual(len(batch_handler.batches), 1)
+        self.assertListEqual(
+            [props['answer'] for props in batch_handler.batches[0][1]],
+            list(range(5)))
+
+    def testHandlersUpdate(self):
+        """
+        Tests the update of the known handlers when they are registered,
+        modified and unregistered
+        """
+        topic = '/titi/toto'
+        handler_1, _ = self._register_handler('/titi/*')
+        self.eventadmin.send(topic)
+        self.assertEqual(handler_1.pop_event(), topic)
+
+        # New handler for an already sent topic
+        handler_2, handler_2_reg = self._register_handler(['/toto', topic])
+        self.eventadmin.send(topic)
+        self.assertEqual(handler_1.pop_event(), topic)
+        self.assertEqual(handler_2.pop_event(), topic)
+
+        # Modify the topics and the filter of the handler
+        handler_2_reg.set_properties(
+            {pelix.services.PROP_EVENT_TOPICS: '/toto/*'})
+        self.eventadmin.send(topic)
+        self.assertEqual(handler_1.pop_event(), topic)
+        self.assertEqual(handler_2.pop_event(), None)
+
+        handler_2_reg.set_properties(
+            {pelix.services.PROP_EVENT_FILTER: '(answer=42)'})
+        self.eventadmin.send('/toto/titi', {'answer': 21})
+        self.assertEqual(handler_2.pop_event(), None)
+        self.eventadmin.send('/toto/titi', {'answer': 42})
+        self.assertEqual(handler_2.pop_event(), '/toto/titi')
+
+        # Invalid filter: the handler is ignored
+        handler_2_reg.set_properties(
+            {pelix.services.PROP_EVENT_FILTER: '(answer=42'})
+        self.eventadmin.send('/toto/titi', {'answer': 42})
+        self.assertEqual(handler_2.pop_event(), None)
+
+        # Filter removed
+        handler_2_reg.set_properties(
+            {pelix.services.PROP_EVENT_FILTER: None})
+        self.eventadmin.send('/toto/titi')
+        self.assertEqual(handler_2.pop_event(), '/toto/titi')
+
+        # Unregistered handler
+        handler_2_reg.unregister()
+        self.eventadmin.send('/toto/titi')
+        self.assertEqual(handler_2.pop_event(), None)
+
+
+class EventAdminQueuesTest(unittest.TestCase):
+    """
+    Tests the per-handler delivery of posted events
+    """
+    def setUp(self):
+        """
+        Prepares a framework
+        """
+        self.framework = pelix.framework.create_framework(
+            ('pelix.ipopo.core',
+             'pelix.services.eventadmin'))
+        self.framework.start()
+        self.eventadmin = None
+
+    def tearDown(self):
+        """
+        Cleans up for next test
+        """
+        pelix.framework.FrameworkFactory.delete_framework(self.framework)
+        self.framework = None
+        self.eventadmin = None
+
+    def _instantiate(self, depth=0, overflow=eventadmin.OVERFLOW_BLOCK):
+        """
+        Instantiates EventAdmin in per-handler delivery mode
+        """
+        context = self.framework.get_bundle_context()
+        with use_ipopo(context) as ipopo:
+            self.eventadmin = ipopo.instantiate(
+                pelix.services.FACTORY_EVENT_ADMIN, "evtadmin",
+                {"delivery.mode": eventadmin.DELIVERY_HANDLER,
+                 "queue.depth": depth,
+                 "queue.overflow": overflow})
+
+    def _register_handler(self):
+        """
+        Registers a blockable event handler
+        """
+        svc = QueuedEventHandler()
+        svc_reg = self.framework.get_bundle_context().register_service(
+            pelix.services.SERVICE_EVENT_HANDLER, svc,
+            {pelix.services.PROP_EVENT_TOPICS: '/titi/*'})
+        return svc, svc_reg.get_reference().get_property(
+            pelix.constants.SERVICE_ID)
+
+    def _post(self, indexes):
+        """
+        Posts an event for each given index
+        """
+        for index in indexes:
+            self.eventadmin.post('/titi/toto', {'index': index})
+
+    def _wait_delivered(self, svc_id, count):
+        """
+        Waits for a handler to have received the given number of events
+        """
+        for _ in range(500):
+            stats = self.eventadmin.get_queues_stats()[svc_id]
+            if stats['delivered'] >= count and not stats['depth']:
+                break
+            time.sleep(.01)
+        time.sleep(.05)
+
+    def testOrder(self):
+        """
+        Checks that a handler receives its events in order, while a blocked
+        handler doesn't block the others
+        """
+        self._instantiate()
+        fast, fast_id = self._register_handler()
+        slow, slow_id = self._register_handler()
+        slow.gate.clear()
+
+        self._post(range(100))
+        self._wait_delivered(fast_id, 100)
+        self.assertListEqual(fast.events, list(range(100)))
+        self.assertListEqual(slow.events, [])
+
+        stats = self.eventadmin.get_queues_stats()
+        self.assertEqual(stats[slow_id]['depth'], 99)
+        self.assertGreaterEqual(stats[slow_id]['peak'], 99)
+        self.assertEqual(stats[fast_id]['delivered'], 100)
+
+        # Release the slow handler
+        slow.gate.set()
+        self._wait_delivered(slow_id, 100)
+        self.assertListEqual(slow.events, list(range(100)))
+
+    def testDropNewest(self):
+        """
+        Tests the drop-newest overflow policy
+        """
+        self._instantiate(2, eventadmin.OVERFLOW_DROP_NEWEST)
+        handler, svc_id = self._register_handler()
+        handler.gate.clear()
+
+        # The first event is being handled
+        self._post([0])
+        self.assertTrue(handler.started.wait(5))
+
+        # Fill the queue
+        self._post(range(1, 10))
+        stats = self.eventadmin.get_queues_stats()[svc_id]
+        self.assertEqual(stats['depth'], 2)
+        self.assertEqual(stats['max_depth'], 2)
+        self.assertEqual(stats['dropped'], 7)
+
+        handler.gate.set()
+        self._wait_delivered(svc_id, 3)
+        self.assertListEqual(handler.events, [0, 1, 2])
+
+    def testDropOldest(self):
+        """
+        Tests the drop-oldest overflow policy
+        """
+        self._instantiate(2, eventadmin.OVERFLOW_DROP_OLDEST)
+        handler, svc_id = self._register_handler()
+        handler.gate.clear()
+
+        self._post([0])
+        self.assertTrue(handler.started.wait(5))
+
+        self._post(range(1, 10))
+        stats = self.eventadmin.get_queues_stats()[svc_id]
+        self.assertEqual(stats['depth'], 2)
+        self.assertEqual(stats['dropped'], 7)
+
+        handler.gate.set()
+        self._wait_delivered(svc_id, 3)
+        self.assertListEqual(handler.events, [0, 8, 9])
+
+    def testBlock(self):
+        """
+        Tests the block overflow policy
+        """
+        self._instantiate(1, eventadmin.OVERFLOW_BLOCK)
+        handler, svc_id = self._register_handler()
+        handler.gate.clear()
+
+        self._post([0])
+        self.assertTrue(handler.started.wait(5))
+        self._post([1])
+
+        # The queue is full: the next post must wait
+        thread = threading.Thread(target=self._post, args=([2],))
+        thread.daemon = True
+        thread.start()
+        thread.join(.2)
+        self.assertTrue(thread.is_alive())
+
+        handler.gate.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+        self._wait_delivered(svc_id, 3)
+        self.assertListEqual(handler.events, [0, 1, 2])
+        self.assertEqual(
+            self.eventadmin.get_queues_stats()[svc_id]['dropped'], 0)
+
+    def testBlockBetweenHandlers(self):
+        """
+        Tests the block overflow policy when handlers post events to each
+        other: their events are dropped instead of waiting forever
+        """
+        self._instantiate(1, eventadmin.OVERFLOW_BLOCK)
+        context = self.framework.get_bundle_context()
+        handlers = []
+        for topic, target in (('/a/*', '/b/x'), ('/b/*', '/a/x')):
+            handler = ForwardingEventHandler(self.eventadmin, target)
+            handler.gate.clear()
+            svc_reg = context.register_service(
+                pelix.services.SERVICE_EVENT_HANDLER, handler,
+                {pelix.services.PROP_EVENT_TOPICS: topic})
+            handlers.append((handler, svc_reg.get_reference().get_property(
+                pelix.constants.SERVICE_ID)))
+
+        # Both handlers are busy forwarding their first event, and their
+        # queues are full
+        for topic in ('/a/x', '/b/x'):
+            self.eventadmin.post(topic, {'index': 0, 'forward': True})
+        for handler, _ in handlers:
+            self.assertTrue(handler.started.wait(5))
+        for topic in ('/a/x', '/b/x'):
+            self.eventadmin.post(topic, {'index': 1})
+
+        handlers[0][0].peer = handlers[1][0]
+        handlers[1][0].peer = handlers[0][0]
+
+        for handler, _ in handlers:
+            handler.gate.set()
+
+        for handler, svc_id in handlers:
+            self._wait_delivered(svc_id, 2)
+            self.assertListEqual(handler.events, [0, 1])
+            self.assertEqual(
+                self.eventadmin.get_queues_stats()[svc_id]['dropped'], 1)
+
+    def testPostMany(self):
+        """
+        Tests the publication of a batch of events through the queues
+        """
+        self._instantiate(2, eventadmin.OVERFLOW_BLOCK)
+        handler, svc_id = self._register_handler()
+        self.eventadmin.post_many(
+            '/titi/toto', ({'index': index} for index in range(10)))
+        self._wait_delivered(svc_id, 10)
+        self.assertListEqual(handler.events, list(range(10)))
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "Coroutines need Python 3.5+")
+class EventAdminLoopTest(unittest.TestCase):
+    """
+    Tests the coroutine event handlers, executed on the framework event loop
+    """
+    def setUp(self):
+        """
+        Starts an event loop in a thread and a framework using it
+        """
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever)
+        self.loop_thread.daemon = True
+        self.loop_thread.start()
+
+        self.framework = pelix.framework.create_framework(
+            ('pelix.ipopo.core', 'pelix.services.eventadmin'),
+            {pelix.constants.FRAMEWORK_EVENT_LOOP: self.loop})
+        self.framework.start()
+
+        context = self.framework.get_bundle_context()
+        with use_ipopo(context) as ipopo:
+            self.eventadmin = ipopo.instantiate(
+                pelix.services.FACTORY_EVENT_ADMIN, "evtadmin",
+                {"delivery.mode": eventadmin.DELIVERY_HANDLER})
+
+    def tearDown(self):
+        """
+        Cleans up for next test
+        """
+        pelix.framework.FrameworkFactory.delete_framework(self.framework)
+        self.framework = None
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join(5)
+        self.loop.close()
+
+    def testPost(self):
+        """
+        Checks that coroutine handlers are executed by the loop, while the
+        other ones are notified by the thread pool
+        """
+        from tests.services.eventadmin_async_handler import AsyncEventHandler
+
+        handler = QueuedEventHandler()
+        context = self.framework.get_bundle_context()
+        context.register_service(
+            pelix.services.SERVICE_EVENT_HANDLER, handler,
+            {pelix.services.PROP_EVENT_TOPICS: '/titi/*'})
+        notified = DummyEventHandler()
+        context.register_service(
+            pelix.services.SERVICE_EVENT_HANDLER, notified,
+            {pelix.services.PROP_EVENT_TOPICS: '/titi/*'})
+        async_handler = AsyncEventHandler(100)
+        context.register_service(
+            pelix.services.SERVICE_EVENT_HANDLER, async_handler,
+            {pelix.services.PROP_EVENT_TOPICS: '/titi/*'})
+
+        for index in range(50):
+            self.eventadmin.post('/titi/toto', {'index': index})
+        self.eventadmin.post_many(
+            '/titi/toto', ({'index': index} for index in range(50, 100)))
+
+        # Wait for the handlers
+        self.assertTrue(async_handler.done.wait(5))
+        self.assertTrue(self.eventadmin._pool.join(5))
+
+        # Each handler gets its events in order
+        self.assertListEqual(handler.events, list(range(100)))
+        self.assertListEqual(async_handler.events, list(range(100)))
+
+        # Only the coroutines are executed by the loop
+        self.assertListEqual(async_handler.threads, [self.loop_thread] * 100)
+        self.assertIsNot(notified.thread, self.loop_thread)
+        self.assertIsNot(notified.thread, threading.current_thread())
+
+        # Synchronous events are still delivered in the calling thread, and
+        # the coroutines are executed by the loop
+        async_handler.count = 101
+        async_handler.done.clear()
+        self.eventadmin.send('/titi/toto', {'index': 100})
+        self.assertIs(notified.thread, threading.current_thread())
+        self.assertTrue(async_handler.done.wait(5))
+        self.assertListEqual(async_handler.events, list(range(101)))
+
+    def testNoWait(self):
+        """
+        Checks that no thread waits for the coroutine handlers
+        """
+        from tests.services.eventadmin_async_handler import AsyncEventHandler
+
+        context = self.framework.get_bundle_context()
+        async_handler = AsyncEventHandler(2)
+        async_handler.release.clear()
+        context.register_service(
+            pelix.services.SERVICE_EVENT_HANDLER, async_handler,
+            {pelix.services.PROP_EVENT_TOPICS: '/titi/*'})
+
+        # The event is sent while the coroutine of the posted one is pending
+        self.eventadmin.post('/titi/toto', {'index': 0})
+        self.assertTrue(self.eventadmin._pool.join(5))
+        self.eventadmin.send('/titi/toto', {'index': 1})
+        self.assertListEqual(async_handler.events, [])
+        self.assertEqual(len(async_handler.threads), 2)
+
+        async_handler.release.set()
+        self.assertTrue(async_handler.done.wait(5))
+        self.assertListEqual(async_handler.events, [0, 1])
+
+    def testCoroutineError(self):
+        """
+        Checks that the errors of the coroutine handlers are logged
+        """
+        from tests.services.eventadmin_async_handler import AsyncEventHandler
+
+        context = self.framework.get_bundle_context()
+        async_handler = AsyncEventHandler(1, True)
+        context.register_service(
+            pelix.services.SERVICE_EVENT_HANDLER, async_handler,
+            {pelix.services.PROP_EVENT_TOPICS: '/titi/*'})
+
+        capture = _LogCapture()
+        logger = logging.getLogger(eventadmin.__name__)
+        logger.addHandler(capture)
+        try:
+            self.eventadmin.send('/titi/toto', {'index': 0})
+            self.assertTrue(capture.logged.wait(5))
+        finally:
+            logger.removeHandler(capture)
+
+        self.assertEqual(capture.records[0].exc_info[0], ValueError)
+
+    def testSendInLoop(self):
+        """
+        Checks that synchronous events sent from the loop schedule the
+        coroutine handlers
+        """
+        from tests.services.eventadmin_async_handler import AsyncEventHandler
+
+        context = self.framework.get_bundle_context()
+        notified = DummyEventHandler()
+        context.register_service(
+            pelix.services.SERVICE_EVENT_HANDLER, notified,
+            {pelix.services.PROP_EVENT_TOPICS: '/titi/*'})
+        async_handler = AsyncEventHandler(1)
+        context.register_service(
+            pelix.services.SERVICE_EVENT_HANDLER, async_handler,
+            {pelix.services.PROP_EVENT_TOPICS: '/titi/*'})
+
+        done = threading.Event()
+
+        def send():
+            self.eventadmin.send('/titi/toto', {'index': 0})
+            done.set()
+
+        self.loop.call_soon_threadsafe(send)
+        self.assertTrue(done.wait(5))
+
+        # The synchronous handler is notified, the coroutine is scheduled
+        self.assertIs(notified.thread, self.loop_thread)
+        self.assertTrue(async_handler.done.wait(5))
+        self.assertListEqual(async_handler.threads, [self.loop_thread])
@@ -10,6 +10,9 @@ from pelix.ldapfilter import get_ldap_filter
 import pelix.ldapfilter
 
 import inspect
+import os
+import sys
+import time
 
 try:
     import unittest2 as unittest
@@ -41,18 +44,25 @@ def applyTest(self, filters, key):
         ldap_filter = get_ldap_filter(filter_str)
         self.assertIsNotNone(ldap_filter, "{0} is a valid filter"
                              .format(filter_str))
+        matcher = ldap_filter.compile()
 
         for good in tests[0]:
             props[key] = good
             self.assertTrue(ldap_filter.matches(props),
                             "Filter '{0}' should match {1}"
                             .format(ldap_filter, props))
+            self.assertTrue(matcher(props),
+                            "Compiled filter '{0}' should match {1}"
+                            .format(ldap_filter, props))
 
         for bad in tests[1]:
             props[key] = bad
             self.assertFalse(ldap_filter.matches(props),
                              "Filter '{0}' should not match {1}"
                              .format(ldap_filter, props))
+            self.assertFalse(matcher(props),
+                             "Compiled filter '{0}' should not match {1}"
+                             .format(ldap_filter, props))
 
 # ------------------------------------------------------------------------------
 
@@ -838,5 +848,197 @@ class LDAPFilterTest(unittest.TestCase):
 
 # ------------------------------------------------------------------------------
 
+
+class LDAPCacheTest(unittest.TestCase):
+    """
+    Tests the cache of parsed filters
+    """
+    def setUp(self):
+        """
+        Starts each test with an empty cache
+        """
+        pelix.ldapfilter.clear_cache()
+
+    def testSharedFilters(self):
+        """
+        Tests that parsing the same string twice returns the same object
+        """
+        str_filter = "(&(test=True)(test2=False))"
+        ldap_filter = get_ldap_filter(str_filter)
+        self.assertIs(get_ldap_filter(str_filter), ldap_filter)
+
+        stats = pelix.ldapfilter.get_cache_stats()
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['evictions'], 0)
+
+        # Empty filters are cached too
+        self.assertIsNone(get_ldap_filter(" "))
+        self.assertIsNone(get_ldap_filter(" "))
+        self.assertEqual(pelix.ldapfilter.get_cache_stats()['hits'], 2)
+
+        # Invalid filters are not cached
+        for _ in range(2):
+            self.assertRaises(ValueError, get_ldap_filter, "(test=")
+        self.assertEqual(pelix.ldapfilter.get_cache_stats()['size'], 2)
+
+        # Clean up
+        pelix.ldapfilter.clear_cache()
+        stats = pelix.ldapfilter.get_cache_stats()
+        self.assertEqual(stats['size'], 0)
+        self.assertEqual(stats['hits'], 0)
+        self.assertIsNot(get_ldap_filter(str_filter), ldap_filter)
+
+    def testEviction(self):
+        """
+        Tests the eviction of the least recently used filters
+        """
+        cache = pelix.ldapfilter._FilterCache(2)
+        filter_a = cache.get("(a=1)")
+        filter_b = cache.get("(b=1)")
+
+        # Use "a" again: "b" becomes the least recently used filter
+        self.assertIs(cache.get("(a=1)"), filter_a)
+        cache.get("(c=1)")
+
+        stats = cache.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['max_size'], 2)
+        self.assertEqual(stats['evictions'], 1)
+
+        self.assertIs(cache.get("(a=1)"), filter_a)
+        self.assertIsNot(cache.get("(b=1)"), filter_b)
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+    def testNormalizeShared(self):
+        """
+        Tests that combining and normalizing filters doesn't modify the
+        cached ones
+        """
+        str_filter = "(&(a=1)(b=2))"
+        ldap_filter = get_ldap_filter(str_filter)
+        subfilters = ldap_filter.subfilters
+        matcher = ldap_filter.compile()
+
+        combined = pelix.ldapfilter.combine_filters(
+            [ldap_filter, "(c=3)", str_filter])
+        self.assertEqual(str(combined), "(&(&(a=1)(b=2))(c=3))")
+        self.assertIs(ldap_filter.normalize(), ldap_filter)
+        self.assertIs(ldap_filter.subfilters, subfilters)
+        self.assertIs(ldap_filter.compile(), matcher)
+        self.assertEqual(str(get_ldap_filter(str_filter)), str_filter)
+
+        # Filters to normalize are copied
+        criteria = get_ldap_filter("(a=1)")
+        ldap_filter = pelix.ldapfilter.LDAPFilter(pelix.ldapfilter.OR)
+        for sub_filter in (criteria, criteria, get_ldap_filter("(b=2)")):
+            ldap_filter.append(sub_filter)
+
+        normalized = ldap_filter.normalize()
+        self.assertEqual(str(normalized), "(|(a=1)(b=2))")
+        self.assertEqual(len(ldap_filter.subfilters), 3)
+        self.assertIsNot(normalized, ldap_filter)
+
+# ------------------------------------------------------------------------------
+
+
+class LDAPCompileTest(unittest.TestCase):
+    """
+    Tests the compiled form of filters
+    """
+    FILTERS = ("(a=1)", "(a=*)", "(a=1*)", "(a=*1)", "(a=*b*c*)",
+               "(a~=aBc)", "(a~=*b*)", "(a<10)", "(a<=10)", "(a>1.5)",
+               "(a>=abc)", "(!(a=1))", "(&(a>=1)(b<=5))", "(|(a=1)(b=*2))",
+               "(&(a=*)(!(|(b=1)(b=2))))")
+    """ Tested filters """
+
+    VALUES = (None, True, False, 0, 1, 10, 11, -1, 1.5, 10.0, 2 + 1j,
+              "", "1", "10", "abc", "ABC", "b", "bc", "b2", "1b", "x1",
+              "xbyc", [], ["1"], ["2", "abc"], (1, "b"), set(["b2"]))
+    """ Tested values """
+
+    def testEquivalence(self):
+        """
+        Tests that the compiled filters behave like the filters trees
+        """
+        for str_filter in self.FILTERS:
+            ldap_filter = get_ldap_filter(str_filter)
+            matcher = ldap_filter.compile()
+            self.assertIs(ldap_filter.compile(), matcher,
+                          "Compiled filter should be kept")
+
+            # Missing properties
+            self.assertEqual(matcher({}), ldap_filter.matches({}))
+
+            for value_a in self.VALUES:
+                for value_b in self.VALUES:
+                    props = {"a": value_a, "b": value_b}
+                    self.assertEqual(bool(matcher(props)),
+                                     bool(ldap_filter.matches(props)),
+                                     "Different results for {0} with {1}"
+                                     .format(str_filter, props))
+
+    def testModification(self):
+        """
+        Tests that the compiled filter follows the modifications of the filter
+        """
+        ldap_filter = pelix.ldapfilter.LDAPFilter(pelix.ldapfilter.OR)
+        matcher = ldap_filter.compile()
+        self.assertFalse(matcher({"a": "1"}))
+
+        ldap_filter.append(get_ldap_filter("(a=1)"))
+        matcher = ldap_filter.compile()
+        self.assertTrue(matcher({"a": "1"}))
+        self.assertFalse(matcher({"a": "2"}))
+
+    def _sample(self):
+        """
+        Returns a filter like the ones of iPOPO requirements, and a list of
+        service properties
+
+        :return: A (filter, list of properties) tuple
+        """
+        ldap_filter = get_ldap_filter(
+            "(&(objectClass=sample.spec)(|(instance.name=*-worker)"
+            "(service.ranking>=10))(!(service.exported.configs=*)))")
+        properties = [{"objectClass": ["other.spec", "sample.spec"],
+                       "instance.name": "component-{0}".format(idx),
+                       "service.ranking": idx % 20,
+                       "service.id": idx}
+                      for idx in range(500)]
+        return ldap_filter, properties
+
+    def testSample(self):
+        """
+        Tests that the compiled filter selects the same services as the tree
+        """
+        ldap_filter, properties = self._sample()
+        matcher = ldap_filter.compile()
+        matching = [props for props in properties if matcher(props)]
+        self.assertListEqual(
+            matching, [props for props in properties
+                       if ldap_filter.matches(props)])
+        self.assertEqual(len(matching), 250)
+
+    @unittest.skipUnless(os.environ.get("PELIX_BENCHMARK"),
+                         "Set PELIX_BENCHMARK to run the benchmarks")
+    def testBenchmark(self):
+        """
+        Compares the speed of the filter tree and of the compiled filter
+        """
+        ldap_filter, properties = self._sample()
+        matcher = ldap_filter.compile()
+        for name, method in (("tree", ldap_filter.matches),
+                             ("compiled", matcher)):
+            start = time.time()
+            for _ in range(10):
+                for props in properties:
+                    method(props)
+            sys.stderr.write("\n{0} filter: {1:.3f}s"
+                             .format(name, time.time() - start))
+
+# ------------------------------------------------------------------------------
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,249 @@
+#!/usr/bin/python
+# -- Content-Encoding: UTF-8 --
+"""
+Pelix FutureResult interoperability tests
+
+:license: Apache License 2.0
+"""
+
+# ------------------------------------------------------------------------------
+
+# Tested module
+import pelix.threadpool as threadpool
+
+# Standard library
+import threading
+import time
+
+try:
+    # Python 3, or Python 2 with the "futures" back-port
+    import concurrent.futures
+except ImportError:
+    concurrent = None
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+# Tests
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+
+def _raise_call():
+    """
+    Method that raises a ValueError exception
+    """
+    raise ValueError("Buggy method")
+
+# ------------------------------------------------------------------------------
+
+
+class FutureResultTest(unittest.TestCase):
+    """
+    Tests the callbacks and the chaining of FutureResult
+    """
+    def testDoneCallbacks(self):
+        """
+        Tests the done callbacks
+        """
+        future = threadpool.FutureResult()
+        results = []
+        future.add_done_callback(results.append)
+        future.add_done_callback(lambda _: _raise_call())
+        future.add_done_callback(lambda fut: results.append(fut.result()))
+        self.assertListEqual(results, [])
+
+        future.execute(lambda: 42, None, None)
+        self.assertListEqual(results, [future, 42])
+
+        # Already done: immediate call
+        future.add_done_callback(results.append)
+        self.assertListEqual(results, [future, 42, future])
+
+    def testThen(self):
+        """
+        Tests the chaining of futures
+        """
+        future = threadpool.FutureResult()
+        chained = future.then(lambda result: result * 2) \
+            .then(lambda result: result + 1)
+        self.assertFalse(chained.done())
+
+        future.execute(lambda: 20, None, None)
+        self.assertTrue(chained.done())
+        self.assertEqual(chained.result(), 41)
+
+        # Chaining after the end of the job
+        self.assertEqual(future.then(str).result(0), "20")
+
+        # Errors are propagated
+        future = threadpool.FutureResult()
+        chained = future.then(lambda result: result * 2)
+        self.assertRaises(ValueError, future.execute, _raise_call, None, None)
+        self.assertRaises(ValueError, chained.result, 0)
+        self.assertIsInstance(chained.exception(), ValueError)
+
+        # ... including the ones raised by the chained method
+        future = threadpool.FutureResult()
+        chained = future.then(lambda result: _raise_call())
+        future.execute(lambda: 20, None, None)
+        self.assertRaises(ValueError, chained.result, 0)
+
+    def testException(self):
+        """
+        Tests the exception() method
+        """
+        future = threadpool.FutureResult()
+        self.assertRaises(OSError, future.exception, .01)
+
+        future.set_result(42)
+        self.assertIsNone(future.exception())
+
+        future = threadpool.FutureResult()
+        future.set_exception(KeyError("abc"))
+        self.assertIsInstance(future.exception(), KeyError)
+
+
+class FutureWaitTest(unittest.TestCase):
+    """
+    Tests wait_all() and wait_any()
+    """
+    def setUp(self):
+        """
+        Sets up the test
+        """
+        self.pool = threadpool.ThreadPool(5)
+        self.pool.start()
+
+    def tearDown(self):
+        """
+        Cleans up the test
+        """
+        self.pool.stop()
+
+    def testWaitAll(self):
+        """
+        Tests wait_all()
+        """
+        futures = [self.pool.enqueue(time.sleep, delay)
+                   for delay in (.01, .05, .1)]
+        done, pending = threadpool.wait_all(futures, 5)
+        self.assertSetEqual(done, set(futures))
+        self.assertSetEqual(pending, set())
+
+        # Timeout
+        gate = threading.Event()
+        blocked = self.pool.enqueue(gate.wait, 5)
+        done, pending = threadpool.wait_all(futures + [blocked], .1)
+        self.assertSetEqual(done, set(futures))
+        self.assertSetEqual(pending, set([blocked]))
+        gate.set()
+
+        # Nothing to wait for
+        self.assertEqual(threadpool.wait_all([]), (set(), set()))
+
+    def testWaitAny(self):
+        """
+        Tests wait_any()
+        """
+        gate = threading.Event()
+        blocked = self.pool.enqueue(gate.wait, 5)
+        fast = self.pool.enqueue(int)
+        done, pending = threadpool.wait_any([blocked, fast], 5)
+        self.assertSetEqual(done, set([fast]))
+        self.assertSetEqual(pending, set([blocked]))
+
+        gate.set()
+        done, pending = threadpool.wait_any([blocked], 5)
+        self.assertSetEqual(done, set([blocked]))
+
+
+@unittest.skipIf(concurrent is None, "concurrent.futures is not available")
+class FutureInteropTest(unittest.TestCase):
+    """
+    Tests the interoperability with concurrent.futures and asyncio
+    """
+    def setUp(self):
+        """
+        Sets up the test
+        """
+        self.pool = threadpool.ThreadPool(2)
+        self.pool.start()
+
+    def tearDown(self):
+        """
+        Cleans up the test
+        """
+        self.pool.stop()
+
+    def testConcurrentWait(self):
+        """
+        Tests concurrent.futures.wait()
+        """
+        futures = [self.pool.enqueue(time.sleep, .05),
+                   self.pool.enqueue(_raise_call)]
+        done, pending = concurrent.futures.wait(futures, 5)
+        self.assertSetEqual(done, set(futures))
+        self.assertFalse(pending)
+        self.assertIsNone(futures[0].result())
+        self.assertIsInstance(futures[1].exception(), ValueError)
+
+    def testCancel(self):
+        """
+        Tests the cancellation of a pending task
+        """
+        gate = threading.Event()
+        blocked = self.pool.enqueue(gate.wait, 5)
+        self.pool.enqueue(gate.wait, 5)
+        results = []
+        future = self.pool.enqueue(results.append, 42)
+        for _ in range(100):
+            if blocked.running():
+                break
+            time.sleep(.01)
+
+        callbacks = []
+        future.add_done_callback(callbacks.append)
+
+        self.assertTrue(future.cancel())
+        self.assertTrue(future.cancelled())
+        self.assertTrue(future.done())
+        self.assertListEqual(callbacks, [future])
+        self.assertRaises(concurrent.futures.CancelledError, future.result)
+
+        # Running jobs can't be cancelled
+        self.assertFalse(blocked.cancel())
+        gate.set()
+        self.assertTrue(self.pool.join(5))
+        self.assertListEqual(results, [])
+
+    @unittest.skipIf(asyncio is None, "asyncio is not available")
+    def testAsyncio(self):
+        """
+        Tests asyncio.wrap_future()
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            futures = [asyncio.wrap_future(self.pool.enqueue(str, idx),
+                                           loop=loop)
+                       for idx in range(5)]
+            results = loop.run_until_complete(
+                asyncio.gather(*futures))
+            self.assertListEqual(results, [str(idx) for idx in range(5)])
+        finally:
+            loop.close()
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
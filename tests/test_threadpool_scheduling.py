@@ -0,0 +1,124 @@
+#!/usr/bin/python
+# -- Content-Encoding: UTF-8 --
+"""
+Pelix thread pool priorities and deadlines tests
+
+:license: Apache License 2.0
+"""
+
+# ------------------------------------------------------------------------------
+
+# Tested module
+import pelix.threadpool as threadpool
+
+# Standard library
+import threading
+
+# Tests
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+
+class ThreadPoolSchedulingTest(unittest.TestCase):
+    """
+    Tests the priorities and deadlines of tasks
+    """
+    def setUp(self):
+        """
+        Sets up a single-thread pool, blocked until the gate is opened
+        """
+        self.pool = threadpool.ThreadPool(1)
+        self.pool.start()
+
+        self.gate = threading.Event()
+        self.pool.enqueue(self.gate.wait, 5)
+
+    def tearDown(self):
+        """
+        Cleans up the test
+        """
+        self.gate.set()
+        self.pool.stop()
+
+    def testPriority(self):
+        """
+        Checks the execution order of tasks with different priorities
+        """
+        results = []
+        for idx, priority in enumerate((threadpool.PRIORITY_LOW,
+                                        threadpool.PRIORITY_NORMAL,
+                                        threadpool.PRIORITY_HIGH,
+                                        threadpool.PRIORITY_NORMAL,
+                                        threadpool.PRIORITY_HIGH)):
+            self.pool.enqueue_with(results.append, (idx,), priority=priority)
+
+        # Default priority is the normal one
+        self.pool.enqueue(results.append, 5)
+
+        self.gate.set()
+        self.assertTrue(self.pool.join(5))
+        self.assertListEqual(results, [2, 4, 1, 3, 5, 0])
+
+    def testDeadline(self):
+        """
+        Checks that tasks are not executed after their deadline
+        """
+        results = []
+        callback_exceptions = []
+
+        expired = self.pool.enqueue_with(results.append, (1,), deadline=.05)
+        expired.set_callback(
+            lambda result, exception, extra:
+            callback_exceptions.append(exception))
+        valid = self.pool.enqueue_with(results.append, (2,), deadline=10)
+
+        # Let the deadline of the first task expire
+        self.gate.wait(.2)
+        self.gate.set()
+
+        self.assertRaises(threadpool.DeadlineError, expired.result, 5)
+        self.assertIsNone(valid.result(5))
+        self.assertListEqual(results, [2])
+        self.assertEqual(len(callback_exceptions), 1)
+        self.assertIsInstance(callback_exceptions[0], threadpool.DeadlineError)
+
+    def testStats(self):
+        """
+        Checks the wait statistics by priority
+        """
+        self.pool.enqueue_with(int, priority=threadpool.PRIORITY_HIGH)
+        self.pool.enqueue_with(int, priority=threadpool.PRIORITY_LOW,
+                               deadline=.05)
+        self.pool.enqueue_with(int, priority=threadpool.PRIORITY_LOW)
+
+        self.gate.wait(.2)
+        self.gate.set()
+        self.assertTrue(self.pool.join(5))
+
+        stats = self.pool.get_stats()
+        self.assertEqual(stats[threadpool.PRIORITY_NORMAL]['tasks'], 1)
+        self.assertEqual(stats[threadpool.PRIORITY_HIGH]['tasks'], 1)
+        self.assertEqual(stats[threadpool.PRIORITY_HIGH]['expired'], 0)
+        self.assertEqual(stats[threadpool.PRIORITY_LOW]['tasks'], 2)
+        self.assertEqual(stats[threadpool.PRIORITY_LOW]['expired'], 1)
+
+        low_stats = stats[threadpool.PRIORITY_LOW]
+        self.assertGreaterEqual(low_stats['max_wait'], .2)
+        self.assertLessEqual(low_stats['mean_wait'], low_stats['max_wait'])
+
+        # Statistics are kept when the threads stop
+        self.pool.stop()
+        self.assertDictEqual(self.pool.get_stats(), stats)
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()
@@ -0,0 +1,335 @@
+#!/usr/bin/python
+# -- Content-Encoding: UTF-8 --
+"""
+Pelix thread pool throughput, threads and work stealing tests
+
+:license: Apache License 2.0
+"""
+
+# ------------------------------------------------------------------------------
+
+# Tested module
+import pelix.threadpool as threadpool
+
+# Standard library
+import os
+import sys
+import threading
+import time
+
+# Tests
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+# ------------------------------------------------------------------------------
+
+NB_TASKS = 20000
+""" Number of tasks enqueued in the benchmarks """
+
+
+def _count_call(counter, lock):
+    """
+    Increments the counter (a list with one integer)
+    """
+    with lock:
+        counter[0] += 1
+
+
+def _fan_out_call(pool, counter, lock, depth):
+    """
+    Enqueues two sub-tasks until depth reaches 0, then counts the call
+    """
+    if depth > 0:
+        pool.enqueue(_fan_out_call, pool, counter, lock, depth - 1)
+        pool.enqueue(_fan_out_call, pool, counter, lock, depth - 1)
+    else:
+        _count_call(counter, lock)
+
+# ------------------------------------------------------------------------------
+
+
+@unittest.skipUnless(os.environ.get("PELIX_BENCHMARK"),
+                     "Set PELIX_BENCHMARK to run the benchmarks")
+class ThreadPoolThroughputTest(unittest.TestCase):
+    """
+    Measures the throughput of the thread pool
+    """
+    def setUp(self):
+        """
+        Sets up the test
+        """
+        self.pool = None
+
+    def tearDown(self):
+        """
+        Cleans up the test
+        """
+        if self.pool is not None:
+            self.pool.stop()
+
+    def _run_flat(self, work_stealing):
+        """
+        Enqueues NB_TASKS tasks from the main thread
+
+        :return: The number of tasks executed per second
+        """
+        self.pool = threadpool.ThreadPool(8, work_stealing=work_stealing)
+        self.pool.start()
+
+        counter = [0]
+        lock = threading.Lock()
+        start = time.time()
+        for _ in range(NB_TASKS):
+            self.pool.enqueue(_count_call, counter, lock)
+        self.assertTrue(self.pool.join(30))
+        duration = time.time() - start
+
+        self.assertEqual(counter[0], NB_TASKS)
+        self.pool.stop()
+        self.pool = None
+        return NB_TASKS / max(duration, 1e-6)
+
+    def _run_fan_out(self, work_stealing):
+        """
+        Enqueues a tree of tasks, each one enqueuing its children
+
+        :return: The number of tasks executed per second
+        """
+        depth = 13
+        self.pool = threadpool.ThreadPool(8, work_stealing=work_stealing)
+        self.pool.start()
+
+        counter = [0]
+        lock = threading.Lock()
+        start = time.time()
+        self.pool.enqueue(_fan_out_call, self.pool, counter, lock, depth)
+
+        # Wait for the leaves to be counted
+        deadline = start + 30
+        while counter[0] < 2 ** depth and time.time() < deadline:
+            time.sleep(.01)
+        duration = time.time() - start
+
+        self.assertEqual(counter[0], 2 ** depth)
+        self.pool.stop()
+        self.pool = None
+        return (2 ** (depth + 1) - 1) / max(duration, 1e-6)
+
+    def testFlatThroughput(self):
+        """
+        Tasks enqueued by a single producer
+        """
+        for work_stealing in (False, True):
+            sys.stderr.write("\nflat, work stealing={0}: {1:.0f} tasks/s"
+                             .format(work_stealing,
+                                     self._run_flat(work_stealing)))
+
+    def testFanOutThroughput(self):
+        """
+        Tasks enqueued by the worker threads
+        """
+        for work_stealing in (False, True):
+            sys.stderr.write("\nfan-out, work stealing={0}: {1:.0f} tasks/s"
+                             .format(work_stealing,
+                                     self._run_fan_out(work_stealing)))
+
+
+class ThreadPoolThreadsTest(unittest.TestCase):
+    """
+    Tests the start and stop of the threads of the pool
+    """
+    def setUp(self):
+        """
+        Sets up the test
+        """
+        self.pool = None
+
+    def tearDown(self):
+        """
+        Cleans up the test
+        """
+        if self.pool is not None:
+            self.pool.stop()
+
+    def testQueuedTaskOnThreadStop(self):
+        """
+        Checks that a thread above the minimum doesn't stop while tasks are
+        still queued
+        """
+        self.pool = threadpool.ThreadPool(1, min_threads=0)
+        self.pool.start()
+
+        gate = threading.Event()
+        self.pool.enqueue(gate.wait, 5)
+        future = self.pool.enqueue(lambda: True)
+        gate.set()
+        self.assertTrue(future.result(2))
+
+    def testEnqueueWhileTakingTask(self):
+        """
+        Checks that a thread is started for a task enqueued while the idle
+        thread was taking another one
+        """
+        self.pool = threadpool.ThreadPool(2, min_threads=1)
+        self.pool.start()
+
+        # Let the thread become idle
+        self.pool.enqueue(lambda: None).result(1)
+        time.sleep(.1)
+
+        # Both tasks are enqueued while the thread is seen as idle
+        event = threading.Event()
+        future = self.pool.enqueue(event.wait, 2)
+        self.pool.enqueue(event.set)
+        self.assertTrue(future.result(3))
+
+    def testStopFromTask(self):
+        """
+        Checks that a task can stop its own pool
+        """
+        self.pool = threadpool.ThreadPool(1)
+        self.pool.start()
+
+        gate = threading.Event()
+        self.pool.enqueue(gate.wait, 5)
+        stopping = self.pool.enqueue(self.pool.stop)
+        dropped = self.pool.enqueue(lambda: True)
+        gate.set()
+
+        stopping.result(5)
+        self.assertFalse(dropped.done())
+
+
+class ThreadPoolWorkStealingTest(unittest.TestCase):
+    """
+    Tests the per-worker deques of the thread pool
+    """
+    def setUp(self):
+        """
+        Sets up the test
+        """
+        self.pool = threadpool.ThreadPool(2, work_stealing=True)
+        self.pool.start()
+
+    def tearDown(self):
+        """
+        Cleans up the test
+        """
+        self.pool.stop()
+
+    def testStealing(self):
+        """
+        Checks that the task stored in the deque of a busy worker is executed
+        by another worker
+        """
+        gate = threading.Event()
+        threads = []
+
+        def blocking_task():
+            threads.append(threading.current_thread())
+            # All threads are busy: the task is kept in our deque
+            future = self.pool.enqueue(
+                lambda: threads.append(threading.current_thread()))
+            # ... and is stolen by the other worker
+            future.result(5)
+            gate.set()
+
+        # Keep the other thread busy until the first task is enqueued
+        self.pool.enqueue(gate.wait, .5)
+        self.pool.enqueue(blocking_task).result(5)
+        self.assertTrue(gate.is_set())
+        self.assertEqual(len(threads), 2)
+        self.assertIsNot(threads[0], threads[1])
+
+    def testWaitSubtask(self):
+        """
+        Checks that a task can wait for a task it enqueued while all threads
+        were busy
+        """
+        def child():
+            return 42
+
+        def parent():
+            # Only one thread has been started: the child is kept in our
+            # deque, and must be stolen by a new thread
+            return self.pool.enqueue(child).result(3)
+
+        # Let the first thread wait for a task
+        time.sleep(.1)
+        self.assertEqual(self.pool.enqueue(parent).result(5), 42)
+
+    def testPriority(self):
+        """
+        Checks that tasks stored in a deque aren't executed before tasks
+        with a higher priority
+        """
+        self.pool.stop()
+        self.pool = threadpool.ThreadPool(1, work_stealing=True)
+        self.pool.start()
+
+        order = []
+        enqueued = threading.Event()
+        gate = threading.Event()
+
+        def blocking_task():
+            # The only thread is busy: the task is kept in our deque
+            self.pool.enqueue(order.append, "child")
+            enqueued.set()
+            gate.wait(5)
+
+        self.pool.enqueue(blocking_task)
+        self.assertTrue(enqueued.wait(5))
+        future = self.pool.enqueue_with(
+            order.append, ("high",), priority=threadpool.PRIORITY_HIGH)
+        gate.set()
+
+        future.result(5)
+        self.assertTrue(self.pool.join(5))
+        self.assertListEqual(order, ["high", "child"])
+
+    def testJoin(self):
+        """
+        Checks that join() waits for the tasks stored in the worker deques
+        """
+        results = []
+
+        def nested_task():
+            for idx in range(10):
+                self.pool.enqueue(results.append, idx)
+
+        self.pool.enqueue(nested_task)
+        self.pool.enqueue(time.sleep, .1)
+        self.assertTrue(self.pool.join(5))
+        self.assertListEqual(sorted(results), list(range(10)))
+
+    def testStop(self):
+        """
+        Checks that stop() drops the tasks stored in the worker deques
+        """
+        results = []
+        gate = threading.Event()
+
+        def nested_task():
+            for idx in range(10):
+                self.pool.enqueue(results.append, idx)
+            gate.wait(5)
+
+        self.pool.enqueue(nested_task)
+        self.pool.enqueue(gate.wait, 5)
+        time.sleep(.1)
+
+        # Release the workers once the pool is stopping
+        threading.Timer(.1, gate.set).start()
+        self.pool.stop()
+        self.assertTrue(self.pool.join(1))
+
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Set logging level
+    import logging
+    logging.basicConfig(level=logging.DEBUG)
+
+    unittest.main()